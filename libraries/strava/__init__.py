@@ -0,0 +1,245 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Optional
+from urllib.parse import urlencode, urljoin
+
+import httpx
+
+from django.conf import settings
+from django.urls import reverse
+
+from tracker.apps.activities.models import Activity
+from tracker.apps.users.models import StravaProfile, User
+from tracker.core.constants import MeasurementUnit
+
+from .client import BASE_URL, close_client, get_async_client, get_client  # noqa: F401
+from .decoding import decode_activities, decode_activity, decode_athlete_shoes, loads
+from .exceptions import RateLimitExceeded, StravaException  # noqa: F401
+from .records import StravaActivity, StravaShoes  # noqa: F401
+from .tokens import (  # noqa: F401
+    GrantType,
+    aget_access_token,
+    cache_profile_token,
+    get_access_token,
+    request_token,
+    update_profile_token,
+)
+
+if TYPE_CHECKING:
+    from tracker.apps.shoes.models import Shoes
+
+
+STRAVA_SPORT_TYPES = {
+    'Run': Activity.Type.RUN,
+    'VirtualRun': Activity.Type.RUN,
+    'TrailRun': Activity.Type.TRAIL,
+    'Walk': Activity.Type.WALK,
+}
+
+
+def get_headers(user: User) -> dict:
+    token = get_access_token(user)
+    return _build_headers(token)
+
+
+async def aget_headers(user: User) -> dict:
+    token = await aget_access_token(user)
+    return _build_headers(token)
+
+
+def _build_headers(token: str) -> dict:
+    return {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {token}'
+    }
+
+
+def get_authorization_url(user: User) -> str:
+    query_params = {
+        'client_id': settings.STRAVA_CLIENT_ID,
+        'redirect_uri': urljoin(settings.HOST_URL, reverse('api:strava:authorized')),
+        'response_type': 'code',
+        'approval_prompt': 'auto',
+        'scope': 'read,profile:read_all,activity:read_all',
+        'state': user.id,
+    }
+    return 'https://www.strava.com/oauth/authorize?' + urlencode(query_params)
+
+
+def authorize_user(user: User, code: str, commit: bool = False) -> StravaProfile:
+    response = request_token(code, GrantType.AUTHORIZATION_CODE)
+    response.raise_for_status()
+
+    data = loads(response.content)
+    profile = getattr(user, 'strava_profile', StravaProfile(user=user))
+    profile.athlete_id = data['athlete']['id']
+    update_profile_token(profile, data)
+    if data['athlete']['measurement_preference'] == 'meters':
+        user.measurement_unit = MeasurementUnit.METRIC
+    else:
+        user.measurement_unit = MeasurementUnit.MILES
+
+    if commit:
+        profile.save()
+        user.save(update_fields=['measurement_unit'])
+        cache_profile_token(profile)
+
+    return profile
+
+
+def get_athlete_shoes(user: User) -> List[StravaShoes]:
+    response = get_athlete_profile(user)
+    response.raise_for_status()
+    return decode_athlete_shoes(response.content)
+
+
+async def aget_athlete_shoes(user: User) -> List[StravaShoes]:
+    url = BASE_URL + 'athlete'
+    headers = await aget_headers(user)
+    response = await get_async_client().get(url=url, headers=headers)
+    response.raise_for_status()
+    return decode_athlete_shoes(response.content)
+
+
+def get_athlete_profile(user: User) -> httpx.Response:
+    url = BASE_URL + 'athlete'
+    headers = get_headers(user)
+    return get_client().get(url=url, headers=headers)
+
+
+def get_gear_detail(shoes: 'Shoes') -> httpx.Response:
+    if not shoes.strava_id:
+        raise ValueError(f'Shoes {shoes} have no strava ID')
+
+    headers = get_headers(shoes.user)
+    url = BASE_URL + f'gear/{shoes.strava_id}'
+    return get_client().get(url=url, headers=headers)
+
+
+def get_athlete_activities(user: User, after: datetime) -> list[StravaActivity]:
+    return list(iter_athlete_activities(user, after=after))
+
+
+async def aget_athlete_activities(user: User, after: datetime) -> list[StravaActivity]:
+    return [activity async for activity in aiter_athlete_activities(user, after=after)]
+
+
+def iter_athlete_activities(
+    user: User, after: Optional[datetime] = None, before: Optional[datetime] = None, per_page: int = 200
+) -> Iterator[StravaActivity]:
+    """Yields the user's activities from newest to oldest, fetching pages only when needed.
+    Strava lists activities in ascending order when `after` is sent, so `after` is applied
+    here instead and paging stops as soon as an older activity is reached.
+    """
+    page = 1
+    while True:
+        response = get_activities(user, before=before, page=page, per_page=per_page)
+        response.raise_for_status()
+        activities = decode_activities(response.content)
+        for activity in activities:
+            if after and activity.created <= after:
+                return
+            if STRAVA_SPORT_TYPES.get(activity.type):
+                yield activity
+
+        if len(activities) < per_page:
+            return
+        page += 1
+
+
+async def aiter_athlete_activities(
+    user: User, after: Optional[datetime] = None, before: Optional[datetime] = None, per_page: int = 200
+) -> AsyncIterator[StravaActivity]:
+    headers = await aget_headers(user)
+    url = BASE_URL + 'athlete/activities'
+    page = 1
+    while True:
+        query = _get_activities_query(before=before, page=page, per_page=per_page)
+        response = await get_async_client().get(url=url, params=query, headers=headers)
+        response.raise_for_status()
+        activities = decode_activities(response.content)
+        for activity in activities:
+            if after and activity.created <= after:
+                return
+            if STRAVA_SPORT_TYPES.get(activity.type):
+                yield activity
+
+        if len(activities) < per_page:
+            return
+        page += 1
+
+
+def get_activities(
+    user: User,
+    after: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+    page: Optional[int] = None,
+    per_page: Optional[int] = None,
+) -> httpx.Response:
+    headers = get_headers(user)
+    url = BASE_URL + 'athlete/activities'
+    query = _get_activities_query(after=after, before=before, page=page, per_page=per_page)
+    return get_client().get(url=url, params=query, headers=headers)
+
+
+def _get_activities_query(
+    after: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+    page: Optional[int] = None,
+    per_page: Optional[int] = None,
+) -> dict:
+    query = {}
+    if after:
+        query['after'] = int(after.timestamp())
+    if before:
+        query['before'] = int(before.timestamp())
+    if page:
+        query['page'] = page
+    if per_page:
+        query['per_page'] = per_page
+    return query
+
+
+def get_athlete_activity(activity_id: str, user: User, headers: Optional[dict] = None) -> Optional[StravaActivity]:
+    response = get_activity_detail(activity_id, user, headers)
+    response.raise_for_status()
+    activity = decode_activity(loads(response.content))
+    if not STRAVA_SPORT_TYPES.get(activity.type):
+        return None
+
+    return activity
+
+
+def get_activity_detail(activity_id: str, user: User, headers: Optional[dict] = None) -> httpx.Response:
+    """`headers` lets callers fetching many activities look the access token up once"""
+    headers = headers or get_headers(user)
+    url = BASE_URL + f'activities/{activity_id}'
+    return get_client().get(url=url, headers=headers)
+
+
+def create_webhook_subscription() -> httpx.Response:
+    url = BASE_URL + 'push_subscriptions'
+    data = {
+        'client_id': settings.STRAVA_CLIENT_ID,
+        'client_secret': settings.STRAVA_CLIENT_SECRET,
+        'callback_url': urljoin(settings.HOST_URL, reverse('api:strava:notification')),
+        'verify_token': settings.STRAVA_VERIFY_TOKEN,
+    }
+    return get_client().post(url=url, json=data)
+
+
+def view_webhook_subscription() -> httpx.Response:
+    url = BASE_URL + 'push_subscriptions'
+    data = {
+        'client_id': settings.STRAVA_CLIENT_ID,
+        'client_secret': settings.STRAVA_CLIENT_SECRET,
+    }
+    return get_client().get(url=url, params=data)
+
+
+def delete_webhook_subscription(subscription_id: str) -> httpx.Response:
+    url = BASE_URL + f'push_subscriptions/{subscription_id}'
+    data = {
+        'client_id': settings.STRAVA_CLIENT_ID,
+        'client_secret': settings.STRAVA_CLIENT_SECRET,
+    }
+    return get_client().delete(url, params=data)
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Any, Optional
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+
+from . import ratelimit
+from .retry import RetryPolicy, get_circuit_breaker, record_retry
+
+
+BASE_URL = settings.STRAVA_API_URL
+TOKEN_URL = BASE_URL + 'oauth/token'
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+# Async clients can't be shared between event loops, keep one per loop
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class StravaClient(httpx.Client):
+    """Retries failed idempotent requests and fails fast while the circuit breaker is open.
+    Event hooks run again on every attempt, so retries are counted against the rate limit.
+    """
+
+    def send(self, request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        policy = RetryPolicy.from_settings()
+        breaker = get_circuit_breaker()
+        attempt = 0
+        while True:
+            breaker.before_request()
+            try:
+                response = super().send(request, **kwargs)
+            except httpx.TransportError:
+                breaker.record_failure()
+                if not policy.should_retry(request, attempt):
+                    raise
+                delay = policy.get_delay(attempt)
+            except BaseException:
+                breaker.release_trial()
+                raise
+            else:
+                breaker.record_response(response)
+                delay = policy.get_delay(attempt, response)
+                if not policy.should_retry(request, attempt, response) or delay is None:
+                    return response
+                response.close()
+
+            record_retry()
+            time.sleep(delay)
+            attempt += 1
+
+
+class StravaAsyncClient(httpx.AsyncClient):
+    async def send(self, request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        policy = RetryPolicy.from_settings()
+        breaker = get_circuit_breaker()
+        attempt = 0
+        while True:
+            breaker.before_request()
+            try:
+                response = await super().send(request, **kwargs)
+            except httpx.TransportError:
+                breaker.record_failure()
+                if not policy.should_retry(request, attempt):
+                    raise
+                delay = policy.get_delay(attempt)
+            except BaseException:
+                breaker.release_trial()
+                raise
+            else:
+                breaker.record_response(response)
+                delay = policy.get_delay(attempt, response)
+                if not policy.should_retry(request, attempt, response) or delay is None:
+                    return response
+                await response.aclose()
+
+            await sync_to_async(record_retry, thread_sensitive=False)()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def _get_timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.STRAVA_TIMEOUT, connect=settings.STRAVA_CONNECT_TIMEOUT)
+
+
+def _get_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.STRAVA_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.STRAVA_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.STRAVA_KEEPALIVE_EXPIRY,
+    )
+
+
+def _on_request(request: httpx.Request) -> None:
+    ratelimit.acquire()
+
+
+def _on_response(response: httpx.Response) -> None:
+    ratelimit.record_usage(response.headers)
+
+
+async def _aon_request(request: httpx.Request) -> None:
+    await ratelimit.aacquire()
+
+
+async def _aon_response(response: httpx.Response) -> None:
+    await sync_to_async(ratelimit.record_usage, thread_sensitive=False)(response.headers)
+
+
+def get_client() -> httpx.Client:
+    """Returns the process-wide Strava HTTP client, creating it on first use.
+    Connections are pooled and kept alive so consecutive calls skip the TCP/TLS handshake.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = StravaClient(
+                    http2=settings.STRAVA_HTTP2,
+                    limits=_get_limits(),
+                    timeout=_get_timeout(),
+                    event_hooks={'request': [_on_request], 'response': [_on_response]},
+                )
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the Strava async HTTP client of the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = StravaAsyncClient(
+            http2=settings.STRAVA_HTTP2,
+            limits=_get_limits(),
+            timeout=_get_timeout(),
+            event_hooks={'request': [_aon_request], 'response': [_aon_response]},
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def close_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def _reset_client_after_fork() -> None:
+    # Pooled sockets are inherited from the parent process (e.g. gunicorn preload),
+    # drop them without closing so the parent's connections stay usable
+    global _client, _client_lock, _async_clients
+    _client = None
+    _client_lock = threading.Lock()
+    _async_clients = weakref.WeakKeyDictionary()
+
+
+os.register_at_fork(after_in_child=_reset_client_after_fork)
@@ -0,0 +1,59 @@
+"""Decoding of Strava API payloads into records.
+
+Records are built straight from the payload keys they need, timestamps take the
+`datetime.fromisoformat` fast path and orjson is used for JSON when it is installed.
+"""
+import json
+from datetime import datetime
+from typing import Any, Callable, List
+
+from dateutil import parser
+
+from .records import StravaActivity, StravaShoes
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+loads: Callable[[bytes], Any] = orjson.loads if orjson else json.loads
+
+
+def parse_datetime(value: str) -> datetime:
+    # Strava sends ISO 8601, e.g. 2024-01-01T06:00:00Z
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parser.parse(value)
+
+
+def decode_activity(data: dict) -> StravaActivity:
+    return StravaActivity(
+        id=data['id'],
+        name=data['name'],
+        distance=data['distance'],
+        moving_time=data['moving_time'],
+        type=data['type'],
+        created=parse_datetime(data['start_date']),
+        shoes_id=data['gear_id'],
+    )
+
+
+def decode_activities(content: bytes) -> List[StravaActivity]:
+    return [decode_activity(data) for data in loads(content)]
+
+
+def decode_shoes(data: dict) -> StravaShoes:
+    return StravaShoes(
+        id=data['id'],
+        name=data['name'],
+        nickname=data['nickname'],
+        retired=data['retired'],
+        distance=data['distance'],
+        converted_distance=data['converted_distance'],
+    )
+
+
+def decode_athlete_shoes(content: bytes) -> List[StravaShoes]:
+    return [decode_shoes(data) for data in loads(content)['shoes']]
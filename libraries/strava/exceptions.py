@@ -0,0 +1,8 @@
+class StravaException(Exception):
+    pass
+
+
+class RateLimitExceeded(StravaException):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f'Strava rate limit budget exhausted, retry in {retry_after} seconds')
+        self.retry_after = retry_after
@@ -0,0 +1,324 @@
+"""Stand-in for the Strava API used by load tests and benchmarks.
+
+`FakeStrava` generates a deterministic set of athletes, shoes and activities and answers
+the endpoints used by this library with configurable latency, error rate and rate limits.
+It can be mounted in-process with `transport()`/`async_transport()`, or served over real
+sockets with `serve()` and used by pointing STRAVA_API_URL at it.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Mapping, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+
+API_PREFIX = '/api/v3/'
+SPORT_TYPES = ('Run', 'Run', 'Run', 'TrailRun', 'VirtualRun', 'Walk', 'Ride')
+ACTIVITY_PATTERN = re.compile(r'^activities/(\d+)$')
+GEAR_PATTERN = re.compile(r'^gear/(\w+)$')
+SUBSCRIPTION_PATTERN = re.compile(r'^push_subscriptions/(\d+)$')
+
+FakeResponse = Tuple[int, dict, bytes]
+
+
+class FakeStrava:
+    def __init__(
+        self,
+        athletes: int = 1,
+        activities_per_athlete: int = 500,
+        shoes_per_athlete: int = 3,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limits: Tuple[int, int] = (200, 2000),
+        seed: int = 0,
+    ) -> None:
+        """`latency` and `jitter` are in seconds, `error_rate` is the share of requests
+        answered with a 503, and `rate_limits` are the 15 minute and daily request limits.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limits = rate_limits
+        self.random = random.Random(seed)
+        self.usage: dict = {}
+        self.subscriptions: dict = {}
+        self._lock = threading.Lock()
+
+        self.athletes: dict = {}
+        self.activities: dict = {}
+        self.athlete_activities: dict = {}
+        self.gear: dict = {}
+        now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        activity_id = 1
+        for athlete_id in range(1, athletes + 1):
+            shoes: list = []
+            for index in range(shoes_per_athlete):
+                gear_id = f'g{athlete_id * 100 + index}'
+                shoes.append({
+                    'id': gear_id,
+                    'name': f'Shoes {gear_id}',
+                    'nickname': f'Shoes {index + 1}',
+                    'retired': False,
+                    'distance': 0,
+                    'converted_distance': 0.0,
+                    'primary': index == 0,
+                })
+                self.gear[gear_id] = shoes[-1]
+
+            self.athletes[athlete_id] = {
+                'id': athlete_id,
+                'username': f'athlete{athlete_id}',
+                'measurement_preference': 'meters',
+                'shoes': shoes,
+            }
+            activities: list = []
+            for index in range(activities_per_athlete):
+                gear = self.random.choice(shoes)
+                moving_time = self.random.randint(1200, 7200)
+                distance = round(moving_time * self.random.uniform(2.2, 3.8), 1)
+                start_date = now - timedelta(days=activities_per_athlete - index, hours=self.random.randint(5, 9))
+                activities.append({
+                    'id': activity_id,
+                    'name': f'Activity {activity_id}',
+                    'distance': distance,
+                    'moving_time': moving_time,
+                    'elapsed_time': moving_time + self.random.randint(0, 600),
+                    'type': self.random.choice(SPORT_TYPES),
+                    'start_date': start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'gear_id': gear['id'],
+                    'athlete': {'id': athlete_id},
+                })
+                gear['distance'] += distance
+                self.activities[activity_id] = activities[-1]
+                activity_id += 1
+
+            for gear in shoes:
+                gear['converted_distance'] = round(gear['distance'] / 1000, 1)
+            self.athlete_activities[athlete_id] = activities
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def async_transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.ahandle)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        delay = self._get_delay()
+        if delay:
+            time.sleep(delay)
+        return self._to_response(*self._dispatch_request(request))
+
+    async def ahandle(self, request: httpx.Request) -> httpx.Response:
+        delay = self._get_delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._to_response(*self._dispatch_request(request))
+
+    def _get_delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        return max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0)
+
+    def _dispatch_request(self, request: httpx.Request) -> FakeResponse:
+        query = dict(request.url.params)
+        return self.dispatch(request.method, request.url.path, query, request.headers, request.content)
+
+    def _to_response(self, status: int, headers: dict, body: bytes) -> httpx.Response:
+        return httpx.Response(status, headers=headers, content=body)
+
+    def dispatch(self, method: str, path: str, query: dict, headers: Mapping[str, str], body: bytes) -> FakeResponse:
+        now = int(time.time())
+        with self._lock:
+            # Usage resets every quarter hour and at midnight UTC
+            windows = (now - now % (15 * 60), now - now % (24 * 60 * 60))
+            usage = []
+            for index, window in enumerate(windows):
+                key = (index, window)
+                self.usage[key] = self.usage.get(key, 0) + 1
+                usage.append(self.usage[key])
+            failed = self.random.random() < self.error_rate
+
+        rate_limit_headers = {
+            'X-RateLimit-Limit': ','.join(str(limit) for limit in self.rate_limits),
+            'X-RateLimit-Usage': ','.join(str(value) for value in usage),
+        }
+        if any(value > limit for value, limit in zip(usage, self.rate_limits)):
+            return self._json(429, {'message': 'Rate Limit Exceeded'}, rate_limit_headers)
+        if failed:
+            return self._json(503, {'message': 'Service Unavailable'}, {**rate_limit_headers, 'Retry-After': '1'})
+        if not path.startswith(API_PREFIX):
+            return self._json(404, {'message': 'Record Not Found'}, rate_limit_headers)
+
+        route = path[len(API_PREFIX):].rstrip('/')
+        data: object
+        if route == 'oauth/token' and method == 'POST':
+            status, data = self._token(json.loads(body or b'{}'))
+        elif route.startswith('push_subscriptions'):
+            status, data = self._subscriptions(method, route, query)
+        else:
+            athlete_id = self._get_athlete_id(headers)
+            if athlete_id is None:
+                status, data = 401, {'message': 'Authorization Error'}
+            elif method != 'GET':
+                status, data = 405, {'message': 'Method Not Allowed'}
+            else:
+                status, data = self._get(athlete_id, route, query)
+
+        return self._json(status, data, rate_limit_headers)
+
+    def _json(self, status: int, data: object, headers: dict) -> FakeResponse:
+        return status, {**headers, 'Content-Type': 'application/json'}, json.dumps(data).encode()
+
+    def _get_athlete_id(self, headers: Mapping[str, str]) -> Optional[int]:
+        authorization = headers.get('Authorization') or ''
+        match = re.match(r'^Bearer token-(\d+)$', authorization)
+        if not match or int(match.group(1)) not in self.athletes:
+            return None
+        return int(match.group(1))
+
+    def _token(self, data: dict) -> Tuple[int, dict]:
+        token = data.get('code') if data.get('grant_type') == 'authorization_code' else data.get('refresh_token')
+        match = re.match(r'^(?:code|refresh)-(\d+)$', str(token))
+        if not match or int(match.group(1)) not in self.athletes:
+            return 400, {'message': 'Bad Request'}
+
+        athlete = self.athletes[int(match.group(1))]
+        return 200, {
+            'token_type': 'Bearer',
+            'access_token': f'token-{athlete["id"]}',
+            'refresh_token': f'refresh-{athlete["id"]}',
+            'expires_at': int(time.time()) + 6 * 60 * 60,
+            'athlete': {key: value for key, value in athlete.items() if key != 'shoes'},
+        }
+
+    def _get(self, athlete_id: int, route: str, query: dict) -> Tuple[int, object]:
+        if route == 'athlete':
+            return 200, self.athletes[athlete_id]
+        if route == 'athlete/activities':
+            return 200, self._list_activities(athlete_id, query)
+
+        match = ACTIVITY_PATTERN.match(route)
+        if match:
+            activity = self.activities.get(int(match.group(1)))
+            if not activity or activity['athlete']['id'] != athlete_id:
+                return 404, {'message': 'Record Not Found'}
+            return 200, activity
+
+        match = GEAR_PATTERN.match(route)
+        if match and match.group(1) in self.gear:
+            return 200, self.gear[match.group(1)]
+
+        return 404, {'message': 'Record Not Found'}
+
+    def _list_activities(self, athlete_id: int, query: dict) -> list:
+        activities = self.athlete_activities[athlete_id]
+        before = int(query.get('before') or 0)
+        after = int(query.get('after') or 0)
+        if before:
+            activities = [activity for activity in activities if self._timestamp(activity) < before]
+        if after:
+            activities = [activity for activity in activities if self._timestamp(activity) > after]
+        else:
+            # Like Strava, newest first unless `after` is given
+            activities = activities[::-1]
+
+        page = max(int(query.get('page') or 1), 1)
+        per_page = min(int(query.get('per_page') or 30), 200)
+        return activities[(page - 1) * per_page:page * per_page]
+
+    def _timestamp(self, activity: dict) -> int:
+        start_date = datetime.strptime(activity['start_date'], '%Y-%m-%dT%H:%M:%SZ')
+        return int(start_date.replace(tzinfo=timezone.utc).timestamp())
+
+    def _subscriptions(self, method: str, route: str, query: dict) -> Tuple[int, object]:
+        match = SUBSCRIPTION_PATTERN.match(route)
+        if method == 'DELETE' and match:
+            self.subscriptions.pop(int(match.group(1)), None)
+            return 204, {}
+        if method == 'POST':
+            subscription_id = len(self.subscriptions) + 1
+            self.subscriptions[subscription_id] = {'id': subscription_id}
+            return 201, self.subscriptions[subscription_id]
+        return 200, list(self.subscriptions.values())
+
+    def make_event(self, activity_id: int, aspect_type: str = 'update', updates: Optional[dict] = None) -> dict:
+        """Returns a webhook event as Strava would POST it to the notification endpoint"""
+        activity = self.activities[activity_id]
+        return {
+            'aspect_type': aspect_type,
+            'event_time': int(time.time()),
+            'object_id': activity_id,
+            'object_type': 'activity',
+            'owner_id': activity['athlete']['id'],
+            'subscription_id': 1,
+            'updates': updates if updates is not None else {},
+        }
+
+    def make_random_event(self) -> dict:
+        activity_id = self.random.choice(list(self.activities))
+        aspect_type = self.random.choice(('create', 'update', 'update', 'update', 'delete'))
+        updates = {}
+        if aspect_type == 'update':
+            updates = self.random.choice([{'title': 'Renamed'}, {'gear_id': self.activities[activity_id]['gear_id']}])
+        return self.make_event(activity_id, aspect_type, updates)
+
+
+class FakeStravaRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive so clients can pool connections
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, don't let Nagle delay the body
+    disable_nagle_algorithm = True
+    server: 'FakeStravaServer'
+
+    def _handle(self) -> None:
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        fake = self.server.fake
+        delay = fake._get_delay()
+        if delay:
+            time.sleep(delay)
+
+        status, headers, content = fake.dispatch(
+            self.command, url.path, dict(parse_qsl(url.query)), httpx.Headers(self.headers.items()), body
+        )
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_DELETE = _handle
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class FakeStravaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fake: FakeStrava, address: Tuple[str, int]) -> None:
+        super().__init__(address, FakeStravaRequestHandler)
+        self.fake = fake
+
+    @property
+    def api_url(self) -> str:
+        host, port = self.socket.getsockname()[:2]
+        return f'http://{host}:{port}{API_PREFIX}'
+
+
+def serve(fake: FakeStrava, host: str = '127.0.0.1', port: int = 0) -> FakeStravaServer:
+    """Serves `fake` from a background thread, port 0 picks a free port"""
+    server = FakeStravaServer(fake, (host, port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,180 @@
+"""Strava's application rate limits, counted in Redis so every process spends from the same budget"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Iterator, Mapping, Optional
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .exceptions import RateLimitExceeded
+
+
+LIMITS_KEY = 'strava-ratelimit:limits'
+WAITING_KEY = 'strava-ratelimit:waiting'
+SHED_KEY = 'strava-ratelimit:shed'
+
+
+class Priority(IntEnum):
+    BACKGROUND = 1
+    INTERACTIVE = 2
+
+
+@dataclass(frozen=True)
+class Window:
+    name: str
+    seconds: int
+
+    def get_key(self, now: int) -> str:
+        return f'strava-ratelimit:{self.name}:{now - now % self.seconds}'
+
+    def get_reset_in(self, now: int) -> int:
+        return self.seconds - now % self.seconds
+
+
+# Strava windows start at each quarter hour and at midnight UTC, in header order
+WINDOWS = (Window('15min', 15 * 60), Window('daily', 24 * 60 * 60))
+
+_priority: ContextVar[Priority] = ContextVar('strava_priority', default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def use_priority(priority: Priority) -> Iterator[None]:
+    """Runs the Strava calls made inside the block with the given priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def get_limits() -> tuple:
+    return cache.get(LIMITS_KEY) or tuple(settings.STRAVA_RATE_LIMITS)
+
+
+def _get_allowance(limit: int, priority: Priority) -> int:
+    if priority == Priority.INTERACTIVE:
+        return limit
+    return int(limit * settings.STRAVA_RATE_LIMIT_BACKGROUND_SHARE)
+
+
+def _incr(key: str, timeout: int, delta: int = 1) -> int:
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Key expired between add and incr
+        cache.set(key, delta, timeout=timeout)
+        return delta
+
+
+def _decr(key: str) -> None:
+    try:
+        cache.decr(key)
+    except ValueError:
+        # Expired meanwhile, there's nothing left to give back
+        pass
+
+
+def _start_waiting() -> None:
+    # Each waiter extends the TTL, so the count outlives the longest sleep
+    _incr(WAITING_KEY, settings.STRAVA_RATE_LIMIT_MAX_WAIT)
+    cache.touch(WAITING_KEY, settings.STRAVA_RATE_LIMIT_MAX_WAIT)
+
+
+def _reserve(priority: Priority) -> int:
+    """Reserves one request in every window.
+    Returns 0 on success, otherwise the seconds until the exhausted window resets.
+    """
+    now = int(time.time())
+    reserved = []
+    for window, limit in zip(WINDOWS, get_limits()):
+        key = window.get_key(now)
+        usage = _incr(key, window.seconds)
+        reserved.append(key)
+        if usage > _get_allowance(limit, priority):
+            for reserved_key in reserved:
+                _decr(reserved_key)
+            return window.get_reset_in(now)
+
+    return 0
+
+
+def _check_wait(priority: Priority, retry_after: int, waited: int) -> None:
+    if priority == Priority.INTERACTIVE or waited + retry_after > settings.STRAVA_RATE_LIMIT_MAX_WAIT:
+        _incr(SHED_KEY, WINDOWS[-1].seconds)
+        raise RateLimitExceeded(retry_after)
+
+
+def acquire(priority: Optional[Priority] = None) -> None:
+    """Blocks until a request fits in the rate limit budget.
+    Interactive calls never wait, background calls wait up to STRAVA_RATE_LIMIT_MAX_WAIT
+    seconds, RateLimitExceeded is raised otherwise.
+    """
+    priority = priority or _priority.get()
+    waited = 0
+    while retry_after := _reserve(priority):
+        _check_wait(priority, retry_after, waited)
+        _start_waiting()
+        try:
+            time.sleep(retry_after)
+        finally:
+            _decr(WAITING_KEY)
+        waited += retry_after
+
+
+async def aacquire(priority: Optional[Priority] = None) -> None:
+    priority = priority or _priority.get()
+    waited = 0
+    while retry_after := await sync_to_async(_reserve, thread_sensitive=False)(priority):
+        _check_wait(priority, retry_after, waited)
+        await sync_to_async(_start_waiting, thread_sensitive=False)()
+        try:
+            await asyncio.sleep(retry_after)
+        finally:
+            await sync_to_async(_decr, thread_sensitive=False)(WAITING_KEY)
+        waited += retry_after
+
+
+def record_usage(headers: Mapping[str, str]) -> None:
+    """Syncs limits and usage with the values reported by Strava"""
+    limit_header = headers.get('X-RateLimit-Limit')
+    usage_header = headers.get('X-RateLimit-Usage')
+    if not limit_header or not usage_header:
+        return
+
+    try:
+        limits = tuple(int(value) for value in limit_header.split(','))
+        usages = [int(value) for value in usage_header.split(',')]
+    except ValueError:
+        return
+
+    cache.set(LIMITS_KEY, limits, timeout=None)
+    now = int(time.time())
+    for window, usage in zip(WINDOWS, usages):
+        key = window.get_key(now)
+        # Local usage may be higher as it includes requests still in flight
+        if usage > (cache.get(key) or 0):
+            cache.set(key, usage, timeout=window.seconds)
+
+
+def get_rate_limit_status() -> dict:
+    now = int(time.time())
+    status: dict = {}
+    for window, limit in zip(WINDOWS, get_limits()):
+        usage = cache.get(window.get_key(now)) or 0
+        status[window.name] = {
+            'limit': limit,
+            'usage': usage,
+            'remaining': max(limit - usage, 0),
+            'reset_in': window.get_reset_in(now),
+        }
+
+    status['waiting'] = cache.get(WAITING_KEY) or 0
+    status['shed'] = cache.get(SHED_KEY) or 0
+    return status
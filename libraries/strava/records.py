@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from tracker.apps.shoes.models import Shoes
+
+
+# Slotted, as activity pages are decoded into thousands of records
+@dataclass(slots=True)
+class StravaActivity:
+    id: str
+    name: str
+    distance: float
+    moving_time: int
+    type: str
+    created: datetime
+    shoes_id: str
+    shoes: Optional['Shoes'] = None
+
+    @property
+    def converted_distance(self) -> float:
+        return round(self.distance / 1000, 1)
+
+
+@dataclass(slots=True)
+class StravaShoes:
+    id: str
+    name: str
+    nickname: str
+    retired: bool
+    distance: int
+    converted_distance: float
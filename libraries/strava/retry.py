@@ -0,0 +1,156 @@
+"""Retries with backoff and a per process circuit breaker for Strava calls"""
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .exceptions import StravaException
+
+
+RETRIES_KEY = 'strava-retry:retries'
+BREAKER_OPENED_KEY = 'strava-retry:breaker-opened'
+# Counters are reset daily
+METRICS_TIMEOUT = 24 * 60 * 60
+
+
+class CircuitOpen(StravaException):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f'Strava circuit breaker is open, retry in {retry_after:.0f} seconds')
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_retries: int
+    backoff: float  # in seconds, doubled on each attempt
+    max_backoff: float  # in seconds
+    methods: frozenset = field(default=frozenset({'GET', 'HEAD'}))
+    statuses: frozenset = field(default=frozenset({429, 500, 502, 503, 504}))
+
+    @classmethod
+    def from_settings(cls) -> 'RetryPolicy':
+        return cls(
+            max_retries=settings.STRAVA_MAX_RETRIES,
+            backoff=settings.STRAVA_RETRY_BACKOFF,
+            max_backoff=settings.STRAVA_RETRY_MAX_BACKOFF,
+        )
+
+    def should_retry(self, request: httpx.Request, attempt: int, response: Optional[httpx.Response] = None) -> bool:
+        if request.method not in self.methods or attempt >= self.max_retries:
+            return False
+        return response is None or response.status_code in self.statuses
+
+    def get_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+        """Returns seconds to wait before the next attempt,
+        or None when Strava asks to wait longer than `max_backoff`
+        """
+        retry_after = get_retry_after(response)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+
+        # Full jitter spreads retries of concurrent workers
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+def get_retry_after(response: Optional[httpx.Response]) -> Optional[float]:
+    if response is None:
+        return None
+    try:
+        return max(float(response.headers['Retry-After']), 0)
+    except (KeyError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold: int, reset_timeout: float) -> None:
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """Raises CircuitOpen while the breaker is open.
+        Once `reset_timeout` passed a single trial request is let through.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            retry_after = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and retry_after <= 0:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.OPEN or self._trial_in_flight:
+                raise CircuitOpen(max(retry_after, 0))
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    cache.add(BREAKER_OPENED_KEY, 0, timeout=METRICS_TIMEOUT)
+                    cache.incr(BREAKER_OPENED_KEY)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Lets another trial through when one ended without reaching Strava"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_response(self, response: httpx.Response) -> None:
+        if response.status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker(
+            threshold=settings.STRAVA_CIRCUIT_BREAKER_THRESHOLD,
+            reset_timeout=settings.STRAVA_CIRCUIT_BREAKER_RESET_TIMEOUT,
+        )
+    return _breaker
+
+
+def record_retry() -> None:
+    cache.add(RETRIES_KEY, 0, timeout=METRICS_TIMEOUT)
+    cache.incr(RETRIES_KEY)
+
+
+def get_retry_status() -> dict:
+    breaker = get_circuit_breaker()
+    return {
+        'retries': cache.get(RETRIES_KEY) or 0,
+        'breaker_opened': cache.get(BREAKER_OPENED_KEY) or 0,
+        # State of the process serving this request only
+        'breaker_state': breaker.state,
+        'breaker_failures': breaker.failures,
+    }
@@ -0,0 +1,122 @@
+"""Strava OAuth access tokens.
+
+Access tokens are cached in Redis until shortly before they expire, so hot requests
+make no DB query. Refreshes are single-flight: one process per athlete takes a short
+lock and refreshes while the others wait and read its result from the cache.
+"""
+from enum import Enum
+
+import httpx
+from asgiref.sync import sync_to_async
+from redis.exceptions import LockNotOwnedError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from tracker.apps.users.models import StravaProfile, User
+
+from .client import TOKEN_URL, get_client
+from .exceptions import StravaException
+from .ratelimit import Priority, use_priority
+
+
+# Refresh token if it expires within 5 minutes
+REFRESH_MARGIN = 300
+
+
+class GrantType(Enum):
+    AUTHORIZATION_CODE = 'authorization_code'
+    REFRESH_TOKEN = 'refresh_token'
+
+
+def get_token_cache_key(user_id: int) -> str:
+    return f'strava-token:{user_id}'
+
+
+def get_token_lock_key(user_id: int) -> str:
+    return f'strava-token-lock:{user_id}'
+
+
+def get_access_token(user: User) -> str:
+    access_token = cache.get(get_token_cache_key(user.id))
+    if access_token:
+        return access_token
+    return refresh_access_token(user.id)
+
+
+async def aget_access_token(user: User) -> str:
+    access_token = await cache.aget(get_token_cache_key(user.id))
+    if access_token:
+        return access_token
+    return await sync_to_async(refresh_access_token, thread_sensitive=False)(user.id)
+
+
+def refresh_access_token(user_id: int, margin: int = REFRESH_MARGIN) -> str:
+    """Refreshes the access token if it expires within `margin` seconds"""
+    lock = cache.lock(  # type: ignore[attr-defined]
+        get_token_lock_key(user_id),
+        timeout=settings.STRAVA_TOKEN_LOCK_TIMEOUT,
+        blocking_timeout=settings.STRAVA_TOKEN_LOCK_TIMEOUT,
+    )
+    if not lock.acquire():
+        raise StravaException(f'Timed out waiting for user {user_id} token refresh')
+
+    try:
+        # Another process may have refreshed the token while we waited for the lock
+        access_token = cache.get(get_token_cache_key(user_id))
+        if access_token and margin <= REFRESH_MARGIN:
+            return access_token
+
+        profile = StravaProfile.objects.get(user_id=user_id)
+        if is_token_expiring(profile, margin):
+            # Never waits on the rate limit budget while holding the lock
+            with use_priority(Priority.INTERACTIVE):
+                response = request_token(profile.refresh_token, GrantType.REFRESH_TOKEN)
+            response.raise_for_status()
+            update_profile_token(profile, response.json())
+            profile.save(update_fields=['access_token', 'refresh_token', 'expires_at'])
+
+        cache_profile_token(profile)
+        return profile.access_token
+    finally:
+        try:
+            lock.release()
+        except LockNotOwnedError:
+            # Expired during a slow refresh, the refresh itself went through
+            pass
+
+
+def cache_profile_token(profile: StravaProfile) -> None:
+    timeout = profile.expires_at - REFRESH_MARGIN - int(timezone.now().timestamp())
+    if timeout > 0:
+        cache.set(get_token_cache_key(profile.user_id), profile.access_token, timeout=timeout)
+    else:
+        cache.delete(get_token_cache_key(profile.user_id))
+
+
+def is_token_expiring(profile: StravaProfile, margin: int = REFRESH_MARGIN) -> bool:
+    current_ts = int(timezone.now().timestamp())
+    return current_ts > (profile.expires_at - margin)
+
+
+def update_profile_token(profile: StravaProfile, data: dict) -> None:
+    profile.access_token = data['access_token']
+    profile.refresh_token = data['refresh_token']
+    profile.expires_at = data['expires_at']
+
+
+def request_token(token: str, grant_type: GrantType) -> httpx.Response:
+    data = {
+        'client_id': settings.STRAVA_CLIENT_ID,
+        'client_secret': settings.STRAVA_CLIENT_SECRET,
+        'refresh_token': token,
+        'grant_type': grant_type.value,
+    }
+
+    if grant_type == GrantType.REFRESH_TOKEN:
+        data['refresh_token'] = token
+    elif grant_type == GrantType.AUTHORIZATION_CODE:
+        data['code'] = token
+
+    return get_client().post(url=TOKEN_URL, json=data)
@@ -0,0 +1,172 @@
+from unittest import mock
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Sum
+from django.test import TestCase
+from django.urls import reverse
+
+from tracker.apps.activities.models import Activity
+from tracker.apps.activities.rollups import rebuild_rollups
+from tracker.apps.activities.utils import import_strava_activities
+from tracker.apps.users.models import User
+from tracker.web.activities.forms import AddActivityForm
+
+from .utils import START, create_shoes, create_user, make_strava_activity
+
+ROLLUP_FIELDS = ('shoes_id', 'type', 'period', 'start', 'distance', 'duration', 'count')
+
+
+class ImportTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = create_user()
+        self.shoes = create_shoes(self.user, 'Road', strava_id='g1')
+        self.other_shoes = create_shoes(self.user, 'Trail', strava_id='g2')
+
+    def assertImported(self, user: User) -> None:
+        """Shoe totals, cumulative distances and rollups agree with the imported activities"""
+        for shoes in user.shoes.all():
+            aggregate = shoes.activities.aggregate(distance=Sum('distance', default=0.0), count=Count('id'))
+            self.assertEqual(shoes.distance_covered, aggregate['distance'])
+            self.assertEqual(shoes.activity_count, aggregate['count'])
+
+            total = 0.0
+            for activity in shoes.activities.order_by('created', 'id'):
+                total += activity.distance
+                self.assertEqual(activity.shoe_distance, total)
+
+        rollups = sorted(user.activity_rollups.values_list(*ROLLUP_FIELDS))
+        rebuild_rollups(user)
+        self.assertEqual(rollups, sorted(user.activity_rollups.values_list(*ROLLUP_FIELDS)))
+
+
+class ImportStravaActivitiesTest(ImportTestCase):
+    def get_payload(self) -> list:
+        return [
+            make_strava_activity(self.shoes if i % 2 else self.other_shoes, str(i), day=i, distance=(i + 1) * 1000)
+            for i in range(5)
+        ]
+
+    def test_import(self) -> None:
+        self.assertEqual(import_strava_activities(self.user, self.get_payload()), (5, 0))
+        self.assertEqual(self.user.activities.count(), 5)
+        activity = self.user.activities.get(strava_id='1')
+        self.assertEqual(
+            (activity.shoes_id, activity.name, activity.distance, activity.duration, activity.type, activity.created),
+            (self.shoes.id, 'Activity 1', 2000, 1500, Activity.Type.RUN, START.replace(day=2)),
+        )
+        self.assertImported(self.user)
+
+    def test_same_payload(self) -> None:
+        import_strava_activities(self.user, self.get_payload())
+        rollups = sorted(self.user.activity_rollups.values_list(*ROLLUP_FIELDS))
+
+        self.assertEqual(import_strava_activities(self.user, self.get_payload()), (0, 5))
+        self.assertEqual(self.user.activities.count(), 5)
+        self.assertEqual(sorted(self.user.activity_rollups.values_list(*ROLLUP_FIELDS)), rollups)
+        self.assertImported(self.user)
+
+    def test_overlapping_payload(self) -> None:
+        import_strava_activities(self.user, self.get_payload()[:3])
+        payload = self.get_payload()
+        payload[0].distance = 1500
+        payload[0].type = 'TrailRun'
+        payload[0].shoes = self.shoes
+
+        self.assertEqual(import_strava_activities(self.user, payload), (2, 3))
+        activity = self.user.activities.get(strava_id='0')
+        self.assertEqual(
+            (activity.shoes_id, activity.distance, activity.type), (self.shoes.id, 1500, Activity.Type.TRAIL)
+        )
+        self.assertImported(self.user)
+
+    def test_batches(self) -> None:
+        self.assertEqual(import_strava_activities(self.user, self.get_payload(), batch_size=2), (5, 0))
+        self.assertEqual(import_strava_activities(self.user, self.get_payload(), batch_size=2), (0, 5))
+        self.assertEqual(self.user.activities.count(), 5)
+        self.assertImported(self.user)
+
+    def test_duplicates_in_payload(self) -> None:
+        # The last copy of an activity wins
+        payload = self.get_payload() + [make_strava_activity(self.shoes, '0', day=0, distance=700)]
+        self.assertEqual(import_strava_activities(self.user, payload), (5, 0))
+        self.assertEqual(self.user.activities.get(strava_id='0').distance, 700)
+        self.assertImported(self.user)
+
+    def test_other_user(self) -> None:
+        # Strava IDs are unique per user
+        other_user = create_user('other')
+        other_shoes = create_shoes(other_user, strava_id='g3')
+        import_strava_activities(self.user, self.get_payload())
+        self.assertEqual(import_strava_activities(other_user, [make_strava_activity(other_shoes, '0')]), (1, 0))
+        self.assertEqual(Activity.objects.filter(strava_id='0').count(), 2)
+        self.assertImported(self.user)
+        self.assertImported(other_user)
+
+
+class BulkAddTest(ImportTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def bulk_add(self, payload: list) -> list[str]:
+        with mock.patch('tracker.web.activities.views.get_unregistered_strava_activities', return_value=payload):
+            response = self.client.post(reverse('web:activities:bulk_add'))
+        self.assertRedirects(response, reverse('web:activities:index'), fetch_redirect_response=False)
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def test_bulk_add(self) -> None:
+        payload = [make_strava_activity(self.shoes, str(i), day=i) for i in range(3)]
+        self.assertEqual(self.bulk_add(payload), ['3 new activities have been added'])
+        self.assertEqual(self.user.activities.count(), 3)
+        self.assertImported(self.user)
+
+    def test_concurrent_bulk_add(self) -> None:
+        # Activities already added by another request are updated, not counted or duplicated
+        payload = [make_strava_activity(self.shoes, str(i), day=i) for i in range(3)]
+        import_strava_activities(self.user, payload[:2])
+        self.assertEqual(self.bulk_add(payload), ['1 new activities have been added'])
+        self.assertEqual(self.user.activities.count(), 3)
+        self.assertImported(self.user)
+
+
+class AddActivityFormTest(ImportTestCase):
+    def get_data(self, **kwargs: str) -> dict:
+        return {
+            'id': '10',
+            'name': 'Morning Run',
+            'distance': '5000',
+            'duration': '1500',
+            'type': 'Run',
+            'shoes_id': 'g1',
+            'created': START.isoformat(),
+            **kwargs,
+        }
+
+    def test_save(self) -> None:
+        import_strava_activities(self.user, [make_strava_activity(self.shoes, '1', day=1)])
+        form = AddActivityForm(data=self.get_data(), user=self.user)
+        self.assertTrue(form.is_valid(), form.errors)
+
+        activity = form.save()
+        self.assertEqual((activity.strava_id, activity.name, activity.shoes_id), ('10', 'Morning Run', self.shoes.id))
+        # Back-dated before the activity already imported
+        self.assertEqual(activity.shoe_distance, 5000)
+        self.assertEqual(self.user.activities.get(strava_id='1').shoe_distance, 10000)
+        self.assertImported(self.user)
+
+    def test_duplicate(self) -> None:
+        form = AddActivityForm(data=self.get_data(), user=self.user)
+        self.assertTrue(form.is_valid())
+        form.save()
+
+        form = AddActivityForm(data=self.get_data(), user=self.user)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['id'][0].code, 'duplicate_id')
+        self.assertEqual(self.user.activities.count(), 1)
+        self.assertImported(self.user)
+
+    def test_invalid(self) -> None:
+        form = AddActivityForm(data=self.get_data(type='Ride', shoes_id='g9'), user=self.user)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['type'][0].code, 'invalid_type')
+        self.assertEqual(form.errors.as_data()['shoes_id'][0].code, 'invalid_shoes_id')
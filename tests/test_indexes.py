@@ -0,0 +1,83 @@
+from django.db import connection
+from django.test import TestCase, tag
+
+from tracker.apps.activities.models import Activity
+from tracker.apps.photos.models import Photo, PhotoCategory
+from tracker.apps.shoes.models import Shoes
+from tracker.apps.users.models import User
+
+# 1M activities, plans on small tables can differ from those at production scale.
+# Takes minutes, `manage.py test --exclude-tag slow` skips it.
+USERS = 1000
+SHOES_PER_USER = 10
+ACTIVITIES_PER_SHOE = 100
+PHOTOS_PER_CATEGORY = 20
+
+SEED_SQL = '''
+    INSERT INTO {shoes} (user_id, name, note, distance_covered, activity_count, activities_updated, created, strava_id)
+    SELECT users.id, 'Shoes', '', 0, 0, now(), now(), 'g' || users.id || '-' || n
+    FROM {users} AS users, generate_series(1, %(shoes)s) AS n;
+
+    INSERT INTO {activities} (user_id, shoes_id, type, name, distance, duration, strava_id, created, no_photos,
+                              photo_count)
+    SELECT shoes.user_id, shoes.id, 2, '', 5000, 1500, shoes.id || '-' || n, now() - n * interval '1 day', false, 0
+    FROM {shoes} AS shoes, generate_series(1, %(activities)s) AS n;
+
+    INSERT INTO {categories} (shoes_id, name)
+    SELECT id, 'Outsole' FROM {shoes};
+
+    INSERT INTO {photos} (category_id, file, created)
+    SELECT categories.id, 'photo.jpg', now() - n * interval '1 day'
+    FROM {categories} AS categories, generate_series(1, %(photos)s) AS n;
+'''
+
+
+@tag('slow')
+class IndexTest(TestCase):
+    """Lookups of list pages, imports and webhooks are planned as scans of the composite indexes"""
+    user: User
+    shoes: Shoes
+    category: PhotoCategory
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        User.objects.bulk_create(User(username=f'runner{i}', password='') for i in range(USERS))
+        tables = {
+            'users': User._meta.db_table,
+            'shoes': Shoes._meta.db_table,
+            'activities': Activity._meta.db_table,
+            'categories': PhotoCategory._meta.db_table,
+            'photos': Photo._meta.db_table,
+        }
+        params = {'shoes': SHOES_PER_USER, 'activities': ACTIVITIES_PER_SHOE, 'photos': PHOTOS_PER_CATEGORY}
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_SQL.format(**tables), params)
+            for table in tables.values():
+                cursor.execute(f'ANALYZE {table}')
+
+        cls.user = User.objects.first()
+        cls.shoes = cls.user.shoes.first()
+        cls.category = PhotoCategory.objects.filter(shoes=cls.shoes).first()
+
+    def assertIndexScan(self, plan: str, index: str) -> None:
+        self.assertRegex(plan, rf'Index (Only )?Scan( Backward)? using {index}|Bitmap Index Scan on {index}', plan)
+
+    def test_shoe_activities(self) -> None:
+        plan = self.shoes.activities.order_by('-created')[:10].explain()
+        self.assertIndexScan(plan, 'activity_shoes_created')
+
+    def test_user_activities(self) -> None:
+        plan = self.user.activities.order_by('-created')[:10].explain()
+        self.assertIndexScan(plan, 'activity_user_created')
+
+    def test_activity_strava_id(self) -> None:
+        plan = Activity.objects.filter(user=self.user, strava_id=f'{self.shoes.id}-1').explain()
+        self.assertIndexScan(plan, 'activity_user_strava_id')
+
+    def test_shoes_strava_id(self) -> None:
+        plan = Shoes.objects.filter(user=self.user, strava_id=self.shoes.strava_id).explain()
+        self.assertIndexScan(plan, 'shoes_user_strava_id')
+
+    def test_category_photos(self) -> None:
+        plan = self.category.photos.order_by('created')[:4].explain()
+        self.assertIndexScan(plan, 'photo_category_created')
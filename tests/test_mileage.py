@@ -0,0 +1,110 @@
+import math
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from tracker.apps.activities.models import Activity
+from tracker.apps.activities.utils import import_strava_activities
+from tracker.apps.shoes.mileage import get_mileage_cache_key
+from tracker.core.constants import MeasurementUnit
+from tracker.core.utils import downsample
+
+from .utils import START, clear_redis, create_shoes, create_user, make_strava_activity
+
+
+class MileageTest(TestCase):
+    def setUp(self) -> None:
+        clear_redis('*shoe-mileage:*')
+        self.addCleanup(clear_redis, '*shoe-mileage:*')
+        self.user = create_user()
+        self.shoes = create_shoes(self.user)
+        import_strava_activities(self.user, [make_strava_activity(self.shoes, str(i), day=i) for i in range(10)])
+        self.client.force_login(self.user)
+
+    def get(self, **params: int) -> dict:
+        response = self.client.get(reverse('api:shoes:mileage'), {'shoes': self.shoes.id, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_response(self) -> None:
+        timestamps = [int((START + timedelta(days=i)).timestamp()) for i in range(10)]
+        self.assertEqual(self.get(), {
+            'status': 'ok',
+            'data': {'unit': 'km', 'points': [[timestamp, 5.0 * (i + 1)] for i, timestamp in enumerate(timestamps)]},
+        })
+
+        self.user.measurement_unit = MeasurementUnit.MILES
+        self.user.save()
+        data = self.get()['data']
+        self.assertEqual(data['unit'], 'mile')
+        self.assertEqual([distance for _, distance in data['points']][:2], [3.11, 6.21])
+
+    def test_points(self) -> None:
+        points = self.get(points=4)['data']['points']
+        self.assertEqual(len(points), 4)
+        self.assertEqual((points[0][1], points[-1][1]), (5.0, 50.0))
+
+    def test_invalid(self) -> None:
+        other_shoes = create_shoes(create_user('other'))
+        invalid: list[dict[str, int | str]] = [
+            {'shoes': other_shoes.id}, {'shoes': ''}, {'points': 2}, {'points': 2001}, {'points': 'x'}
+        ]
+        for params in invalid:
+            with self.subTest(params=params):
+                response = self.client.get(reverse('api:shoes:mileage'), {'shoes': self.shoes.id, **params})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'status': 'error'})
+
+        self.client.logout()
+        response = self.client.get(reverse('api:shoes:mileage'), {'shoes': self.shoes.id})
+        self.assertEqual(response.status_code, 302)
+
+    def test_cache(self) -> None:
+        points = self.get()['data']['points']
+        self.shoes.refresh_from_db()
+        self.assertEqual(len(cache.get(get_mileage_cache_key(self.shoes, 200))), 10)
+
+        # Served from the cache while the history is unchanged
+        Activity.objects.filter(shoes=self.shoes).update(shoe_distance=0)
+        self.assertEqual(self.get()['data']['points'], points)
+        self.assertEqual(len(self.get(points=5)['data']['points']), 5)
+
+        # Recomputing the shoe's distances moves the series to a new key
+        key = get_mileage_cache_key(self.shoes, 200)
+        import_strava_activities(self.user, [make_strava_activity(self.shoes, '10', day=-1)])
+        self.shoes.refresh_from_db()
+        self.assertNotEqual(get_mileage_cache_key(self.shoes, 200), key)
+        points = self.get()['data']['points']
+        self.assertEqual(len(points), 11)
+        self.assertEqual((points[0][1], points[-1][1]), (5.0, 55.0))
+
+
+class DownsampleTest(SimpleTestCase):
+    def test_keeps_ends(self) -> None:
+        points = [(float(x), math.sin(x / 5)) for x in range(100)]
+        for count in (3, 10, 99):
+            with self.subTest(count=count):
+                sampled = downsample(points, count)
+                self.assertEqual(len(sampled), count)
+                self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+                # Points of the series, in order
+                self.assertEqual(sorted(sampled), sampled)
+                self.assertTrue(set(sampled) <= set(points))
+
+    def test_keeps_peaks(self) -> None:
+        points = [(float(x), 0.0) for x in range(100)]
+        points[37] = (37.0, 10.0)
+        points[71] = (71.0, -10.0)
+        sampled = downsample(points, 10)
+        self.assertIn((37.0, 10.0), sampled)
+        self.assertIn((71.0, -10.0), sampled)
+
+    def test_thresholds(self) -> None:
+        points = [(float(x), float(x * x)) for x in range(10)]
+        for count in (0, 2, 10, 20):
+            with self.subTest(count=count):
+                self.assertEqual(downsample(points, count), points)
+        self.assertEqual(downsample([], 5), [])
+        self.assertEqual(len(downsample(points, 9)), 9)
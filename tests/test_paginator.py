@@ -0,0 +1,140 @@
+import base64
+import json
+
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.urls import reverse
+
+from tracker.apps.activities.models import Activity
+from tracker.core.utils import KeysetPaginator
+
+from .utils import create_activity, create_shoes, create_user
+
+
+def make_cursor(data: object) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+class KeysetPaginatorTest(TestCase):
+    def setUp(self) -> None:
+        shoes = create_shoes(create_user())
+        # Three activities a day, ties on `created` and `pace`
+        for i in range(25):
+            create_activity(shoes, day=i // 3, distance=5000, duration=1500 + i % 4 * 60)
+        self.queryset = Activity.objects.all()
+
+    def get_pages(self, queryset: QuerySet, order: str) -> list[KeysetPaginator]:
+        """Follows `next` cursors from the first page to the last"""
+        pages = [KeysetPaginator(queryset, step=10, order=order)]
+        while pages[-1].next:
+            pages.append(KeysetPaginator(queryset, pages[-1].next, step=10, order=order))
+        return pages
+
+    def assertPages(self, order: str, ordering: list[str]) -> None:
+        pages = self.get_pages(self.queryset, order)
+        expected = list(self.queryset.order_by(*ordering).values_list('id', flat=True))
+        self.assertEqual([len(page.objects) for page in pages], [10, 10, 5])
+        # Every activity once, ties ordered by ID
+        self.assertEqual([activity.id for page in pages for activity in page.objects], expected)
+
+        # Back from the last page
+        self.assertIsNone(pages[0].previous)
+        for page, previous_page in zip(pages[:0:-1], pages[-2::-1]):
+            paginator = KeysetPaginator(self.queryset, page.previous, step=10, order=order)
+            self.assertEqual(paginator.objects, previous_page.objects)
+            self.assertEqual(paginator.next, previous_page.next)
+        self.assertIsNone(paginator.previous)
+
+    def test_newest(self) -> None:
+        self.assertPages('-created', ['-created', '-id'])
+
+    def test_fastest(self) -> None:
+        self.assertPages('pace', ['pace', 'id'])
+
+    def test_round_trip(self) -> None:
+        activity = self.queryset.order_by('-created', '-id')[3]
+        cursor = KeysetPaginator.encode_cursor(KeysetPaginator.NEXT, activity)
+        self.assertEqual(
+            KeysetPaginator.decode_cursor(cursor, Activity._meta.get_field('created')),
+            (KeysetPaginator.NEXT, activity.created, activity.id),
+        )
+
+        activity = self.queryset.order_by('pace', 'id')[3]
+        cursor = KeysetPaginator.encode_cursor(KeysetPaginator.PREVIOUS, activity, 'pace')
+        self.assertEqual(
+            KeysetPaginator.decode_cursor(cursor, Activity._meta.get_field('pace')),
+            (KeysetPaginator.PREVIOUS, activity.pace, activity.id),
+        )
+
+    def test_empty(self) -> None:
+        paginator = KeysetPaginator(Activity.objects.none())
+        self.assertEqual((paginator.objects, paginator.next, paginator.previous), ([], None, None))
+
+    def test_invalid_cursor(self) -> None:
+        first_page = KeysetPaginator(self.queryset, step=10)
+        activity = first_page.objects[-1]
+        cursors = [
+            'garbage',
+            '!!!',
+            base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+            make_cursor({'direction': 'n'}),
+            make_cursor(['n', activity.created.isoformat()]),
+            make_cursor(['x', activity.created.isoformat(), activity.id]),
+            make_cursor(['n', None, activity.id]),
+            make_cursor(['n', 'not a date', activity.id]),
+            make_cursor(['n', activity.created.isoformat(), 'not an id']),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                paginator = KeysetPaginator(self.queryset, cursor, step=10)
+                self.assertEqual(paginator.objects, first_page.objects)
+                self.assertEqual(paginator.next, first_page.next)
+                self.assertIsNone(paginator.previous)
+
+    def test_tampered_cursor(self) -> None:
+        # A cursor edited to another position pages from there, it can't leave the queryset
+        other_user_activity = create_activity(create_shoes(create_user('other')), day=30)
+        queryset = Activity.objects.filter(user_id=self.queryset.first().user_id)
+        cursor = make_cursor(['n', other_user_activity.created.isoformat(), other_user_activity.id])
+        paginator = KeysetPaginator(queryset, cursor, step=10)
+        self.assertEqual(paginator.objects, list(queryset.order_by('-created', '-id')[:10]))
+
+
+class ShoeActivitiesApiTest(TestCase):
+    def setUp(self) -> None:
+        self.user = create_user()
+        self.shoes = create_shoes(self.user)
+        for i in range(25):
+            create_activity(self.shoes, day=i)
+        self.client.force_login(self.user)
+
+    def get(self, cursor: str = '') -> dict:
+        params: dict[str, str | int] = {'shoes': self.shoes.id, 'cursor': cursor}
+        response = self.client.get(reverse('api:shoes:activities'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_pages(self) -> None:
+        first_page = self.get()
+        latest = self.shoes.activities.latest('created')
+        self.assertEqual(first_page['activities'][0], {
+            'id': latest.id,
+            'name': latest.name,
+            'created': '2024-01-25T06:00:00+00:00',
+            'distance': '5.00 km',
+            'pace': '5:00 min/km',
+        })
+        self.assertEqual(len(first_page['activities']), 20)
+        self.assertIsNone(first_page['pagination']['previous'])
+
+        # Cursors of the response page through the rest and back
+        second_page = self.get(cursor=first_page['pagination']['next'])
+        self.assertEqual(len(second_page['activities']), 5)
+        self.assertIsNone(second_page['pagination']['next'])
+        self.assertEqual(self.get(cursor=second_page['pagination']['previous']), first_page)
+
+    def test_invalid(self) -> None:
+        other_shoes = create_shoes(create_user('other'))
+        response = self.client.get(reverse('api:shoes:activities'), {'shoes': other_shoes.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'status': 'error'})
@@ -0,0 +1,76 @@
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase
+
+from tracker.apps.webhooks.models import StravaEvent
+from tracker.apps.webhooks.partitions import (
+    DEFAULT_PARTITION,
+    create_partitions,
+    drop_partitions,
+    get_partition_name,
+    get_partitions,
+)
+
+
+class PartitionTest(TestCase):
+    def setUp(self) -> None:
+        self.today = datetime.now(dt_timezone.utc).date()
+        # Start from the default partition alone, migrations create the upcoming days
+        with connection.cursor() as cursor:
+            for name in get_partitions(cursor).values():
+                cursor.execute(f'DROP TABLE {name}')
+
+    def get_partition(self, event: StravaEvent) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT tableoid::regclass::text FROM {StravaEvent._meta.db_table} WHERE id = %s', [event.id]
+            )
+            return cursor.fetchone()[0]
+
+    def create_event(self, day_offset: int) -> StravaEvent:
+        received_at = datetime.combine(self.today + timedelta(days=day_offset), time(12), tzinfo=dt_timezone.utc)
+        return StravaEvent.objects.create(received_at=received_at, payload={})
+
+    def test_create(self) -> None:
+        self.assertEqual(
+            create_partitions(days_ahead=2), [get_partition_name(self.today + timedelta(days=i)) for i in range(3)]
+        )
+        # Existing partitions are kept
+        self.assertEqual(create_partitions(days_ahead=3), [get_partition_name(self.today + timedelta(days=3))])
+
+        event = self.create_event(1)
+        self.assertEqual(self.get_partition(event), get_partition_name(self.today + timedelta(days=1)))
+
+    def test_default_rows(self) -> None:
+        # Received before their day's partition existed
+        create_partitions(days_ahead=0)
+        events = [self.create_event(2), self.create_event(2), self.create_event(5)]
+        for event in events:
+            self.assertEqual(self.get_partition(event), DEFAULT_PARTITION)
+
+        create_partitions(days_ahead=3)
+        self.assertEqual(self.get_partition(events[0]), get_partition_name(self.today + timedelta(days=2)))
+        self.assertEqual(self.get_partition(events[1]), get_partition_name(self.today + timedelta(days=2)))
+        self.assertEqual(self.get_partition(events[2]), DEFAULT_PARTITION)
+        self.assertEqual(StravaEvent.objects.count(), 3)
+
+        # The default partition is attached again
+        event = self.create_event(10)
+        self.assertEqual(self.get_partition(event), DEFAULT_PARTITION)
+
+    def test_drop(self) -> None:
+        create_partitions(days_ahead=0)
+        with connection.cursor() as cursor:
+            old_day = self.today - timedelta(days=40)
+            start = datetime.combine(old_day, time.min, tzinfo=dt_timezone.utc)
+            cursor.execute(
+                f'CREATE TABLE {get_partition_name(old_day)} PARTITION OF {StravaEvent._meta.db_table} '
+                'FOR VALUES FROM (%s) TO (%s)',
+                [start, start + timedelta(days=1)],
+            )
+
+        self.assertEqual(drop_partitions(keep_days=30), [get_partition_name(old_day)])
+        with connection.cursor() as cursor:
+            self.assertEqual(list(get_partitions(cursor)), [self.today])
@@ -0,0 +1,190 @@
+from io import StringIO
+from unittest import mock
+
+import httpx
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import TestCase
+
+from libraries.strava.client import StravaClient
+from libraries.strava.fake import FakeStrava
+from libraries.strava.tokens import get_token_cache_key
+from tracker.apps.users.models import StravaProfile, User
+from tracker.apps.webhooks import queue
+from tracker.apps.webhooks.management.commands.strava_webhook_worker import Command
+from tracker.apps.webhooks.models import StravaEvent
+from tracker.apps.webhooks.processing import InvalidEvent, process_events
+from tracker.apps.webhooks.resolver import get_athlete_key, local_cache
+
+from .utils import clear_redis, create_shoes, create_user
+
+
+class ProcessingTestCase(TestCase):
+    """Two athletes of a fake Strava API with 5 runs each, athlete 1 owns activities 1 to 5"""
+
+    def setUp(self) -> None:
+        self.fake = FakeStrava(athletes=2, activities_per_athlete=5, shoes_per_athlete=1)
+        for activity in self.fake.activities.values():
+            activity['type'] = 'Run'
+        client = StravaClient(transport=self.fake.transport())
+        self.addCleanup(client.close)
+        patcher = mock.patch('libraries.strava.client._client', client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Athlete 3 is unknown, mappings left by other tests are dropped
+        self.clear_athletes()
+        self.addCleanup(self.clear_athletes)
+        self.users = {athlete_id: self.create_athlete(athlete_id) for athlete_id in self.fake.athletes}
+
+    def clear_athletes(self) -> None:
+        for athlete_id in range(1, 4):
+            cache.delete(get_athlete_key(str(athlete_id)))
+            local_cache.delete(get_athlete_key(str(athlete_id)))
+
+    def create_athlete(self, athlete_id: int) -> User:
+        user = create_user(f'athlete{athlete_id}')
+        StravaProfile.objects.create(
+            user=user, athlete_id=str(athlete_id), access_token='', refresh_token='', expires_at=0
+        )
+        for gear in self.fake.athletes[athlete_id]['shoes']:
+            create_shoes(user, gear['name'], strava_id=gear['id'])
+        cache.set(get_token_cache_key(user.id), f'token-{athlete_id}')
+        self.addCleanup(cache.delete, get_token_cache_key(user.id))
+        return user
+
+    def make_event(self, activity_id: int, aspect_type: str = 'create', athlete_id: int = 0) -> dict:
+        """Unknown activities are sent for `athlete_id`"""
+        if activity_id not in self.fake.activities:
+            return {**self.fake.make_event(1, aspect_type), 'object_id': activity_id, 'owner_id': athlete_id}
+        event = self.fake.make_event(activity_id, aspect_type)
+        if athlete_id:
+            event['owner_id'] = athlete_id
+        return event
+
+
+class ProcessEventsTest(ProcessingTestCase):
+    def test_mixed_athletes(self) -> None:
+        events = [self.make_event(1), self.make_event(6), self.make_event(2), self.make_event(7)]
+        self.assertEqual(process_events(events), [None] * 4)
+
+        # Each activity is imported for its owner
+        self.assertEqual(set(self.users[1].activities.values_list('strava_id', flat=True)), {'1', '2'})
+        self.assertEqual(set(self.users[2].activities.values_list('strava_id', flat=True)), {'6', '7'})
+        for user in self.users.values():
+            shoes = user.shoes.get()
+            self.assertEqual(shoes.activity_count, 2)
+
+    def test_delete(self) -> None:
+        process_events([self.make_event(1), self.make_event(6)])
+        events = [self.make_event(1, 'delete'), self.make_event(7), self.make_event(6, 'delete')]
+        self.assertEqual(process_events(events), [None] * 3)
+        self.assertFalse(self.users[1].activities.exists())
+        self.assertEqual(list(self.users[2].activities.values_list('strava_id', flat=True)), ['7'])
+
+    def test_partial_failure(self) -> None:
+        # Another athlete's activity, an unknown athlete and an unknown activity fail alone
+        events = [
+            self.make_event(1),
+            self.make_event(6, athlete_id=1),
+            self.make_event(2, athlete_id=3),
+            self.make_event(99, athlete_id=2),
+            self.make_event(7),
+        ]
+        errors = process_events(events)
+
+        self.assertEqual([type(error) for error in errors], [
+            type(None), httpx.HTTPStatusError, InvalidEvent, httpx.HTTPStatusError, type(None)
+        ])
+        self.assertEqual(list(self.users[1].activities.values_list('strava_id', flat=True)), ['1'])
+        self.assertEqual(list(self.users[2].activities.values_list('strava_id', flat=True)), ['7'])
+
+    def test_database_error(self) -> None:
+        # The athlete's events fail together, the other athlete's are written
+        with mock.patch(
+            'tracker.apps.webhooks.processing.import_strava_activities',
+            side_effect=[OperationalError('deadlock detected'), (1, 0)],
+        ):
+            errors = process_events([self.make_event(1), self.make_event(2), self.make_event(6)])
+
+        self.assertIsInstance(errors[0], OperationalError)
+        self.assertIs(errors[1], errors[0])
+        self.assertIsNone(errors[2])
+
+
+class WorkerTest(ProcessingTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        clear_redis('strava-webhooks:*')
+        self.addCleanup(clear_redis, 'strava-webhooks:*')
+        self.connection = queue.get_connection()
+        self.worker = Command(stdout=StringIO(), stderr=StringIO())
+        self.worker.name = 'worker'
+        # The test transaction would count as a broken connection
+        patcher = mock.patch(
+            'tracker.apps.webhooks.management.commands.strava_webhook_worker.close_old_connections'
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self, events: list[dict]) -> list[bytes]:
+        """Queues the events with their log rows and takes them like the worker loop"""
+        for event in events:
+            log = StravaEvent.objects.create(payload=event)
+            self.connection.lpush(queue.QUEUE_KEY, queue.Envelope(event, 0, log_ids=[log.id]).dumps())
+        return queue.fetch_batch(self.worker.name, 50, timeout=0)
+
+    def get_statuses(self) -> list[int]:
+        return list(StravaEvent.objects.order_by('id').values_list('status', flat=True))
+
+    def test_processing_list(self) -> None:
+        batch = self.fetch([self.make_event(1), self.make_event(6)])
+
+        # Held by the worker until processed
+        self.assertEqual(self.connection.llen(queue.QUEUE_KEY), 0)
+        self.assertEqual(self.connection.lrange(queue.get_processing_key('worker'), 0, -1), batch[::-1])
+
+        self.worker.process(batch)
+        self.assertEqual(self.connection.llen(queue.get_processing_key('worker')), 0)
+        self.assertEqual(self.get_statuses(), [StravaEvent.Status.PROCESSED] * 2)
+
+    def test_crash(self) -> None:
+        # Events of a worker stopped mid-batch are recovered, not lost
+        batch = self.fetch([self.make_event(1), self.make_event(6)])
+        with mock.patch.object(queue, 'ack', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.worker.process(batch)
+
+        self.assertEqual(queue.recover('worker'), 2)
+        self.worker.process(queue.fetch_batch('worker', 50, timeout=0))
+        self.assertEqual(set(self.users[1].activities.values_list('strava_id', flat=True)), {'1'})
+        self.assertEqual(self.connection.llen(queue.get_processing_key('worker')), 0)
+
+    def test_partial_failure(self) -> None:
+        batch = self.fetch([self.make_event(1), self.make_event(99, athlete_id=1), self.make_event(6)])
+        self.worker.process(batch)
+
+        # The unknown activity is dead-lettered, the rest of the batch is processed
+        self.assertEqual(self.connection.llen(queue.get_processing_key('worker')), 0)
+        self.assertEqual(self.connection.llen(queue.DEAD_LETTER_KEY), 1)
+        self.assertEqual(
+            self.get_statuses(),
+            [StravaEvent.Status.PROCESSED, StravaEvent.Status.FAILED, StravaEvent.Status.PROCESSED],
+        )
+
+    def test_retry(self) -> None:
+        batch = self.fetch([self.make_event(1), self.make_event(2), self.make_event(6)])
+        with mock.patch(
+            'tracker.apps.webhooks.management.commands.strava_webhook_worker.process_events',
+            side_effect=[OperationalError('deadlock detected'), [None]],
+        ):
+            self.worker.process(batch)
+
+        # Every event is either done or scheduled again
+        self.assertEqual(self.connection.llen(queue.get_processing_key('worker')), 0)
+        self.assertEqual(self.connection.zcard(queue.RETRY_KEY), 2)
+        self.assertEqual(
+            self.get_statuses(),
+            [StravaEvent.Status.RETRYING, StravaEvent.Status.RETRYING, StravaEvent.Status.PROCESSED],
+        )
@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tracker.apps.photos.models import PhotoCategory
+from tracker.core.constants import MeasurementUnit
+
+from .utils import create_activity, create_photo, create_shoes, create_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class QueryCountTest(TestCase):
+    """List pages run the same number of queries however many rows they show"""
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        self.user = create_user(measurement_unit=MeasurementUnit.MILES)
+        self.shoes = create_shoes(self.user)
+        self.category = PhotoCategory.objects.create(shoes=self.shoes, name='Outsole')
+        self.client.force_login(self.user)
+        self.day = 0
+
+    def add_activities(self, count: int) -> None:
+        for _ in range(count):
+            self.day += 1
+            activity = create_activity(self.shoes, day=self.day, shoe_distance=self.day * 5000)
+            create_photo(self.category, activity)
+            create_photo(self.category, activity)
+
+    def assertConstantQueries(self, url: str) -> None:
+        """Requests `url` with one and with ten rows, with photos, and compares the query counts"""
+        self.add_activities(1)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.add_activities(9)
+        with self.assertNumQueries(len(context.captured_queries)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'mile')
+
+    def test_activities(self) -> None:
+        self.assertConstantQueries(f'{reverse("web:activities:index")}?filter=all')
+
+    def test_shoe_activities(self) -> None:
+        self.assertConstantQueries(reverse('web:shoes:activities', args=[self.shoes.id]))
+
+    def test_photos(self) -> None:
+        self.assertConstantQueries(f'{reverse("api:shoes:photos")}?photo_category={self.category.id}')
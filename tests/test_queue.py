@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from tracker.apps.webhooks import queue
+
+from .utils import clear_redis
+
+NOW = 1_700_000_000.0
+
+
+def make_event(
+    object_id: int, aspect_type: str = 'update', event_time: int = 0, updates: Optional[dict] = None
+) -> dict:
+    return {
+        'aspect_type': aspect_type,
+        'event_time': event_time or int(NOW),
+        'object_id': object_id,
+        'object_type': 'activity',
+        'owner_id': 1,
+        'subscription_id': 1,
+        'updates': updates or {},
+    }
+
+
+@override_settings(STRAVA_WEBHOOK_COALESCE_WINDOW=10, STRAVA_WEBHOOK_MAX_ATTEMPTS=3, STRAVA_WEBHOOK_RETRY_BACKOFF=30)
+class QueueTest(SimpleTestCase):
+    def setUp(self) -> None:
+        clear_redis('strava-webhooks:*')
+        self.addCleanup(clear_redis, 'strava-webhooks:*')
+        self.connection = queue.get_connection()
+
+    def enqueue(self, event: dict, at: float = NOW, log_id: int = 0, replay: bool = False) -> bool:
+        with mock.patch('tracker.apps.webhooks.queue.time.time', return_value=at):
+            return queue.enqueue(event, log_id, replay)
+
+    def flush(self, at: float) -> int:
+        with mock.patch('tracker.apps.webhooks.queue.time.time', return_value=at):
+            return queue.flush_due_events()
+
+    def get_pending(self, event: dict) -> queue.Envelope:
+        return queue.Envelope.loads(self.connection.get(queue.get_pending_key(event)))
+
+    def fetch_all(self) -> list[queue.Envelope]:
+        return [queue.Envelope.loads(raw) for raw in queue.fetch_batch('worker', 100, timeout=0)]
+
+    def test_duplicate_delivery(self) -> None:
+        event = make_event(1)
+        self.assertTrue(self.enqueue(event, log_id=1))
+        self.assertFalse(self.enqueue(event, log_id=2))
+
+        self.assertEqual(self.get_pending(event).log_ids, [1])
+        self.assertEqual(queue.get_queue_status()['duplicates'], 1)
+        # Replays of the log skip the check
+        self.assertTrue(self.enqueue(event, log_id=2, replay=True))
+        self.assertEqual(self.get_pending(event).log_ids, [1, 2])
+
+    def test_coalesce(self) -> None:
+        self.enqueue(make_event(1, 'create'), log_id=1)
+        self.enqueue(make_event(1, event_time=int(NOW) + 5, updates={'title': 'Run'}), at=NOW + 5, log_id=2)
+        self.enqueue(make_event(1, event_time=int(NOW) + 3, updates={'type': 'Walk'}), at=NOW + 8, log_id=3)
+
+        # One entry, due when the window of the first event closes
+        self.assertEqual(self.connection.zrange(queue.DUE_KEY, 0, -1, withscores=True), [
+            (queue.get_pending_key(make_event(1)).encode(), NOW + 10)
+        ])
+        self.assertEqual(self.flush(NOW + 9), 0)
+        self.assertEqual(self.flush(NOW + 10), 1)
+
+        (envelope,) = self.fetch_all()
+        self.assertEqual(envelope.event['aspect_type'], 'create')
+        self.assertEqual(envelope.event['event_time'], int(NOW) + 5)
+        self.assertEqual(envelope.event['updates'], {'title': 'Run', 'type': 'Walk'})
+        self.assertEqual(envelope.log_ids, [1, 2, 3])
+        self.assertEqual(envelope.received_at, NOW)
+        self.assertEqual(queue.get_queue_status()['coalesced'], 2)
+
+    def test_delete_supersedes(self) -> None:
+        for aspect_types in (['create', 'delete', 'update'], ['update', 'delete'], ['delete', 'create']):
+            with self.subTest(aspect_types=aspect_types):
+                clear_redis('strava-webhooks:*')
+                for i, aspect_type in enumerate(aspect_types):
+                    self.enqueue(make_event(1, aspect_type, event_time=int(NOW) + i), at=NOW + i, log_id=i + 1)
+                self.flush(NOW + 10)
+
+                (envelope,) = self.fetch_all()
+                self.assertEqual(envelope.event['aspect_type'], 'delete')
+                self.assertEqual(envelope.log_ids, list(range(1, len(aspect_types) + 1)))
+
+    def test_order(self) -> None:
+        # Activities are queued in the order their first event arrived, later events don't move them back
+        self.enqueue(make_event(1), at=NOW)
+        self.enqueue(make_event(2), at=NOW + 1)
+        self.enqueue(make_event(3), at=NOW + 2)
+        self.enqueue(make_event(1, event_time=int(NOW) + 3), at=NOW + 3)
+        self.assertEqual(self.flush(NOW + 11), 2)
+        self.assertEqual(self.flush(NOW + 12), 1)
+        self.assertEqual([envelope.event['object_id'] for envelope in self.fetch_all()], [1, 2, 3])
+
+    def test_concurrent_enqueue(self) -> None:
+        # WATCH retries merges that raced, no event is lost or queued twice
+        events = [make_event(1, event_time=int(NOW) + i, updates={f'field{i}': i}) for i in range(20)]
+        with mock.patch('tracker.apps.webhooks.queue.time.time', return_value=NOW):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda i: queue.enqueue(events[i], i + 1), range(len(events))))
+
+        self.assertEqual(self.flush(NOW + 10), 1)
+        (envelope,) = self.fetch_all()
+        self.assertEqual(sorted(envelope.log_ids), list(range(1, 21)))
+        self.assertEqual(envelope.event['updates'], {f'field{i}': i for i in range(20)})
+        self.assertEqual(envelope.event['event_time'], int(NOW) + 19)
+
+    def test_concurrent_flush(self) -> None:
+        for object_id in range(50):
+            self.enqueue(make_event(object_id))
+        with mock.patch('tracker.apps.webhooks.queue.time.time', return_value=NOW + 10):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                flushed = list(executor.map(lambda _: queue.flush_due_events(), range(4)))
+
+        self.assertEqual(sum(flushed), 50)
+        self.assertEqual(sorted(envelope.event['object_id'] for envelope in self.fetch_all()), list(range(50)))
+
+    def test_retry(self) -> None:
+        self.enqueue(make_event(1))
+        self.flush(NOW + 10)
+        (raw,) = queue.fetch_batch('worker', 10, timeout=0)
+
+        with mock.patch('tracker.apps.webhooks.queue.time.time', return_value=NOW):
+            self.assertTrue(queue.retry('worker', raw, 'Timeout'))
+        self.assertEqual(self.connection.llen(queue.get_processing_key('worker')), 0)
+        with mock.patch('tracker.apps.webhooks.queue.time.time', return_value=NOW + 29):
+            self.assertEqual(queue.schedule_due_retries(), 0)
+        with mock.patch('tracker.apps.webhooks.queue.time.time', return_value=NOW + 30):
+            self.assertEqual(queue.schedule_due_retries(), 1)
+
+        (envelope,) = self.fetch_all()
+        self.assertEqual((envelope.attempts, envelope.error), (1, 'Timeout'))
+
+    def test_dead_letter(self) -> None:
+        self.enqueue(make_event(1))
+        self.flush(NOW + 10)
+        (raw,) = queue.fetch_batch('worker', 10, timeout=0)
+        envelope = queue.Envelope.loads(raw)
+        envelope.attempts = 2
+        raw = envelope.dumps().encode()
+        self.connection.lset(queue.get_processing_key('worker'), 0, raw)
+
+        self.assertFalse(queue.retry('worker', raw, 'Not found'))
+        self.assertEqual(queue.get_queue_status()['dead'], 1)
+        self.assertEqual(queue.requeue_dead_letters(), 1)
+        (envelope,) = self.fetch_all()
+        self.assertEqual((envelope.attempts, envelope.error), (0, ''))
+
+    def test_recover(self) -> None:
+        for object_id in range(3):
+            self.enqueue(make_event(object_id), at=NOW + object_id)
+        self.flush(NOW + 20)
+        queue.fetch_batch('crashed', 2, timeout=0)
+
+        # Held events go back to the front of the queue in their order
+        self.assertEqual(queue.recover('crashed'), 2)
+        self.assertEqual([envelope.event['object_id'] for envelope in self.fetch_all()], [0, 1, 2])
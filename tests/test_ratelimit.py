@@ -0,0 +1,51 @@
+from typing import Any
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from libraries.strava.ratelimit import WAITING_KEY, Priority, aacquire, acquire
+
+from .utils import clear_redis
+
+
+@override_settings(STRAVA_RATE_LIMIT_MAX_WAIT=60)
+class WaitingTest(SimpleTestCase):
+    def setUp(self) -> None:
+        clear_redis('*strava-ratelimit:*')
+        self.addCleanup(clear_redis, '*strava-ratelimit:*')
+
+    def expire_waiting(self, *args: Any) -> None:
+        """Stands for a sleep outlasting the TTL of the waiting count"""
+        self.assertEqual(cache.get(WAITING_KEY), 1)
+        cache.delete(WAITING_KEY)
+
+    def test_ttl_refreshed(self) -> None:
+        # Started by an earlier waiter, about to expire
+        cache.set(WAITING_KEY, 1, timeout=1)
+
+        def sleep(seconds: float) -> None:
+            self.assertEqual(cache.get(WAITING_KEY), 2)
+            self.assertGreater(cache.ttl(WAITING_KEY), 50)  # type: ignore[attr-defined]
+
+        with mock.patch('libraries.strava.ratelimit._reserve', side_effect=[5, 0]):
+            with mock.patch('libraries.strava.ratelimit.time.sleep', side_effect=sleep):
+                acquire(Priority.BACKGROUND)
+        self.assertEqual(cache.get(WAITING_KEY), 1)
+
+    def test_expired(self) -> None:
+        with mock.patch('libraries.strava.ratelimit._reserve', side_effect=[5, 0]):
+            with mock.patch('libraries.strava.ratelimit.time.sleep', side_effect=self.expire_waiting):
+                acquire(Priority.BACKGROUND)
+        self.assertIsNone(cache.get(WAITING_KEY))
+
+    def test_expired_async(self) -> None:
+        async def sleep(seconds: float) -> None:
+            self.expire_waiting()
+
+        with mock.patch('libraries.strava.ratelimit._reserve', side_effect=[5, 0]):
+            with mock.patch('libraries.strava.ratelimit.asyncio.sleep', side_effect=sleep):
+                async_to_sync(aacquire)(Priority.BACKGROUND)
+        self.assertIsNone(cache.get(WAITING_KEY))
@@ -0,0 +1,108 @@
+from django.test import TestCase
+
+from tracker.apps.activities.models import Activity
+from tracker.apps.activities.utils import (
+    delete_activities,
+    import_strava_activities,
+    update_activity_shoe_distances,
+    update_shoe_distances,
+)
+from tracker.apps.shoes.models import Shoes
+
+from .utils import create_activity, create_shoes, create_user, make_strava_activity
+
+
+class ShoeDistancesTest(TestCase):
+    """`shoe_distance` of every activity from a change onwards is the running total of its shoe"""
+
+    def setUp(self) -> None:
+        self.user = create_user()
+        self.shoes = create_shoes(self.user, 'Road')
+        self.other_shoes = create_shoes(self.user, 'Trail')
+        # Days 0, 2, 4, 6 and 8, 1 km to 5 km
+        import_strava_activities(self.user, [
+            make_strava_activity(self.shoes, str(i), day=i * 2, distance=(i + 1) * 1000) for i in range(5)
+        ])
+
+    def assertShoeDistances(self, shoes: Shoes) -> None:
+        activities = shoes.activities.order_by('created', 'id')
+        expected = []
+        total = 0.0
+        for activity in activities:
+            total += activity.distance
+            expected.append((activity.id, total))
+        self.assertEqual([(activity.id, activity.shoe_distance) for activity in activities], expected)
+
+    def test_import(self) -> None:
+        self.assertEqual(
+            list(self.shoes.activities.order_by('created').values_list('shoe_distance', flat=True)),
+            [1000, 3000, 6000, 10000, 15000],
+        )
+
+    def test_backdated_insert(self) -> None:
+        activity = create_activity(self.shoes, day=3, distance=500)
+        before = dict(self.shoes.activities.filter(created__lt=activity.created).values_list('id', 'shoe_distance'))
+
+        # The new activity and the three after it
+        self.assertEqual(update_shoe_distances({self.shoes.id: activity.created}), 4)
+        self.assertShoeDistances(self.shoes)
+        # Activities before the change are left alone
+        self.assertEqual(
+            dict(self.shoes.activities.filter(created__lt=activity.created).values_list('id', 'shoe_distance')),
+            before,
+        )
+
+    def test_backdated_import(self) -> None:
+        import_strava_activities(self.user, [make_strava_activity(self.shoes, '5', day=1, distance=500)])
+        self.assertEqual(
+            list(self.shoes.activities.order_by('created').values_list('shoe_distance', flat=True)),
+            [1000, 1500, 3500, 6500, 10500, 15500],
+        )
+        self.assertShoeDistances(self.shoes)
+
+    def test_same_time(self) -> None:
+        # Ties on `created` are ordered by ID
+        first = self.shoes.activities.get(strava_id='2')
+        create_activity(self.shoes, day=4, distance=500)
+        update_shoe_distances({self.shoes.id: first.created})
+        self.assertShoeDistances(self.shoes)
+
+    def test_delete(self) -> None:
+        delete_activities(self.user, [self.shoes.activities.get(strava_id='1').id])
+        self.assertEqual(
+            list(self.shoes.activities.order_by('created').values_list('shoe_distance', flat=True)),
+            [1000, 4000, 8000, 13000],
+        )
+        self.assertShoeDistances(self.shoes)
+
+    def test_move(self) -> None:
+        import_strava_activities(self.user, [make_strava_activity(self.other_shoes, '2', day=4, distance=3000)])
+        self.assertEqual(
+            list(self.shoes.activities.order_by('created').values_list('shoe_distance', flat=True)),
+            [1000, 3000, 7000, 12000],
+        )
+        self.assertEqual(list(self.other_shoes.activities.values_list('shoe_distance', flat=True)), [3000])
+        self.assertShoeDistances(self.shoes)
+        self.assertShoeDistances(self.other_shoes)
+
+    def test_move_backwards(self) -> None:
+        # The activity moves before its old place, both times are recomputed
+        import_strava_activities(self.user, [make_strava_activity(self.shoes, '3', day=1, distance=4000)])
+        self.assertEqual(
+            list(self.shoes.activities.order_by('created').values_list('shoe_distance', flat=True)),
+            [1000, 5000, 7000, 10000, 15000],
+        )
+        self.assertShoeDistances(self.shoes)
+
+    def test_unchanged_rows(self) -> None:
+        # Rows already up to date aren't rewritten
+        self.assertEqual(update_shoe_distances({self.shoes.id: self.shoes.activities.earliest('created').created}), 0)
+
+        Activity.objects.filter(strava_id='4').update(shoe_distance=None)
+        update_activity_shoe_distances(self.shoes)
+        self.assertShoeDistances(self.shoes)
+
+    def test_activities_updated(self) -> None:
+        updated = Shoes.objects.get(id=self.shoes.id).activities_updated
+        update_shoe_distances({self.shoes.id: self.shoes.created})
+        self.assertGreater(Shoes.objects.get(id=self.shoes.id).activities_updated, updated)
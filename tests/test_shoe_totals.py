@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.test import TestCase
+
+from tracker.apps.activities.utils import delete_activities, import_strava_activities, update_shoe_totals
+from tracker.apps.shoes.models import Shoes
+
+from .utils import create_activity, create_shoes, create_user, make_strava_activity
+
+
+class ShoeTotalsTest(TestCase):
+    """`distance_covered` and `activity_count` match an aggregate of the shoe's activities after every write"""
+
+    def setUp(self) -> None:
+        self.user = create_user()
+        self.shoes = create_shoes(self.user, 'Road')
+        self.other_shoes = create_shoes(self.user, 'Trail')
+        import_strava_activities(self.user, [
+            make_strava_activity(self.shoes, str(i), day=i, distance=(i + 1) * 1000.5) for i in range(5)
+        ])
+
+    def assertTotals(self, shoes: Shoes, distance: float, count: int) -> None:
+        shoes.refresh_from_db()
+        aggregate = shoes.activities.aggregate(distance=Sum('distance', default=0.0), count=Count('id'))
+        self.assertAlmostEqual(shoes.distance_covered, aggregate['distance'])
+        self.assertEqual(shoes.activity_count, aggregate['count'])
+        self.assertAlmostEqual(shoes.distance_covered, distance)
+        self.assertEqual(shoes.activity_count, count)
+
+    def test_import(self) -> None:
+        self.assertTotals(self.shoes, 15007.5, 5)
+        self.assertTotals(self.other_shoes, 0, 0)
+
+    def test_reimport(self) -> None:
+        # Updated activities replace their old distance
+        import_strava_activities(self.user, [
+            make_strava_activity(self.shoes, '0', day=0, distance=2000),
+            make_strava_activity(self.shoes, '5', day=5, distance=3000),
+        ])
+        self.assertTotals(self.shoes, 15007.5 - 1000.5 + 2000 + 3000, 6)
+
+    def test_delete(self) -> None:
+        activity_ids = self.shoes.activities.filter(strava_id__in=['1', '2']).values_list('id', flat=True)
+        delete_activities(self.user, activity_ids)
+        self.assertTotals(self.shoes, 15007.5 - 2001 - 3001.5, 3)
+
+    def test_move(self) -> None:
+        import_strava_activities(self.user, [make_strava_activity(self.other_shoes, '4', day=4, distance=5002.5)])
+        self.assertTotals(self.shoes, 10005, 4)
+        self.assertTotals(self.other_shoes, 5002.5, 1)
+
+    def test_update_totals(self) -> None:
+        update_shoe_totals(added=[(self.shoes.id, 100), (self.other_shoes.id, 200)], removed=[(self.shoes.id, 100)])
+        self.shoes.refresh_from_db()
+        self.other_shoes.refresh_from_db()
+        self.assertAlmostEqual(self.shoes.distance_covered, 15007.5)
+        self.assertEqual(self.shoes.activity_count, 5)
+        self.assertEqual(self.other_shoes.distance_covered, 200)
+        self.assertEqual(self.other_shoes.activity_count, 1)
+
+
+class VerifyShoeTotalsTest(TestCase):
+    def setUp(self) -> None:
+        user = create_user()
+        self.shoes = create_shoes(user, 'Road')
+        self.other_shoes = create_shoes(user, 'Trail')
+        import_strava_activities(user, [make_strava_activity(self.shoes, '1', distance=1000)])
+        import_strava_activities(user, [make_strava_activity(self.other_shoes, '2', distance=2000)])
+
+    def call_command(self, *args: str) -> str:
+        stdout = StringIO()
+        call_command('verify_shoe_totals', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_no_drift(self) -> None:
+        self.assertEqual(self.call_command(), '0 drifted shoes found\n')
+
+    def test_drift(self) -> None:
+        # Written around the maintained counters
+        create_activity(self.shoes, day=1, distance=500)
+        Shoes.objects.filter(id=self.other_shoes.id).update(distance_covered=2000.5)
+
+        output = self.call_command()
+        self.assertIn(f'Shoes #{self.shoes.id}: distance 1000.00 != 1500.00, activities 1 != 2', output)
+        self.assertIn(f'Shoes #{self.other_shoes.id}: distance 2000.50 != 2000.00, activities 1 != 1', output)
+        self.assertIn('2 drifted shoes found', output)
+        # Found but not fixed
+        self.shoes.refresh_from_db()
+        self.assertEqual(self.shoes.distance_covered, 1000)
+
+    def test_fix(self) -> None:
+        create_activity(self.shoes, day=1, distance=500)
+        Shoes.objects.filter(id=self.other_shoes.id).update(distance_covered=0, activity_count=0)
+
+        self.assertIn('2 drifted shoes fixed', self.call_command('--fix'))
+        self.shoes.refresh_from_db()
+        self.other_shoes.refresh_from_db()
+        self.assertEqual((self.shoes.distance_covered, self.shoes.activity_count), (1500, 2))
+        self.assertEqual((self.other_shoes.distance_covered, self.other_shoes.activity_count), (2000, 1))
+        self.assertEqual(self.call_command(), '0 drifted shoes found\n')
+
+    def test_tolerance(self) -> None:
+        Shoes.objects.filter(id=self.shoes.id).update(distance_covered=1000.001)
+        self.assertEqual(self.call_command(), '0 drifted shoes found\n')
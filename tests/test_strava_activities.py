@@ -0,0 +1,54 @@
+from datetime import datetime
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from libraries.strava import aget_athlete_activities, get_athlete_activities, iter_athlete_activities
+from libraries.strava.client import StravaAsyncClient, StravaClient
+from libraries.strava.fake import FakeStrava
+from libraries.strava.tokens import get_token_cache_key
+from tracker.apps.users.models import StravaProfile
+
+from .utils import create_user
+
+
+class AthleteActivitiesTest(TestCase):
+    """Activity pages of a fake Strava API, served on the athlete activities path only"""
+
+    def setUp(self) -> None:
+        self.fake = FakeStrava(athletes=1, activities_per_athlete=25, shoes_per_athlete=1)
+        for activity in self.fake.activities.values():
+            activity['type'] = 'Run'
+        self.transport = self.fake.transport()
+        client = StravaClient(transport=self.transport)
+        self.addCleanup(client.close)
+        patcher = mock.patch('libraries.strava.client._client', client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = create_user()
+        StravaProfile.objects.create(user=self.user, athlete_id='1', access_token='', refresh_token='', expires_at=0)
+        cache.set(get_token_cache_key(self.user.id), 'token-1')
+        self.addCleanup(cache.delete, get_token_cache_key(self.user.id))
+        # Newest first, as Strava lists them
+        self.ids = sorted(self.fake.activities, key=lambda id: self.fake.activities[id]['start_date'], reverse=True)
+
+    def get_created(self, index: int) -> datetime:
+        return datetime.fromisoformat(self.fake.activities[self.ids[index]]['start_date'])
+
+    def test_pages(self) -> None:
+        activities = list(iter_athlete_activities(self.user, per_page=10))
+        self.assertEqual([activity.id for activity in activities], self.ids)
+
+    def test_after(self) -> None:
+        activities = get_athlete_activities(self.user, after=self.get_created(5))
+        self.assertEqual([activity.id for activity in activities], self.ids[:5])
+
+    def test_async(self) -> None:
+        client = StravaAsyncClient(transport=self.fake.async_transport())
+        with mock.patch('libraries.strava.get_async_client', return_value=client):
+            activities = async_to_sync(aget_athlete_activities)(self.user, after=self.get_created(12))
+        self.assertEqual([activity.id for activity in activities], self.ids[:12])
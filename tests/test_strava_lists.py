@@ -0,0 +1,57 @@
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+
+from django.test import TestCase
+from django.urls import reverse
+
+from libraries.strava import StravaShoes
+from tracker.core.constants import MeasurementUnit
+from tracker.web.activities import views as activity_views
+from tracker.web.shoes import views as shoe_views
+
+from .utils import create_shoes, create_user, make_strava_activity
+
+
+class StravaListTest(TestCase):
+    """The async `strava_list` views through the test client"""
+
+    def setUp(self) -> None:
+        self.user = create_user(measurement_unit=MeasurementUnit.MILES)
+        self.shoes = create_shoes(self.user, 'Road', strava_id='g1')
+
+    def test_async(self) -> None:
+        self.assertTrue(iscoroutinefunction(activity_views.strava_list))
+        self.assertTrue(iscoroutinefunction(shoe_views.strava_list))
+
+    def test_redirect(self) -> None:
+        for name in ('web:activities:strava_list', 'web:shoes:strava_list'):
+            url = reverse(name)
+            response = self.client.get(url)
+            self.assertRedirects(response, f'/auth/sign-in/?next={url}', fetch_redirect_response=False)
+
+    def test_activities(self) -> None:
+        self.client.force_login(self.user)
+        activities = [make_strava_activity(self.shoes, '1', name='Morning Run', distance=5000)]
+        with mock.patch('tracker.web.activities.views.aget_unregistered_strava_activities', return_value=activities):
+            response = self.client.get(reverse('web:activities:strava_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['new_activities'], [(activities[0], '3.11 mile')])
+        self.assertContains(response, 'Morning Run')
+        self.assertContains(response, '3.11 mile')
+
+    def test_shoes(self) -> None:
+        self.client.force_login(self.user)
+        strava_shoes = [
+            StravaShoes(id='g1', name='Road', nickname='', retired=False, distance=1000, converted_distance=1.0),
+            StravaShoes(id='g2', name='Trail', nickname='', retired=False, distance=2000, converted_distance=2.0),
+            StravaShoes(id='g3', name='Old', nickname='', retired=True, distance=3000, converted_distance=3.0),
+        ]
+        with mock.patch('tracker.web.shoes.views.aget_athlete_shoes', return_value=strava_shoes):
+            response = self.client.get(reverse('web:shoes:strava_list'))
+
+        self.assertEqual(response.status_code, 200)
+        # Registered and retired shoes aren't listed
+        self.assertEqual(response.context['new_shoes'], strava_shoes[1:2])
+        self.assertContains(response, '2.0 mile')
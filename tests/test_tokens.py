@@ -0,0 +1,105 @@
+import threading
+import time
+from io import StringIO
+from typing import Any
+from unittest import mock
+
+import httpx
+from asgiref.sync import async_to_sync
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from libraries.strava import StravaException
+from libraries.strava.tokens import (
+    TOKEN_URL,
+    aget_access_token,
+    get_token_cache_key,
+    get_token_lock_key,
+    refresh_access_token,
+)
+from tracker.apps.users.models import StravaProfile, User
+
+from .utils import create_user
+
+
+def make_token_response(access_token: str) -> httpx.Response:
+    data = {'access_token': access_token, 'refresh_token': 'refresh', 'expires_at': int(time.time()) + 6 * 60 * 60}
+    return httpx.Response(200, json=data, request=httpx.Request('POST', TOKEN_URL))
+
+
+class RefreshAccessTokenTest(TestCase):
+    def setUp(self) -> None:
+        self.user = self.create_profile('runner')
+
+    def create_profile(self, username: str) -> User:
+        user = create_user(username)
+        StravaProfile.objects.create(
+            user=user, athlete_id='1', access_token='old', refresh_token=username, expires_at=int(time.time())
+        )
+        cache.delete(get_token_cache_key(user.id))
+        self.addCleanup(cache.delete, get_token_cache_key(user.id))
+        return user
+
+    @mock.patch('libraries.strava.tokens.request_token', return_value=make_token_response('new'))
+    def test_refresh(self, request_token: mock.Mock) -> None:
+        self.assertEqual(refresh_access_token(self.user.id), 'new')
+        self.assertEqual(StravaProfile.objects.get(user=self.user).access_token, 'new')
+        self.assertEqual(cache.get(get_token_cache_key(self.user.id)), 'new')
+
+        # Cached now, no second refresh
+        self.assertEqual(refresh_access_token(self.user.id), 'new')
+        request_token.assert_called_once()
+
+    def test_async_refresh(self) -> None:
+        threads = []
+
+        def refresh_access_token(user_id: int) -> str:
+            threads.append(threading.current_thread())
+            return 'new'
+
+        # Refreshes wait on the lock and Strava, they don't hold the single thread of sync code
+        with mock.patch('libraries.strava.tokens.refresh_access_token', side_effect=refresh_access_token):
+            self.assertEqual(async_to_sync(aget_access_token)(self.user), 'new')
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    @override_settings(STRAVA_TOKEN_LOCK_TIMEOUT=0.1)
+    def test_lock_timeout(self) -> None:
+        lock = cache.lock(get_token_lock_key(self.user.id), timeout=5)  # type: ignore[attr-defined]
+        self.assertTrue(lock.acquire())
+        try:
+            with self.assertRaisesMessage(StravaException, 'Timed out waiting'):
+                refresh_access_token(self.user.id)
+        finally:
+            lock.release()
+
+    def test_lock_expired(self) -> None:
+        def request_token(*args: Any) -> httpx.Response:
+            # The lock expires during a slow refresh and another process takes it
+            cache.delete(get_token_lock_key(self.user.id))
+            cache.set(get_token_lock_key(self.user.id), 'other', timeout=5)
+            return make_token_response('new')
+
+        with mock.patch('libraries.strava.tokens.request_token', side_effect=request_token):
+            self.assertEqual(refresh_access_token(self.user.id), 'new')
+        # The other process' lock is left alone
+        self.assertEqual(cache.get(get_token_lock_key(self.user.id)), 'other')
+        cache.delete(get_token_lock_key(self.user.id))
+
+    def test_command(self) -> None:
+        other_user = self.create_profile('other')
+
+        def request_token(refresh_token: str, *args: Any) -> httpx.Response:
+            if refresh_token == 'runner':
+                raise httpx.ConnectError('Connection refused')
+            return make_token_response('new')
+
+        stdout, stderr = StringIO(), StringIO()
+        with mock.patch('libraries.strava.tokens.request_token', side_effect=request_token):
+            call_command('strava_refresh_tokens', stdout=stdout, stderr=stderr)
+
+        # A failed profile doesn't stop the others
+        self.assertEqual(stderr.getvalue(), f'User {self.user.id}: Connection refused\n')
+        self.assertEqual(stdout.getvalue(), '1 tokens refreshed\n')
+        self.assertEqual(StravaProfile.objects.get(user=other_user).access_token, 'new')
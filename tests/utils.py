@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import BytesIO
+from typing import Any, Optional
+
+from django_redis import get_redis_connection
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from libraries.strava import StravaActivity
+from tracker.apps.activities.models import Activity
+from tracker.apps.photos.models import Photo, PhotoCategory
+from tracker.apps.shoes.models import Shoes
+from tracker.apps.users.models import User
+
+START = datetime(2024, 1, 1, 6, tzinfo=dt_timezone.utc)
+
+
+def create_user(username: str = 'runner', **kwargs: Any) -> User:
+    return User.objects.create_user(password='password', username=username, **kwargs)
+
+
+def create_shoes(user: User, name: str = 'Shoes', strava_id: str = '', **kwargs: Any) -> Shoes:
+    return Shoes.objects.create(user=user, name=name, strava_id=strava_id or f'g{Shoes.objects.count() + 1}', **kwargs)
+
+
+def create_activity(shoes: Shoes, day: int = 0, distance: float = 5000, **kwargs: Any) -> Activity:
+    """Creates an activity without maintaining totals, as fixtures of raw rows"""
+    kwargs.setdefault('type', Activity.Type.RUN)
+    kwargs.setdefault('duration', 1500)
+    return Activity.objects.create(
+        user_id=shoes.user_id, shoes=shoes, distance=distance, created=START + timedelta(days=day), **kwargs
+    )
+
+
+def make_strava_activity(shoes: Shoes, id: str, day: int = 0, distance: float = 5000, **kwargs: Any) -> StravaActivity:
+    kwargs.setdefault('moving_time', 1500)
+    kwargs.setdefault('type', 'Run')
+    kwargs.setdefault('name', f'Activity {id}')
+    return StravaActivity(
+        id=id, distance=distance, created=START + timedelta(days=day), shoes_id=shoes.strava_id, shoes=shoes, **kwargs
+    )
+
+
+def create_photo(category: PhotoCategory, activity: Optional[Activity] = None) -> Photo:
+    buffer = BytesIO()
+    Image.new('RGB', (4, 4)).save(buffer, 'JPEG')
+    file = SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+    return Photo.objects.create(category=category, activity=activity, file=file)
+
+
+def clear_redis(pattern: str) -> None:
+    """Deletes the Redis keys matching `pattern`, tests share the cache database"""
+    connection = get_redis_connection('default')
+    for key in connection.scan_iter(pattern):
+        connection.delete(key)
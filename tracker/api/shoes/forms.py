@@ -1,6 +1,7 @@
 from typing import Any
 
 from django import forms
+from django.conf import settings
 
 from tracker.apps.photos.models import PhotoCategory
 from tracker.apps.users.models import User
@@ -20,3 +21,14 @@ class PhotoCategoriesForm(forms.Form):
     def __init__(self, user: User, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.fields['photo_category'].queryset = PhotoCategory.objects.filter(shoes__user=user)
+
+
+class MileageForm(UserShoesForm):
+    points = forms.IntegerField(required=False, min_value=3, max_value=settings.SHOE_MILEAGE_MAX_POINTS)
+
+    def clean_points(self) -> int:
+        return self.cleaned_data['points'] or settings.SHOE_MILEAGE_POINTS
+
+
+class ShoeActivitiesForm(UserShoesForm):
+    cursor = forms.CharField(required=False)
@@ -7,4 +7,6 @@ app_name = "shoes"
 urlpatterns = [
     path("photo-categories/", views.photo_categories, name="photo_categories"),
     path("photos/", views.photos, name="photos"),
+    path("mileage/", views.mileage, name="mileage"),
+    path("activities/", views.activities, name="activities"),
 ]
@@ -1,9 +1,11 @@
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, JsonResponse
 
-from tracker.core.utils import TrackerHttpRequest
+from tracker.apps.shoes.mileage import get_mileage
+from tracker.core.formatting import UnitFormatter
+from tracker.core.utils import KeysetPaginator, TrackerHttpRequest
 
-from .forms import UserShoesForm, PhotoCategoriesForm
+from .forms import MileageForm, ShoeActivitiesForm, UserShoesForm, PhotoCategoriesForm
 
 
 @login_required
@@ -23,12 +25,17 @@ def photos(request: TrackerHttpRequest) -> HttpResponse:
     form = PhotoCategoriesForm(data=request.GET or None, user=request.user)
     if form.is_valid():
         photo_category = form.cleaned_data['photo_category']
-        photos = photo_category.photos.order_by('created').select_related('activity')
+        photos = (
+            photo_category.photos.order_by('created').select_related('activity')
+            .only('category', 'file', 'created', 'activity', 'activity__shoe_distance')
+        )
 
+        # Photo categories belong to the user's shoes, format in their unit without loading `activity.user`
+        formatter = UnitFormatter.for_user(request.user)
         photo_data = []
         for photo in photos:
             if photo.activity_id:
-                name = f'Activity {photo.activity.get_shoe_distance_display()}'
+                name = f'Activity {formatter.format_distance(photo.activity.shoe_distance)}'
             else:
                 name = f'Photo {photo.created.strftime("%Y-%m-%d")}'
 
@@ -38,3 +45,44 @@ def photos(request: TrackerHttpRequest) -> HttpResponse:
         return JsonResponse({'status': 'ok', 'data': data})
 
     return JsonResponse({'status': 'error'}, status=400)
+
+
+@login_required
+def mileage(request: TrackerHttpRequest) -> HttpResponse:
+    form = MileageForm(data=request.GET or None, user=request.user)
+    if form.is_valid():
+        points = get_mileage(form.cleaned_data['shoes'], form.cleaned_data['points'])
+        # Cached in meters, converted for the viewer
+        formatter = UnitFormatter.for_user(request.user)
+        data = {
+            'unit': formatter.distance_unit,
+            'points': [[int(timestamp), round(distance / formatter.meters, 2)] for timestamp, distance in points],
+        }
+        return JsonResponse({'status': 'ok', 'data': data})
+
+    return JsonResponse({'status': 'error'}, status=400)
+
+
+@login_required
+def activities(request: TrackerHttpRequest) -> HttpResponse:
+    form = ShoeActivitiesForm(data=request.GET or None, user=request.user)
+    if form.is_valid():
+        activities = form.cleaned_data['shoes'].activities.only('shoes', 'name', 'created', 'distance', 'duration')
+        paginator = KeysetPaginator(activities, form.cleaned_data['cursor'])
+        UnitFormatter.for_user(request.user).format_activities(paginator.objects)
+        data = {
+            'activities': [
+                {
+                    'id': activity.id,
+                    'name': activity.name,
+                    'created': activity.created.isoformat(),
+                    'distance': activity.distance_display,
+                    'pace': activity.pace_display,
+                }
+                for activity in paginator.objects
+            ],
+            'pagination': paginator.to_dict(),
+        }
+        return JsonResponse({'status': 'ok', 'data': data})
+
+    return JsonResponse({'status': 'error'}, status=400)
@@ -5,12 +5,17 @@ from django.db.models import TextChoices
 
 from httpx import HTTPStatusError
 
-from libraries.strava import authorize_user
+from libraries.strava import authorize_user, cache_profile_token
 from tracker.apps.activities.models import Activity
+from tracker.apps.activities.utils import delete_activities
 from tracker.apps.users.models import User
+from tracker.apps.webhooks.resolver import resolve_shoes_id, resolve_user_id
 
 
-class NotificationForm(forms.Form):
+class NotificationEnvelopeForm(forms.Form):
+    """Checks the shape of a webhook event without touching the DB or Strava,
+    so events can be acknowledged right away and processed later
+    """
     class AspectType(TextChoices):
         CREATE = 'create'
         UPDATE = 'update'
@@ -26,14 +31,27 @@ class NotificationForm(forms.Form):
     event_time = forms.IntegerField()
     owner_id = forms.IntegerField()
     subscription_id = forms.IntegerField()
-    updates = forms.JSONField()
+    updates = forms.JSONField(required=False)
 
-    def clean_owner_id(self) -> User:
-        owner_id = self.cleaned_data['owner_id']
-        user = User.objects.filter(strava__profile__athlete_id=owner_id).first()
-        if not user:
+    def clean_object_type(self) -> str:
+        object_type = self.cleaned_data['object_type']
+        # We don't care about profile updates
+        if object_type == self.ObjectType.ATHLETE:
+            raise forms.ValidationError('Invalid object type', 'invalid_object_type')
+        return object_type
+
+    def clean_updates(self) -> dict:
+        return self.cleaned_data['updates'] or {}
+
+
+class NotificationForm(NotificationEnvelopeForm):
+    """Validates events of known athletes and gear from cache, only deletes read the DB"""
+
+    def clean_owner_id(self) -> int:
+        user_id = resolve_user_id(self.cleaned_data['owner_id'])
+        if not user_id:
             raise forms.ValidationError('Invalid owner ID', 'invalid_owner_id')
-        return user
+        return user_id
 
     def clean(self) -> dict:
         cleaned_data = super().clean()
@@ -41,44 +59,31 @@ class NotificationForm(forms.Form):
             return cleaned_data
 
         aspect_type = cleaned_data['aspect_type']
-        object_type = cleaned_data['object_type']
         object_id = cleaned_data['object_id']
-        user = cleaned_data['owner_id']
+        user_id = cleaned_data['owner_id']
         updates = self.cleaned_data['updates']
-        # We don't care about profile updates
-        if object_type == self.ObjectType.ATHLETE:
-            error = forms.ValidationError('Invalid object type', 'invalid_object_type')
-            self.add_error('object_type', error)
-            return cleaned_data
 
-        self.activity = Activity.objects.filter(strava_id=object_id).first()
-        if aspect_type == self.AspectType.DELETE and not self.activity:
-            error = forms.ValidationError(f'Activity ID {object_id} not found', 'invalid_activity_id')
-            self.add_error('object_id', error)
+        if aspect_type == self.AspectType.DELETE:
+            self.activity = Activity.objects.filter(user_id=user_id, strava_id=object_id).first()
+            if not self.activity:
+                error = forms.ValidationError(f'Activity ID {object_id} not found', 'invalid_activity_id')
+                self.add_error('object_id', error)
             return cleaned_data
 
-        if self.aspect_type != self.AspectType.DELETE:
-            gear_id = updates.get('gear_id')
-            self.shoes = user.shoes.filter(strava_id=gear_id).first()
-            if not self.shoes:
-                error = forms.ValidationError(f'Invalid gear ID {gear_id}', 'invalid_gear_id')
-                self.add_error('updates', error)
+        # Only gear changes are reported in `updates`, create events have none
+        if 'gear_id' in updates and not resolve_shoes_id(user_id, updates['gear_id']):
+            error = forms.ValidationError(f'Invalid gear ID {updates["gear_id"]}', 'invalid_gear_id')
+            self.add_error('updates', error)
 
         return cleaned_data
 
     def save(self) -> Optional[Activity]:
-        user = self.cleaned_data['owner_id']
-        aspect_type = self.cleaned_data['aspect_type']
-        object_id = self.cleaned_data['object_id']
-        activity: Optional[Activity] = None
-        if aspect_type == self.AspectType.DELETE:
-            self.activity.delete()
-            activity = None
-        else:
-            # Correct shoe is used
-            activity = Activity.update_or_create_from_strava(object_id, user)
+        user = User.objects.get(id=self.cleaned_data['owner_id'])
+        if self.cleaned_data['aspect_type'] == self.AspectType.DELETE:
+            delete_activities(user, [self.activity.id])
+            return None
 
-        return activity
+        return Activity.update_or_create_from_strava(self.cleaned_data['object_id'], user)
 
 
 class AuthorizationForm(forms.Form):
@@ -121,4 +126,5 @@ class AuthorizationForm(forms.Form):
     def save(self) -> User:
         self.profile.save()
         self.profile.user.save(update_fields=['measurement_unit'])
+        cache_profile_token(self.profile)
         return self.profile.user
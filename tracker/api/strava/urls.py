@@ -7,4 +7,5 @@ app_name = "strava"
 urlpatterns = [
     path("notification", views.Notification.as_view(), name="notification"),
     path("authorized", views.Authorized.as_view(), name="authorized"),
+    path("metrics", views.Metrics.as_view(), name="metrics"),
 ]
@@ -1,17 +1,27 @@
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 from rest_framework.request import Request
 from rest_framework.response import Response
 
 from django.conf import settings
 from django.shortcuts import redirect
 
+from libraries.strava.ratelimit import get_rate_limit_status
+from libraries.strava.retry import get_retry_status
+from tracker.api.permissions import IsSecure
 from tracker.api.views import BaseAPIView
 from tracker.api.response import ErrorResponse
+from tracker.apps.webhooks.models import StravaEvent
+from tracker.apps.webhooks.queue import enqueue, get_queue_status
+from tracker.apps.webhooks.utils import mark_events
 
-from .forms import AuthorizationForm, NotificationForm
+from .forms import AuthorizationForm, NotificationEnvelopeForm
 
 
 class Notification(BaseAPIView):
+    # Strava doesn't authenticate webhook calls
+    permission_classes = (IsSecure,)
+
     def get(self, request: Request) -> Response:
         mode = request.query_params.get('hub.mode')
         token = request.query_params.get('hub.verify_token')
@@ -23,17 +33,25 @@ class Notification(BaseAPIView):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
     def post(self, request: Request) -> Response:
-        form = NotificationForm(data=request.query_params)
+        # Strava posts events as a JSON body
+        form = NotificationEnvelopeForm(data=request.data)
+        event = StravaEvent(payload=request.data)
         if not form.is_valid():
+            event.status = StravaEvent.Status.INVALID
+            event.error = form.errors.as_json()
+            event.save()
             # Must return 200 to acknowledge webhook
             return ErrorResponse(form=form, status=status.HTTP_200_OK)
 
-        activity = form.save()
-        data = {
-            'status': 'ok',
-            'activity': activity.id if activity else None,
-        }
-        return Response(data=data, status=status.HTTP_200_OK)
+        event.owner_id = form.cleaned_data['owner_id']
+        event.object_id = form.cleaned_data['object_id']
+        event.aspect_type = form.cleaned_data['aspect_type']
+        event.save()
+
+        # Strava expects an answer within 2 seconds, events are processed by `strava_webhook_worker`
+        if not enqueue(form.cleaned_data, log_id=event.id):
+            mark_events([event.id], StravaEvent.Status.DUPLICATE)
+        return Response(data={'status': 'ok'}, status=status.HTTP_200_OK)
 
 
 class Authorized(BaseAPIView):
@@ -45,3 +63,16 @@ class Authorized(BaseAPIView):
         form.save()
 
         return redirect('web:activities:index')
+
+
+class Metrics(BaseAPIView):
+    permission_classes = (IsAdminUser, IsSecure)
+
+    def get(self, request: Request) -> Response:
+        data = {
+            'status': 'ok',
+            'rate_limit': get_rate_limit_status(),
+            'retry': get_retry_status(),
+            'webhooks': get_queue_status(),
+        }
+        return Response(data=data)
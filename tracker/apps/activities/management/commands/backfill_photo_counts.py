@@ -0,0 +1,43 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection
+from django.db.models import Max
+
+from tracker.apps.activities.models import Activity
+from tracker.apps.photos.models import Photo
+
+
+# Only rows whose count is off are written
+UPDATE_SQL = '''
+    UPDATE {activities} AS activity
+    SET photo_count = photos.count
+    FROM (
+        SELECT activity.id, COUNT(photo.id) AS count
+        FROM {activities} AS activity
+        LEFT JOIN {photos} AS photo ON photo.activity_id = activity.id
+        WHERE activity.id >= %s AND activity.id < %s
+        GROUP BY activity.id
+    ) AS photos
+    WHERE activity.id = photos.id AND activity.photo_count <> photos.count
+'''
+
+
+class Command(BaseCommand):
+    help = "Sets activities' photo count from their photos, in ID ranges so rows are locked briefly"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=10000, help='Activity IDs per UPDATE')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        batch_size = options['batch_size']
+        last_id = Activity.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        sql = UPDATE_SQL.format(activities=Activity._meta.db_table, photos=Photo._meta.db_table)
+
+        updated = 0
+        with connection.cursor() as cursor:
+            for start_id in range(0, last_id + 1, batch_size):
+                cursor.execute(sql, [start_id, start_id + batch_size])
+                updated += cursor.rowcount
+
+        self.stdout.write(f'{updated} activities updated')
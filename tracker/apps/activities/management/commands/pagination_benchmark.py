@@ -0,0 +1,62 @@
+import statistics
+import time
+from typing import Any, Callable
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection, transaction
+
+from tracker.apps.activities.models import Activity
+from tracker.apps.shoes.models import Shoes
+from tracker.apps.users.models import User
+from tracker.core.utils import KeysetPaginator, Paginator
+
+
+class Command(BaseCommand):
+    help = 'Compares offset and keyset pagination latency of a deep activities page, seeded data is rolled back'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--activities', type=int, default=100000)
+        parser.add_argument('--page', type=int, default=500)
+        parser.add_argument('--step', type=int, default=10, help='Activities per page, as on the activities page')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        page, step = options['page'], options['step']
+        with transaction.atomic():
+            user = User.objects.create(username=f'pagination-benchmark-{time.time_ns()}')
+            shoes = Shoes.objects.create(user=user, name='Benchmark')
+            with connection.cursor() as db_cursor:
+                db_cursor.execute(
+                    f'''
+                    INSERT INTO {Activity._meta.db_table}
+                        (user_id, shoes_id, type, name, distance, created, no_photos, photo_count)
+                    SELECT %s, %s, %s, '', 5000, NOW() - n * INTERVAL '1 hour', FALSE, 0
+                    FROM generate_series(1, %s) AS n
+                    ''',
+                    [user.id, shoes.id, Activity.Type.RUN, options['activities']],
+                )
+                db_cursor.execute(f'ANALYZE {Activity._meta.db_table}')
+
+            activities = user.activities.order_by('-created')
+            # The cursor a visitor following "Next" would hold on the previous page
+            last_object = activities[(page - 1) * step - 1]
+            cursor = KeysetPaginator.encode_cursor(KeysetPaginator.NEXT, last_object)
+
+            offset = self.measure(lambda: Paginator(activities, page, step).objects, options['repeat'])
+            keyset = self.measure(lambda: KeysetPaginator(activities, cursor, step).objects, options['repeat'])
+            if offset[1] != keyset[1]:
+                self.stderr.write('Paginators returned different activities')
+
+            self.stdout.write(f'page {page} of {step} over {options["activities"]} activities')
+            self.stdout.write(f'offset: {offset[0] * 1000:.2f} ms')
+            self.stdout.write(f'keyset: {keyset[0] * 1000:.2f} ms')
+            transaction.set_rollback(True)
+
+    def measure(self, paginate: Callable[[], list], repeat: int) -> tuple[float, list]:
+        """Returns the median duration of `repeat` runs and the paginated objects"""
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            objects = paginate()
+            durations.append(time.perf_counter() - start)
+        return statistics.median(durations), objects
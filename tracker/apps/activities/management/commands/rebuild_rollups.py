@@ -0,0 +1,24 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from tracker.apps.activities.rollups import rebuild_rollups
+from tracker.apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Recomputes users' daily, weekly and monthly activity rollups from their activities"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('user_ids', nargs='*', type=int, help='Defaults to every user')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        users = User.objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+        if not users:
+            raise CommandError('No users found')
+
+        for user in users.iterator():
+            count = rebuild_rollups(user)
+            self.stdout.write(f'{user}: {count} rollups')
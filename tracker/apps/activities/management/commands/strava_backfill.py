@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import httpx
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+
+from libraries.strava import StravaException
+from libraries.strava.ratelimit import Priority, use_priority
+from tracker.apps.activities.utils import backfill_strava_activities
+from tracker.apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Imports users' whole Strava history, interrupted runs resume from their last checkpoint"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('user_ids', nargs='*', type=int, help='Defaults to every user linked to Strava')
+        parser.add_argument('--workers', type=int, default=4, help='Users backfilled concurrently')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Activities written per bulk upsert')
+        parser.add_argument('--restart', action='store_true', help='Ignore checkpoints and start from the newest')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        users = User.objects.filter(strava_profile__isnull=False)
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+        if not users:
+            raise CommandError('No users linked to Strava found')
+
+        def backfill(user: User) -> None:
+            # Priority is a context variable, it has to be set in the worker thread
+            try:
+                with use_priority(Priority.BACKGROUND):
+                    imported = backfill_strava_activities(user, options['chunk_size'], options['restart'])
+            except (StravaException, httpx.HTTPError) as e:
+                self.stderr.write(f'{user}: stopped, rerun to resume. {e}')
+            else:
+                self.stdout.write(f'{user}: {imported} activities imported')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            list(executor.map(backfill, users))
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Duplicates of a Strava activity keep the first row, their photos are moved to it
+DUPLICATES_SQL = [
+    '''
+    CREATE TEMPORARY TABLE activity_duplicates ON COMMIT DROP AS
+    SELECT id, shoes_id, kept_id FROM (
+        SELECT id, shoes_id, MIN(id) OVER (PARTITION BY user_id, strava_id) AS kept_id
+        FROM activities_activity
+        WHERE strava_id <> ''
+    ) AS activities
+    WHERE id <> kept_id
+    ''',
+    '''
+    UPDATE photos_photo AS photo
+    SET activity_id = duplicates.kept_id
+    FROM activity_duplicates AS duplicates
+    WHERE photo.activity_id = duplicates.id
+    ''',
+    '''
+    DELETE FROM activities_activity
+    WHERE id IN (SELECT id FROM activity_duplicates)
+    ''',
+    '''
+    UPDATE shoes_shoes AS shoes
+    SET distance_covered = totals.distance, activity_count = totals.count
+    FROM (
+        SELECT shoes.id, COALESCE(SUM(activity.distance), 0) AS distance, COUNT(activity.id) AS count
+        FROM shoes_shoes AS shoes
+        LEFT JOIN activities_activity AS activity ON activity.shoes_id = shoes.id
+        WHERE shoes.id IN (SELECT shoes_id FROM activity_duplicates)
+        GROUP BY shoes.id
+    ) AS totals
+    WHERE shoes.id = totals.id
+    ''',
+    '''
+    UPDATE activities_activity AS activity
+    SET shoe_distance = suffix.shoe_distance
+    FROM (
+        SELECT id, SUM(distance) OVER (PARTITION BY shoes_id ORDER BY created, id) AS shoe_distance
+        FROM activities_activity
+        WHERE shoes_id IN (SELECT shoes_id FROM activity_duplicates)
+    ) AS suffix
+    WHERE activity.id = suffix.id AND activity.shoe_distance IS DISTINCT FROM suffix.shoe_distance
+    ''',
+    # Indexes can't be created while the deletes' FK checks are still pending
+    'SET CONSTRAINTS ALL IMMEDIATE',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0004_activity_no_photos'),
+        ('photos', '0003_alter_photo_activity'),
+        ('shoes', '0004_shoes_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(DUPLICATES_SQL, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='activity',
+            constraint=models.UniqueConstraint(condition=models.Q(('strava_id', ''), _negated=True), fields=('user', 'strava_id'), name='activity_user_strava_id'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['shoes', 'created'], name='activity_shoes_created'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['user', 'created'], name='activity_user_created'),
+        ),
+        # Single column FK indexes are prefixes of the indexes above
+        migrations.AlterField(
+            model_name='activity',
+            name='shoes',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='activities', to='shoes.shoes'),
+        ),
+        migrations.AlterField(
+            model_name='activity',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='activities', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0005_activity_indexes'),
+        ('shoes', '0004_shoes_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='activity',
+            name='activity_user_strava_id',
+        ),
+        migrations.AlterField(
+            model_name='activity',
+            name='strava_id',
+            field=models.CharField(blank=True, null=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE activities_activity SET strava_id = NULL WHERE strava_id = ''",
+            "UPDATE activities_activity SET strava_id = '' WHERE strava_id IS NULL",
+        ),
+        migrations.AddConstraint(
+            model_name='activity',
+            constraint=models.UniqueConstraint(fields=('user', 'strava_id'), name='activity_user_strava_id'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Counts are maintained by the photos app receivers from here on, start them from existing photos
+POPULATE_SQL = '''
+    UPDATE activities_activity AS activity
+    SET photo_count = photos.count
+    FROM (
+        SELECT activity_id, COUNT(*) AS count FROM photos_photo
+        WHERE activity_id IS NOT NULL
+        GROUP BY activity_id
+    ) AS photos
+    WHERE activity.id = photos.activity_id
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0006_activity_strava_id_null'),
+        ('photos', '0004_photo_indexes'),
+        ('shoes', '0004_shoes_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(condition=models.Q(('no_photos', False), ('photo_count', 0)), fields=['user', 'created'], name='activity_user_inbox'),
+        ),
+    ]
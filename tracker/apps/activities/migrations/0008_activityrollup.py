@@ -0,0 +1,49 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:00
+
+import django.db.models.deletion
+import tracker.core.model_fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Rollups are maintained from here on, start them from the activities
+POPULATE_SQL = '''
+    INSERT INTO activities_activityrollup (user_id, shoes_id, type, period, start, distance, duration, count)
+    SELECT user_id, shoes_id, type, %s, date_trunc(%s, created AT TIME ZONE %s)::date,
+        SUM(distance), COALESCE(SUM(duration), 0), COUNT(*)
+    FROM activities_activity
+    GROUP BY user_id, shoes_id, type, 5
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0007_activity_photo_count'),
+        ('shoes', '0004_shoes_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', tracker.core.model_fields.ChoicesPositiveSmallIntegerField()),
+                ('period', tracker.core.model_fields.ChoicesPositiveSmallIntegerField()),
+                ('start', models.DateField(help_text='first day of the period, weeks start on Monday')),
+                ('distance', models.FloatField(default=0, help_text='in meters')),
+                ('duration', models.IntegerField(default=0, help_text='in seconds')),
+                ('count', models.IntegerField(default=0)),
+                ('shoes', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_rollups', to='shoes.shoes')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='activity_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'period', 'start', 'shoes', 'type'), name='activity_rollup_key')],
+            },
+        ),
+        migrations.RunSQL(
+            [(POPULATE_SQL, [period, unit, settings.TIME_ZONE]) for period, unit in ((1, 'day'), (2, 'week'), (3, 'month'))],
+            migrations.RunSQL.noop,
+        ),
+    ]
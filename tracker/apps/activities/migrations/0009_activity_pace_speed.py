@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:05
+
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0008_activityrollup'),
+        ('shoes', '0004_shoes_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='pace',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(distance__gt=0, duration__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('duration'), '*', models.Value(1000.0)), '/', models.F('distance')))), output_field=models.FloatField(help_text='in seconds per km')),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='speed',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(duration__gt=0, then=django.db.models.expressions.CombinedExpression(models.F('distance'), '/', models.F('duration')))), output_field=models.FloatField(help_text='in meters per second')),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(condition=models.Q(('pace__isnull', False)), fields=['user', 'pace'], name='activity_user_pace'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(condition=models.Q(('pace__isnull', False)), fields=['shoes', 'pace'], name='activity_shoes_pace'),
+        ),
+    ]
@@ -3,7 +3,7 @@ from typing import TYPE_CHECKING
 from django.db import models
 from django.utils import timezone
 
-from tracker.core.constants import MeasurementUnit
+from tracker.core.formatting import UnitFormatter
 from tracker.core.model_fields import ChoicesPositiveSmallIntegerField
 
 if TYPE_CHECKING:
@@ -17,26 +17,70 @@ class Activity(models.Model):
         TRAIL = 3
         HIKE = 4
 
-    user = models.ForeignKey("users.User", on_delete=models.CASCADE, related_name="activities")
+    # FK lookups are covered by the composite indexes below
+    user = models.ForeignKey("users.User", on_delete=models.CASCADE, related_name="activities", db_index=False)
     type = ChoicesPositiveSmallIntegerField(choices=Type.choices)
-    shoes = models.ForeignKey("shoes.Shoes", on_delete=models.CASCADE, related_name="activities")
+    shoes = models.ForeignKey("shoes.Shoes", on_delete=models.CASCADE, related_name="activities", db_index=False)
     name = models.CharField(blank=True)
     distance = models.FloatField(default=0, help_text="in meters")
     duration = models.IntegerField(blank=True, null=True, help_text="in seconds")
     shoe_distance = models.FloatField(blank=True, null=True, help_text="in meters")
-    strava_id = models.CharField(blank=True)
+    strava_id = models.CharField(blank=True, null=True)
     created = models.DateTimeField(default=timezone.now)
     no_photos = models.BooleanField(default=False)
+    # Maintained by the photos app receivers, filters the "new activities" inbox without a join
+    photo_count = models.PositiveIntegerField(default=0)
+    # Stored by the database for sorting and filtering in SQL, NULL without distance or duration
+    pace = models.GeneratedField(
+        expression=models.Case(
+            models.When(distance__gt=0, duration__gt=0, then=models.F('duration') * 1000.0 / models.F('distance')),
+        ),
+        output_field=models.FloatField(help_text="in seconds per km"),
+        db_persist=True,
+    )
+    speed = models.GeneratedField(
+        expression=models.Case(
+            models.When(duration__gt=0, then=models.F('distance') / models.F('duration')),
+        ),
+        output_field=models.FloatField(help_text="in meters per second"),
+        db_persist=True,
+    )
+
+    # Set on list pages by `UnitFormatter.format_activities`
+    distance_display: str
+    speed_display: str
+    pace_display: str
+
+    class Meta:
+        indexes = [
+            # Cumulative shoe distances and a shoe's activity list
+            models.Index(fields=['shoes', 'created'], name='activity_shoes_created'),
+            # A user's activity list
+            models.Index(fields=['user', 'created'], name='activity_user_created'),
+            # The "new activities" inbox, activities still waiting for photos
+            models.Index(
+                fields=['user', 'created'],
+                condition=models.Q(photo_count=0, no_photos=False),
+                name='activity_user_inbox',
+            ),
+            # Fastest activities of a user or a shoe
+            models.Index(fields=['user', 'pace'], condition=models.Q(pace__isnull=False), name='activity_user_pace'),
+            models.Index(fields=['shoes', 'pace'], condition=models.Q(pace__isnull=False), name='activity_shoes_pace'),
+        ]
+        constraints = [
+            # Arbiter of imports' ON CONFLICT and index of Strava ID lookups,
+            # activities without Strava ID are NULL so they don't conflict
+            models.UniqueConstraint(fields=['user', 'strava_id'], name='activity_user_strava_id'),
+        ]
 
     def __str__(self) -> str:
         return self.name or f"Activity #{self.id}"
 
     @classmethod
     def update_or_create_from_strava(self, strava_id: str, user: "User") -> "Activity":
-        """Creates activity from strava ID
-        Duplicate activity should be validated outside this function.
-        """
+        """Creates or updates activity from strava ID"""
         from libraries.strava import get_athlete_activity, StravaException
+        from .utils import import_strava_activities
 
         strava_activity = get_athlete_activity(strava_id, user)
         if not strava_activity:
@@ -46,78 +90,49 @@ class Activity(models.Model):
         if not shoes:
             raise StravaException("Invalid activity gear ID")
 
-        latest_activity = shoes.activities.order_by('-created').filter(created__lt=strava_activity.created).first()
-        current_distance_traveled = latest_activity.shoe_distance + strava_activity.distance
-        updated_data = {
-            'type': strava_activity.type,
-            'shoes': shoes,
-            'name': strava_activity.name,
-            'duration': strava_activity.moving_time,  # in seconds
-            'distance': strava_activity.distance,  # in meters
-            'created': strava_activity.created,
-            'shoe_distance': current_distance_traveled,
-        }
-        activity, _ = Activity.objects.update_or_create(
-            user=user,
-            strava_id=strava_activity.id,
-            defaults=updated_data,
-        )
-        return activity
+        strava_activity.shoes = shoes
+        import_strava_activities(user, [strava_activity])
+        return user.activities.get(strava_id=strava_activity.id)
 
     @property
     def average_speed(self) -> str:
-        if not self.distance or not self.duration:
-            return '-'
-        unit = self.user.measurement_unit
-        if unit == MeasurementUnit.METRIC:
-            distance = self.distance / 1000.0
-            unit_display = 'km/h'
-        else:
-            distance = self.distance / 1609.344
-            unit_display = 'mph'
-
-        avg_speed = distance / (self.duration / 3600.0)
-        return f'{avg_speed:.2f} {unit_display}'
+        return UnitFormatter.for_user(self.user).format_speed(self.distance, self.duration)
 
     @property
     def average_pace(self) -> str:
-        if not self.distance or not self.duration:
-            return '-'
-        unit = self.user.measurement_unit
-        if unit == MeasurementUnit.METRIC:
-            distance = self.distance / 1000.0
-            unit_display = 'min/km'
-        else:
-            distance = self.distance / 1609.344
-            unit_display = 'min/mile'
-
-        pace_in_minutes = self.duration / distance / 60.0
-        minutes = int(pace_in_minutes)
-        seconds = int((pace_in_minutes - minutes) * 60)
-        return f'{minutes}:{seconds:02d} {unit_display}'
+        return UnitFormatter.for_user(self.user).format_pace(self.distance, self.duration)
 
     def get_shoe_distance_display(self) -> str:
-        if not self.shoe_distance:
-            return '-'
-        unit = self.user.measurement_unit
-        if unit == MeasurementUnit.METRIC:
-            shoe_distance = self.shoe_distance / 1000.0
-        else:
-            shoe_distance = self.shoe_distance / 1609.344
-        return f'{shoe_distance:.2f} {self.user.get_distance_unit()}'
+        return UnitFormatter.for_user(self.user).format_distance(self.shoe_distance)
 
     def get_distance_display(self) -> str:
-        if not self.distance:
-            return '-'
-        unit = self.user.measurement_unit
-        if unit == MeasurementUnit.METRIC:
-            distance = self.distance / 1000.0
-        else:
-            distance = self.distance / 1609.344
-        return f'{distance:.2f} {self.user.get_distance_unit()}'
+        return UnitFormatter.for_user(self.user).format_distance(self.distance)
 
     def get_duration_display(self) -> str:
         if not self.duration:
             return '-'
         duration_in_min = self.duration // 60
         return f'{duration_in_min} minutes'
+
+
+class ActivityRollup(models.Model):
+    """Sums of a user's activities per shoe, type and day, week or month, see `rollups`"""
+    class Period(models.IntegerChoices):
+        DAY = 1
+        WEEK = 2
+        MONTH = 3
+
+    user = models.ForeignKey("users.User", on_delete=models.CASCADE, related_name="activity_rollups", db_index=False)
+    shoes = models.ForeignKey("shoes.Shoes", on_delete=models.CASCADE, related_name="activity_rollups")
+    type = ChoicesPositiveSmallIntegerField(choices=Activity.Type.choices)
+    period = ChoicesPositiveSmallIntegerField(choices=Period.choices)
+    start = models.DateField(help_text="first day of the period, weeks start on Monday")
+    distance = models.FloatField(default=0, help_text="in meters")
+    duration = models.IntegerField(default=0, help_text="in seconds")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index of dashboards reading a user's periods in a date range
+            models.UniqueConstraint(fields=['user', 'period', 'start', 'shoes', 'type'], name='activity_rollup_key'),
+        ]
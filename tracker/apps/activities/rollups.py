@@ -0,0 +1,85 @@
+"""Daily, weekly and monthly distance, duration and count of activities per user, shoe and type"""
+from datetime import date, timedelta
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tracker.apps.users.models import User
+
+from .models import Activity, ActivityRollup
+
+UPSERT_SQL = '''
+    INSERT INTO {table} AS rollup (user_id, shoes_id, type, period, start, distance, duration, count)
+    SELECT * FROM unnest(
+        %s::bigint[], %s::bigint[], %s::smallint[], %s::smallint[], %s::date[], %s::float8[], %s::int[], %s::int[]
+    )
+    ON CONFLICT (user_id, period, start, shoes_id, type) DO UPDATE SET
+        distance = rollup.distance + EXCLUDED.distance,
+        duration = rollup.duration + EXCLUDED.duration,
+        count = rollup.count + EXCLUDED.count
+    RETURNING id, count
+'''
+# Same truncation as `get_period_start`, date_trunc weeks start on Monday too
+REBUILD_SQL = '''
+    INSERT INTO {table} (user_id, shoes_id, type, period, start, distance, duration, count)
+    SELECT user_id, shoes_id, type, %s, date_trunc(%s, created AT TIME ZONE %s)::date,
+        SUM(distance), COALESCE(SUM(duration), 0), COUNT(*)
+    FROM {activities}
+    WHERE user_id = %s
+    GROUP BY user_id, shoes_id, type, 5
+'''
+PERIOD_UNITS = {
+    ActivityRollup.Period.DAY: 'day',
+    ActivityRollup.Period.WEEK: 'week',
+    ActivityRollup.Period.MONTH: 'month',
+}
+
+
+def get_period_start(period: ActivityRollup.Period, day: date) -> date:
+    if period == ActivityRollup.Period.WEEK:
+        return day - timedelta(days=day.weekday())
+    if period == ActivityRollup.Period.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def update_rollups(added: Iterable[Activity] = (), removed: Iterable[Activity] = ()) -> None:
+    """Adds and removes activities to their rollups, emptied rollups are deleted"""
+    deltas: dict[tuple, list] = {}
+    for sign, activities in ((1, added), (-1, removed)):
+        for activity in activities:
+            day = timezone.localtime(activity.created, timezone.get_default_timezone()).date()
+            for period in ActivityRollup.Period:
+                key = (activity.user_id, activity.shoes_id, activity.type, period, get_period_start(period, day))
+                delta = deltas.setdefault(key, [0.0, 0, 0])
+                delta[0] += sign * activity.distance
+                delta[1] += sign * (activity.duration or 0)
+                delta[2] += sign
+
+    rows = [(*key, *delta) for key, delta in deltas.items() if any(delta)]
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_SQL.format(table=ActivityRollup._meta.db_table), [list(column) for column in zip(*rows)])
+        empty_ids = [id for id, count in cursor.fetchall() if count <= 0]
+    if empty_ids:
+        ActivityRollup.objects.filter(id__in=empty_ids).delete()
+
+
+def rebuild_rollups(user: User) -> int:
+    """Recomputes the user's rollups from their activities, returns the number of rollups"""
+    from .utils import lock_activities
+
+    table = ActivityRollup._meta.db_table
+    sql = REBUILD_SQL.format(table=table, activities=Activity._meta.db_table)
+    count = 0
+    with transaction.atomic():
+        lock_activities(user)
+        ActivityRollup.objects.filter(user=user).delete()
+        with connection.cursor() as cursor:
+            for period, unit in PERIOD_UNITS.items():
+                cursor.execute(sql, [period, unit, timezone.get_default_timezone_name(), user.id])
+                count += cursor.rowcount
+    return count
@@ -1,25 +1,104 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Iterable, Optional
 
+import httpx
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
 from django.utils import timezone
 
-from libraries.strava import get_athlete_activities, StravaActivity
+from libraries.strava import (
+    aget_athlete_activities, iter_athlete_activities, StravaActivity, StravaException, STRAVA_SPORT_TYPES
+)
 from tracker.apps.shoes.models import Shoes
 from tracker.apps.users.models import User
 
 from .models import Activity
+from .rollups import update_rollups
+
+
+# Running shoe distance of the activities at or after each change, continuing from the
+# last activity before it. Rows whose value didn't change are not rewritten.
+SHOE_DISTANCES_SQL = '''
+    WITH changes AS (
+        SELECT * FROM unnest(%s::bigint[], %s::timestamptz[]) AS change(shoes_id, since)
+    ), suffix AS (
+        SELECT
+            activity.id,
+            COALESCE(previous.shoe_distance, 0) + SUM(activity.distance) OVER (
+                PARTITION BY activity.shoes_id ORDER BY activity.created, activity.id
+            ) AS shoe_distance
+        FROM changes
+        JOIN {table} AS activity
+            ON activity.shoes_id = changes.shoes_id AND activity.created >= changes.since
+        LEFT JOIN LATERAL (
+            SELECT shoe_distance FROM {table}
+            WHERE shoes_id = changes.shoes_id AND created < changes.since
+            ORDER BY created DESC, id DESC
+            LIMIT 1
+        ) AS previous ON TRUE
+    )
+    UPDATE {table} AS activity
+    SET shoe_distance = suffix.shoe_distance
+    FROM suffix
+    WHERE activity.id = suffix.id AND activity.shoe_distance IS DISTINCT FROM suffix.shoe_distance
+'''
+EARLIEST = datetime.min.replace(tzinfo=dt_timezone.utc)
+
+
+def update_shoe_distances(changes: dict[int, datetime]) -> int:
+    """Recomputes `shoe_distance` of activities created at or after the changed time of each shoes ID.
+    Runs as a single statement, so a back-dated activity costs the activities after it, not the shoe's history.
+    Bumps the shoes' `activities_updated`. Returns the number of rewritten rows.
+    """
+    if not changes:
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SHOE_DISTANCES_SQL.format(table=Activity._meta.db_table),
+            [list(changes.keys()), list(changes.values())],
+        )
+        count = cursor.rowcount
+    Shoes.objects.filter(id__in=changes.keys()).update(activities_updated=timezone.now())
+    return count
 
 
 def update_activity_shoe_distances(shoes: Shoes) -> None:
-    """ Update each activity totale shoe distance covered
-    Assumes all activities are recorded
+    """Recomputes `shoe_distance` of all the shoe's activities"""
+    update_shoe_distances({shoes.id: EARLIEST})
+
+
+def get_shoe_changes(changes: Iterable[tuple[int, datetime]]) -> dict[int, datetime]:
+    """Returns the earliest changed time of each shoes ID from (shoes ID, created) pairs"""
+    earliest: dict[int, datetime] = {}
+    for shoes_id, created in changes:
+        if shoes_id not in earliest or created < earliest[shoes_id]:
+            earliest[shoes_id] = created
+    return earliest
+
+
+def update_shoe_totals(added: Iterable[tuple[int, float]] = (), removed: Iterable[tuple[int, float]] = ()) -> None:
+    """Adds and removes (shoes ID, distance) activities to the shoes' `distance_covered` and `activity_count`.
+    Uses F() updates so concurrent writers don't overwrite each other,
+    an activity moved or changed is removed with its old values and added with the new ones.
     """
-    current_distance = 0
-    activities = shoes.activities.order_by('created')
-    for activity in activities:
-        current_distance += activity.distance
-        activity.shoe_distance = current_distance
+    totals: dict[int, tuple[float, int]] = {}
+    for sign, activities in ((1, added), (-1, removed)):
+        for shoes_id, distance in activities:
+            total_distance, count = totals.get(shoes_id, (0.0, 0))
+            totals[shoes_id] = (total_distance + sign * distance, count + sign)
 
-    Activity.objects.bulk_update(activities, fields=['shoe_distance'])
+    # Same order in every transaction so they can't deadlock on the shoe rows
+    for shoes_id, (distance, count) in sorted(totals.items()):
+        if distance or count:
+            Shoes.objects.filter(id=shoes_id).update(
+                distance_covered=F('distance_covered') + distance,
+                activity_count=F('activity_count') + count,
+            )
 
 
 def get_unregistered_strava_activities(user: User, days: int = 21) -> list[StravaActivity]:
@@ -28,8 +107,40 @@ def get_unregistered_strava_activities(user: User, days: int = 21) -> list[Strav
         user.activities.filter(created__gte=after).values_list('strava_id', flat=True)
     )
     active_shoes_mapping = {shoe.strava_id: shoe for shoe in user.shoes.filter(retired_at=None)}
-    strava_activities = get_athlete_activities(user, after=after)
+    strava_activities = iter_athlete_activities(user, after=after)
+    return _filter_unregistered_activities(strava_activities, registered_activity_ids, active_shoes_mapping)
 
+
+async def aget_unregistered_strava_activities(user: User, days: int = 21) -> list[StravaActivity]:
+    after = timezone.localtime() - timedelta(days=days)
+    registered_activity_ids = {
+        strava_id async for strava_id in user.activities.filter(created__gte=after).values_list('strava_id', flat=True)
+    }
+    active_shoes_mapping = {shoe.strava_id: shoe async for shoe in user.shoes.filter(retired_at=None)}
+
+    # Fall back to the last successful response while Strava is failing or the circuit breaker is open
+    cache_key = get_strava_activities_cache_key(user.id)
+    try:
+        strava_activities = await aget_athlete_activities(user, after=after)
+    except (StravaException, httpx.HTTPError):
+        strava_activities = await cache.aget(cache_key)
+        if strava_activities is None:
+            raise
+        strava_activities = [activity for activity in strava_activities if activity.created > after]
+    else:
+        await cache.aset(cache_key, strava_activities, timeout=settings.STRAVA_FALLBACK_CACHE_TIMEOUT)
+
+    return _filter_unregistered_activities(strava_activities, registered_activity_ids, active_shoes_mapping)
+
+
+def get_strava_activities_cache_key(user_id: int) -> str:
+    # Versioned, records pickled before they were slotted can't be loaded
+    return f'strava-activities:v2:{user_id}'
+
+
+def _filter_unregistered_activities(
+    strava_activities: Iterable[StravaActivity], registered_activity_ids: set[str], active_shoes_mapping: dict[str, Shoes]
+) -> list[StravaActivity]:
     new_activities = []
     for activity in strava_activities:
         shoes = active_shoes_mapping.get(activity.shoes_id)
@@ -38,3 +149,134 @@ def get_unregistered_strava_activities(user: User, days: int = 21) -> list[Strav
             new_activities.append(activity)
 
     return new_activities
+
+
+def get_backfill_checkpoint_key(user_id: int) -> str:
+    return f'strava-backfill:{user_id}'
+
+
+def backfill_strava_activities(user: User, chunk_size: int = 200, restart: bool = False) -> int:
+    """Imports the user's whole Strava history from newest to oldest in chunks.
+    The start of the oldest imported activity is checkpointed after every chunk so an
+    interrupted run resumes there. Cumulative shoe distances are recomputed once at the end.
+    """
+    checkpoint_key = get_backfill_checkpoint_key(user.id)
+    if restart:
+        cache.delete(checkpoint_key)
+
+    before: Optional[datetime] = None
+    checkpoint = cache.get(checkpoint_key)
+    if checkpoint:
+        # `before` is exclusive, refetch activities starting on the checkpoint second
+        before = datetime.fromtimestamp(checkpoint + 1, tz=dt_timezone.utc)
+
+    shoes_mapping = {shoe.strava_id: shoe for shoe in user.shoes.exclude(strava_id='')}
+    imported = 0
+    chunk: list[StravaActivity] = []
+    for strava_activity in iter_athlete_activities(user, before=before):
+        strava_activity.shoes = shoes_mapping.get(strava_activity.shoes_id)
+        if not strava_activity.shoes:
+            continue
+
+        chunk.append(strava_activity)
+        if len(chunk) >= chunk_size:
+            imported += sum(import_strava_activities(user, chunk, update_distances=False))
+            cache.set(checkpoint_key, int(chunk[-1].created.timestamp()), timeout=None)
+            chunk = []
+
+    if chunk:
+        imported += sum(import_strava_activities(user, chunk, update_distances=False))
+
+    # Also covers shoes imported by earlier interrupted runs
+    update_shoe_distances({shoes.id: EARLIEST for shoes in shoes_mapping.values()})
+
+    cache.delete(checkpoint_key)
+    return imported
+
+
+def import_strava_activities(
+    user: User,
+    strava_activities: Iterable[StravaActivity],
+    batch_size: Optional[int] = None,
+    update_distances: bool = True,
+) -> tuple[int, int]:
+    """Creates or updates activities by Strava ID, one INSERT ... ON CONFLICT statement per batch.
+    Activities need their `shoes` set. Importing the same activities again updates them in place,
+    so imports are safe to retry. Shoe totals are kept in step and cumulative distances are
+    recomputed once per affected shoe, unless `update_distances` is False. Rollups are updated too.
+    Returns the number of inserted and updated activities.
+    """
+    batch_size = batch_size or settings.STRAVA_IMPORT_BATCH_SIZE
+    # A statement can't update a row twice, the last copy of an activity wins
+    unique_activities = list({
+        str(strava_activity.id): strava_activity for strava_activity in strava_activities
+    }.values())
+    inserted = updated = 0
+    changes: list[tuple[int, datetime]] = []
+    with transaction.atomic():
+        lock_activities(user)
+        for offset in range(0, len(unique_activities), batch_size):
+            batch = unique_activities[offset:offset + batch_size]
+            existing_activities = list(user.activities.filter(
+                strava_id__in=[str(strava_activity.id) for strava_activity in batch]
+            ).only('user_id', 'shoes_id', 'type', 'distance', 'duration', 'created'))
+
+            activities = [
+                Activity(
+                    user=user,
+                    strava_id=str(strava_activity.id),
+                    type=STRAVA_SPORT_TYPES[strava_activity.type],
+                    shoes=strava_activity.shoes,
+                    name=strava_activity.name,
+                    distance=strava_activity.distance,
+                    duration=strava_activity.moving_time,
+                    created=strava_activity.created,
+                )
+                for strava_activity in batch
+            ]
+            Activity.objects.bulk_create(
+                activities,
+                update_conflicts=True,
+                unique_fields=['user', 'strava_id'],
+                update_fields=['type', 'shoes', 'name', 'distance', 'duration', 'created'],
+            )
+
+            removed = [(activity.shoes_id, activity.distance) for activity in existing_activities]
+            update_shoe_totals(
+                added=[(activity.shoes_id, activity.distance) for activity in activities], removed=removed
+            )
+            update_rollups(added=activities, removed=existing_activities)
+            changes.extend((activity.shoes_id, activity.created) for activity in existing_activities)
+            changes.extend((activity.shoes_id, activity.created) for activity in activities)
+            updated += len(removed)
+            inserted += len(batch) - len(removed)
+
+        if update_distances:
+            update_shoe_distances(get_shoe_changes(changes))
+
+    return inserted, updated
+
+
+def delete_activities(user: User, activity_ids: Iterable[int]) -> int:
+    """Deletes the user's activities and updates their shoes and rollups.
+    Returns the number of deleted activities.
+    """
+    with transaction.atomic():
+        lock_activities(user)
+        activities = list(user.activities.filter(id__in=list(activity_ids)).only(
+            'user_id', 'shoes_id', 'type', 'distance', 'duration', 'created'
+        ))
+        user.activities.filter(id__in=[activity.id for activity in activities]).delete()
+        update_shoe_totals(removed=[(activity.shoes_id, activity.distance) for activity in activities])
+        update_rollups(removed=activities)
+        update_shoe_distances(get_shoe_changes((activity.shoes_id, activity.created) for activity in activities))
+
+    return len(activities)
+
+
+def lock_activities(user: User) -> None:
+    """Makes writes to the user's activities wait for the current transaction.
+    Writers read the activities' previous shoes and distances before changing them,
+    concurrent imports of the same activity would both count it as new otherwise.
+    """
+    list(User.objects.select_for_update().filter(id=user.id).values_list('id'))
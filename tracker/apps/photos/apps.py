@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class PhotosConfig(AppConfig):
+    name = 'tracker.apps.photos'
+
+    def ready(self) -> None:
+        # Connects the activity photo count receivers
+        from . import signals  # noqa: F401
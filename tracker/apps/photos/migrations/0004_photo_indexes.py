@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0005_activity_indexes'),
+        ('photos', '0003_alter_photo_activity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['category', 'created'], name='photo_category_created'),
+        ),
+        # The single column FK index is a prefix of the index above
+        migrations.AlterField(
+            model_name='photo',
+            name='category',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='photos', to='photos.photocategory'),
+        ),
+    ]
@@ -13,9 +13,18 @@ class PhotoCategory(models.Model):
 
 
 class Photo(models.Model):
-    category = models.ForeignKey(PhotoCategory, on_delete=models.SET_NULL, related_name='photos', null=True)
+    # FK lookups are covered by the (category, created) index
+    category = models.ForeignKey(
+        PhotoCategory, on_delete=models.SET_NULL, related_name='photos', null=True, db_index=False
+    )
     activity = models.ForeignKey(
         'activities.Activity', on_delete=models.CASCADE, related_name='photos', blank=True, null=True
     )
     file = ImageField(upload_to='photos/%Y/%m/%d')
     created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # A category's photos in upload order
+            models.Index(fields=['category', 'created'], name='photo_category_created'),
+        ]
@@ -0,0 +1,47 @@
+"""Keeps `Activity.photo_count` in step with photos created, deleted or moved to another activity.
+
+Counts are changed with F() updates so concurrent uploads don't overwrite each other.
+Queryset `update()` calls bypass these receivers, `backfill_photo_counts` repairs the counts.
+"""
+from typing import Any, Optional
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from tracker.apps.activities.models import Activity
+
+from .models import Photo
+
+
+def _add_photos(activity_id: Optional[int], count: int) -> None:
+    if activity_id:
+        Activity.objects.filter(id=activity_id).update(photo_count=F('photo_count') + count)
+
+
+@receiver(pre_save, sender=Photo)
+def remember_activity(sender: type, instance: Photo, update_fields: Optional[frozenset], **kwargs: Any) -> None:
+    if instance.pk and (update_fields is None or 'activity' in update_fields):
+        previous_activity_id = Photo.objects.filter(pk=instance.pk).values_list('activity_id', flat=True).first()
+        setattr(instance, '_previous_activity_id', previous_activity_id)
+
+
+@receiver(post_save, sender=Photo)
+def count_saved_photo(sender: type, instance: Photo, created: bool, **kwargs: Any) -> None:
+    if created:
+        _add_photos(instance.activity_id, 1)
+        return
+
+    previous_activity_id = getattr(instance, '_previous_activity_id', instance.activity_id)
+    if previous_activity_id != instance.activity_id:
+        _add_photos(previous_activity_id, -1)
+        _add_photos(instance.activity_id, 1)
+    setattr(instance, '_previous_activity_id', instance.activity_id)
+
+
+@receiver(post_delete, sender=Photo)
+def count_deleted_photo(sender: type, instance: Photo, origin: Any = None, **kwargs: Any) -> None:
+    # Photos deleted along with their activities leave no count behind
+    if isinstance(origin, Activity) or getattr(origin, 'model', None) is Activity:
+        return
+    _add_photos(instance.activity_id, -1)
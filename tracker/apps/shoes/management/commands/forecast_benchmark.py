@@ -0,0 +1,71 @@
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tracker.apps.activities.models import Activity
+from tracker.apps.shoes.forecasts import fit_daily_distances, get_forecasts, load_usage, store_forecasts
+from tracker.apps.shoes.models import Shoes
+from tracker.apps.users.models import User
+
+
+SHOES_SQL = '''
+    INSERT INTO {shoes} (user_id, name, note, distance_covered, activity_count, created, strava_id)
+    SELECT %s, 'Benchmark ' || n, '', random() * 800000, 0, NOW() - random() * INTERVAL '400 days', ''
+    FROM generate_series(1, %s) AS n
+'''
+# Activities spread over the forecast window, round robin over the seeded shoes
+ACTIVITIES_SQL = '''
+    INSERT INTO {activities} (user_id, shoes_id, type, name, distance, created, no_photos, photo_count)
+    SELECT %s, shoes.id, %s, '', 3000 + random() * 12000, NOW() - random() * %s * INTERVAL '1 day', FALSE, 0
+    FROM generate_series(0, %s - 1) AS n
+    JOIN (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY id) - 1 AS position FROM {shoes} WHERE user_id = %s
+    ) AS shoes ON shoes.position = n %% %s
+'''
+
+
+class Command(BaseCommand):
+    help = 'Times the phases of a shoe forecast run over seeded shoes and activities, seeded data is rolled back'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--shoes', type=int, default=100000)
+        parser.add_argument('--activities', type=int, default=10000000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        shoes, activities = options['shoes'], options['activities']
+        window = settings.SHOE_FORECAST_WINDOW
+        tables = {'shoes': Shoes._meta.db_table, 'activities': Activity._meta.db_table}
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            user = User.objects.create(username=f'forecast-benchmark-{time.time_ns()}')
+            with connection.cursor() as db_cursor:
+                db_cursor.execute(SHOES_SQL.format(**tables), [user.id, shoes])
+                db_cursor.execute(
+                    ACTIVITIES_SQL.format(**tables),
+                    [user.id, Activity.Type.RUN, window, activities, user.id, shoes],
+                )
+                db_cursor.execute(f'ANALYZE {tables["activities"]}')
+            self.stdout.write(f'seed: {time.perf_counter() - start:.2f} s, {shoes} shoes and {activities} activities')
+
+            now = timezone.now()
+            start = time.perf_counter()
+            series = load_usage(now, window)
+            self.stdout.write(f'load: {time.perf_counter() - start:.2f} s, {len(series.activity_shoe_ids)} activities')
+
+            start = time.perf_counter()
+            daily_distances = fit_daily_distances(series, now.timestamp(), window, settings.SHOE_FORECAST_HALF_LIFE)
+            remaining_distances, retirement_dates = get_forecasts(
+                series, daily_distances, timezone.localdate(now), settings.SHOE_LIFESPAN,
+                settings.SHOE_FORECAST_MAX_DAYS,
+            )
+            self.stdout.write(f'fit: {time.perf_counter() - start:.2f} s')
+
+            start = time.perf_counter()
+            count = store_forecasts(series, daily_distances, remaining_distances, retirement_dates, now)
+            self.stdout.write(f'store: {time.perf_counter() - start:.2f} s, {count} forecasts')
+            transaction.set_rollback(True)
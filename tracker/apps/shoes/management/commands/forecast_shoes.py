@@ -0,0 +1,15 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from tracker.apps.shoes.forecasts import forecast_shoes
+
+
+class Command(BaseCommand):
+    help = "Forecasts active shoes' retirement at their recent usage rate, meant to run nightly"
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        start = time.perf_counter()
+        count = forecast_shoes()
+        self.stdout.write(f'{count} forecasts in {time.perf_counter() - start:.2f} seconds')
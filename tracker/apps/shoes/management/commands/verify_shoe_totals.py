@@ -0,0 +1,43 @@
+from typing import Any
+
+from django.db.models import Count, FloatField, Sum, Value
+from django.db.models.functions import Coalesce
+from django.core.management.base import BaseCommand, CommandParser
+
+from tracker.apps.shoes.models import Shoes
+
+
+# Distances are summed in floating point, ignore rounding differences
+TOLERANCE = 0.01  # in meters
+
+
+class Command(BaseCommand):
+    help = "Compares shoes' maintained distance and activity count with their activities, meant to run periodically"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--fix', action='store_true', help='Recalculate the totals of drifted shoes')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        shoes_qs = Shoes.objects.annotate(
+            total_distance=Coalesce(Sum('activities__distance'), Value(0.0), output_field=FloatField()),
+            total_count=Count('activities'),
+        ).order_by('id')
+
+        drifted = 0
+        for shoes in shoes_qs.iterator():
+            if (
+                abs(shoes.distance_covered - shoes.total_distance) <= TOLERANCE
+                and shoes.activity_count == shoes.total_count
+            ):
+                continue
+
+            drifted += 1
+            self.stdout.write(
+                f'Shoes #{shoes.id}: distance {shoes.distance_covered:.2f} != {shoes.total_distance:.2f}, '
+                f'activities {shoes.activity_count} != {shoes.total_count}'
+            )
+            if options['fix']:
+                shoes.recalculate_distance_covered()
+
+        action = 'fixed' if options['fix'] else 'found'
+        self.stdout.write(f'{drifted} drifted shoes {action}')
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoes', '0002_shoes_strava_id'),
+        ('activities', '0004_activity_no_photos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoes',
+            name='activity_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        # Counters are maintained from here on, start them from the activities
+        migrations.RunSQL(
+            '''
+            UPDATE shoes_shoes AS shoes
+            SET distance_covered = COALESCE(totals.distance, 0), activity_count = COALESCE(totals.count, 0)
+            FROM shoes_shoes AS target
+            LEFT JOIN (
+                SELECT shoes_id, SUM(distance) AS distance, COUNT(*) AS count
+                FROM activities_activity
+                GROUP BY shoes_id
+            ) AS totals ON totals.shoes_id = target.id
+            WHERE shoes.id = target.id
+            ''',
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoes', '0003_shoes_activity_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shoes',
+            index=models.Index(fields=['user', 'strava_id'], name='shoes_user_strava_id'),
+        ),
+        # The single column FK index is a prefix of the index above
+        migrations.AlterField(
+            model_name='shoes',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shoes', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoes', '0004_shoes_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoeForecast',
+            fields=[
+                ('shoes', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='shoes.shoes')),
+                ('daily_distance', models.FloatField(help_text='in meters')),
+                ('remaining_distance', models.FloatField(help_text='in meters')),
+                ('retirement_date', models.DateField(blank=True, null=True)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoes', '0005_shoeforecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoes',
+            name='activities_updated',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,33 @@
+"""Cumulative distance of a shoe over time, downsampled for plotting.
+
+Series are cached per number of points under the shoe's `activities_updated`, which
+`update_shoe_distances` bumps whenever the `shoe_distance` of the shoe's activities is recomputed,
+so a changed history is read under a new key instead of being invalidated.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from tracker.core.utils import downsample
+
+from .models import Shoes
+
+
+def get_mileage_cache_key(shoes: Shoes, count: int) -> str:
+    return f'shoe-mileage:{shoes.id}:{shoes.activities_updated.timestamp()}:{count}'
+
+
+def get_mileage(shoes: Shoes, count: int) -> list[tuple[float, float]]:
+    """Returns up to `count` (epoch seconds, meters) points of the shoe's distance after each activity"""
+    cache_key = get_mileage_cache_key(shoes, count)
+    points = cache.get(cache_key)
+    if points is None:
+        activities = (
+            shoes.activities.filter(shoe_distance__isnull=False)
+            .order_by('created', 'id')
+            .values_list('created', 'shoe_distance')
+        )
+        # Streamed in chunks as plain tuples, long histories don't build model instances
+        series = [(created.timestamp(), shoe_distance) for created, shoe_distance in activities.iterator(2000)]
+        points = downsample(series, count)
+        cache.set(cache_key, points, timeout=settings.SHOE_MILEAGE_CACHE_TIMEOUT)
+    return points
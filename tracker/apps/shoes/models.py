@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 
@@ -10,15 +11,25 @@ class ShoeBrand(models.Model):
 
 
 class Shoes(models.Model):
-    user = models.ForeignKey('users.User', related_name='shoes', on_delete=models.CASCADE)
+    # FK lookups are covered by the (user, strava_id) index
+    user = models.ForeignKey('users.User', related_name='shoes', on_delete=models.CASCADE, db_index=False)
     brand = models.ForeignKey(ShoeBrand, related_name='shoes', on_delete=models.SET_NULL, blank=True, null=True)
     name = models.CharField()
     note = models.TextField(blank=True)
+    # Maintained with F() updates as activities are written, see `update_shoe_totals`
     distance_covered = models.FloatField(default=0)
+    activity_count = models.PositiveIntegerField(default=0)
+    # Last time `shoe_distance` of the shoe's activities was recomputed, versions cached mileage series
+    activities_updated = models.DateTimeField(default=timezone.now)
     created = models.DateTimeField(default=timezone.now)
     strava_id = models.CharField(blank=True)
     retired_at = models.DateTimeField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'strava_id'], name='shoes_user_strava_id'),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
@@ -31,11 +42,35 @@ class Shoes(models.Model):
         return round(self.distance_covered / 1000, 1)
 
     def recalculate_distance_covered(self) -> None:
-        self.distance_covered = (
-            self.activities.aggregate(total_distance=models.Sum('distance'))['total_distance'] or 0
+        """Resets the totals from the shoe's activities in one statement,
+        so concurrent F() updates committed after it aren't lost
+        """
+        from tracker.apps.activities.models import Activity
+
+        activities = Activity.objects.filter(shoes=models.OuterRef('pk')).values('shoes')
+        Shoes.objects.filter(id=self.id).update(
+            distance_covered=Coalesce(
+                models.Subquery(activities.annotate(total=models.Sum('distance')).values('total')), 0.0
+            ),
+            activity_count=Coalesce(
+                models.Subquery(activities.annotate(count=models.Count('id')).values('count')), 0
+            ),
         )
-        self.save(update_fields=['distance_covered'])
+        self.refresh_from_db(fields=['distance_covered', 'activity_count'])
 
     def retire(self) -> None:
         self.retired_at = timezone.now()
         self.save(update_fields=['retired_at'])
+
+
+class ShoeForecast(models.Model):
+    """Projected wear of an active shoe at its recent usage rate, rebuilt nightly, see `forecasts`"""
+    shoes = models.OneToOneField(Shoes, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    daily_distance = models.FloatField(help_text='in meters')
+    remaining_distance = models.FloatField(help_text='in meters')
+    # Empty for unused shoes or past `SHOE_FORECAST_MAX_DAYS`
+    retirement_date = models.DateField(blank=True, null=True)
+    created = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f'Forecast of {self.shoes_id}'
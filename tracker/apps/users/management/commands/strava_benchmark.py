@@ -0,0 +1,178 @@
+import json
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+import httpx
+from dateutil import parser
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from libraries.strava import ratelimit
+from libraries.strava.client import _get_limits, _get_timeout, close_client, get_client
+from libraries.strava.decoding import decode_activities, orjson
+from libraries.strava.exceptions import StravaException
+from libraries.strava.fake import FakeStrava, serve
+
+
+@dataclass
+class LegacyStravaActivity:
+    id: str
+    name: str
+    distance: float
+    moving_time: int
+    type: str
+    created: datetime
+    shoes_id: str
+    shoes: Optional[Any] = None
+
+
+def legacy_decode_activities(content: bytes) -> List[LegacyStravaActivity]:
+    # Decoding as done before libraries.strava.decoding, as the baseline
+    result = []
+    for data in json.loads(content):
+        activity_attributes = {field.name for field in fields(LegacyStravaActivity)}
+        attributes = {key: value for key, value in data.items() if key in activity_attributes}
+        attributes.update({
+            'created': parser.parse(data['start_date']),
+            'shoes_id': data['gear_id'],
+        })
+        result.append(LegacyStravaActivity(**attributes))
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Measures Strava client throughput, webhook endpoint latency and payload decoding speed'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('target', choices=['client', 'webhooks', 'decoding'])
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--latency', type=float, default=0.0, help='Fake API latency in seconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of fake API requests failing')
+        # Webhook events refer to fake activities, these have to match the running strava_fake_server
+        parser.add_argument('--athletes', type=int, default=10)
+        parser.add_argument(
+            '--activities', type=int, help='Activities per athlete, defaults to 500 and to 10000 for `decoding`'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--url',
+            help='Fake Strava API URL for `client`, defaults to an in-process server. '
+            'Notification endpoint URL for `webhooks`, e.g. http://127.0.0.1:8000/api/strava/notification',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['target'] == 'decoding':
+            self.benchmark_decoding(options['activities'] or 10000, options['seed'])
+            return
+
+        fake = FakeStrava(
+            athletes=options['athletes'],
+            activities_per_athlete=options['activities'] or 500,
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            # Benchmarks must not be throttled by the fake
+            rate_limits=(10 ** 9, 10 ** 9),
+            seed=options['seed'],
+        )
+        if options['target'] == 'client':
+            self.benchmark_client(fake, options)
+        else:
+            if not options['url']:
+                raise CommandError('--url of the notification endpoint is required')
+            self.benchmark_webhooks(fake, options)
+
+    def benchmark_client(self, fake: FakeStrava, options: dict) -> None:
+        server = None
+        api_url = options['url']
+        if not api_url:
+            server = serve(fake)
+            api_url = server.api_url
+
+        url = api_url + 'athlete'
+        headers = {'Authorization': 'Bearer token-1'}
+
+        def one_off() -> int:
+            # A new connection per call
+            return httpx.get(url, headers=headers, timeout=_get_timeout()).status_code
+
+        def pooled() -> int:
+            # The shipped client, with its rate limit hooks and retries
+            return get_client().get(url, headers=headers).status_code
+
+        # The fake reports its own limits, the app's are put back afterwards
+        limits = cache.get(ratelimit.LIMITS_KEY)
+        try:
+            for name, request in (('one-off', one_off), ('pooled', pooled)):
+                self.report(name, self.run(request, options['requests'], options['concurrency']))
+        finally:
+            close_client()
+            if limits:
+                cache.set(ratelimit.LIMITS_KEY, limits, timeout=None)
+            else:
+                cache.delete(ratelimit.LIMITS_KEY)
+            if server:
+                server.shutdown()
+                server.server_close()
+
+    def benchmark_webhooks(self, fake: FakeStrava, options: dict) -> None:
+        events = [fake.make_random_event() for _ in range(options['requests'])]
+        with httpx.Client(limits=_get_limits(), timeout=_get_timeout()) as client:
+            def fire() -> int:
+                return client.post(options['url'], json=events.pop()).status_code
+
+            self.report('webhooks', self.run(fire, options['requests'], options['concurrency']))
+
+    def benchmark_decoding(self, count: int, seed: int) -> None:
+        fake = FakeStrava(athletes=1, activities_per_athlete=count, seed=seed)
+        content = json.dumps(fake.athlete_activities[1]).encode()
+        self.stdout.write(f'{count} activities, {len(content) / 1024:.0f} KiB, orjson {"on" if orjson else "off"}')
+
+        for name, decode in (('legacy', legacy_decode_activities), ('fast', decode_activities)):
+            elapsed = min(self.time(decode, content) for _ in range(5))
+            tracemalloc.start()
+            records = decode(content)
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f'{name}: {elapsed * 1000:.1f} ms, {count / elapsed:.0f} activities/s, '
+                f'{size / 1024:.0f} KiB held by {len(records)} records'
+            )
+
+    def time(self, decode: Callable[[bytes], list], content: bytes) -> float:
+        start = time.perf_counter()
+        decode(content)
+        return time.perf_counter() - start
+
+    def run(self, request: Callable[[], int], count: int, concurrency: int) -> Tuple[float, List[float], Counter]:
+        def timed(_: int) -> Tuple[float, int]:
+            start = time.perf_counter()
+            try:
+                status = request()
+            except (httpx.HTTPError, StravaException):
+                status = 0
+            return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(timed, range(count)))
+        elapsed = time.perf_counter() - start
+
+        return elapsed, [latency for latency, _ in results], Counter(status for _, status in results)
+
+    def report(self, name: str, result: Tuple[float, List[float], Counter]) -> None:
+        elapsed, latencies, statuses = result
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{name}: {len(latencies) / elapsed:.1f} req/s, '
+            f'p50 {percentiles[49] * 1000:.1f} ms, p95 {percentiles[94] * 1000:.1f} ms, '
+            f'p99 {percentiles[98] * 1000:.1f} ms, '
+            f'statuses {dict(sorted(statuses.items()))}'
+        )
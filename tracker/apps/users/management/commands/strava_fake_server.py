@@ -0,0 +1,69 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from libraries.strava.fake import FakeStrava, FakeStravaServer
+from tracker.apps.shoes.models import Shoes
+from tracker.apps.users.models import StravaProfile, User
+
+
+class Command(BaseCommand):
+    help = 'Serves a fake Strava API for load tests, point STRAVA_API_URL at the printed URL'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--athletes', type=int, default=10)
+        parser.add_argument('--activities', type=int, default=500, help='Activities per athlete')
+        parser.add_argument('--shoes', type=int, default=3, help='Shoes per athlete')
+        parser.add_argument('--latency', type=float, default=0.05, help='Response latency in seconds')
+        parser.add_argument('--jitter', type=float, default=0.02, help='Latency jitter in seconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with 503')
+        parser.add_argument('--rate-limits', default='200,2000', help='15 minute and daily request limits')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--link-users', action='store_true',
+            help='Create a local user with Strava profile and shoes for every fake athlete',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        short_limit, daily_limit = (int(limit) for limit in options['rate_limits'].split(','))
+        fake = FakeStrava(
+            athletes=options['athletes'],
+            activities_per_athlete=options['activities'],
+            shoes_per_athlete=options['shoes'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            rate_limits=(short_limit, daily_limit),
+            seed=options['seed'],
+        )
+        if options['link_users']:
+            self.link_users(fake)
+
+        server = FakeStravaServer(fake, (options['host'], options['port']))
+        self.stdout.write(f'Fake Strava API listening on {server.api_url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    def link_users(self, fake: FakeStrava) -> None:
+        for athlete_id, athlete in fake.athletes.items():
+            user, _ = User.objects.get_or_create(username=f'fake-{athlete["username"]}')
+            StravaProfile.objects.update_or_create(
+                user=user,
+                defaults={
+                    'athlete_id': str(athlete_id),
+                    'access_token': f'token-{athlete_id}',
+                    'refresh_token': f'refresh-{athlete_id}',
+                    # Expired, so the first call exercises the token refresh
+                    'expires_at': 0,
+                },
+            )
+            for gear in athlete['shoes']:
+                Shoes.objects.get_or_create(user=user, strava_id=gear['id'], defaults={'name': gear['name']})
+
+        self.stdout.write(f'{len(fake.athletes)} users linked to fake athletes')
@@ -0,0 +1,35 @@
+from typing import Any
+
+import httpx
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from libraries.strava import StravaException
+from libraries.strava.ratelimit import Priority, use_priority
+from libraries.strava.tokens import refresh_access_token
+from tracker.apps.users.models import StravaProfile
+
+
+class Command(BaseCommand):
+    help = 'Refreshes Strava access tokens ahead of expiry so requests never wait on a refresh'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--ahead', type=int, default=3600, help='Refresh tokens expiring within N seconds')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        ahead = options['ahead']
+        expires_before = int(timezone.now().timestamp()) + ahead
+        user_ids = StravaProfile.objects.filter(expires_at__lt=expires_before).values_list('user_id', flat=True)
+
+        refreshed = 0
+        with use_priority(Priority.BACKGROUND):
+            for user_id in user_ids:
+                try:
+                    refresh_access_token(user_id, margin=ahead)
+                except (StravaException, httpx.HTTPError) as e:
+                    self.stderr.write(f'User {user_id}: {e}')
+                    continue
+                refreshed += 1
+
+        self.stdout.write(f'{refreshed} tokens refreshed')
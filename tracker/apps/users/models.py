@@ -5,6 +5,7 @@ from django.db import models
 from django.utils import timezone
 
 from tracker.core.constants import MeasurementUnit
+from tracker.core.formatting import UnitFormatter
 from tracker.core.model_fields import ChoicesPositiveSmallIntegerField
 
 
@@ -44,14 +45,10 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.username
 
     def get_distance_unit(self) -> str:
-        if self.measurement_unit == MeasurementUnit.METRIC:
-            return 'km'
-        return 'mile'
+        return UnitFormatter.for_user(self).distance_unit
 
     def get_pace_unit(self) -> str:
-        if self.measurement_unit == MeasurementUnit.METRIC:
-            return 'min/km'
-        return 'min/mile'
+        return UnitFormatter.for_user(self).pace_unit
 
 
 class StravaProfile(models.Model):
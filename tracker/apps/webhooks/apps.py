@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class WebhooksConfig(AppConfig):
+    name = 'tracker.apps.webhooks'
+
+    def ready(self) -> None:
+        # Connects the resolver cache invalidation receivers
+        from . import resolver  # noqa: F401
@@ -0,0 +1,19 @@
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from tracker.apps.webhooks.partitions import create_partitions, drop_partitions
+
+
+class Command(BaseCommand):
+    help = 'Creates upcoming daily partitions of the Strava event log and drops expired ones, run daily'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--days-ahead', type=int, default=7)
+        parser.add_argument('--keep-days', type=int, default=settings.STRAVA_EVENT_LOG_DAYS)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        created = create_partitions(options['days_ahead'])
+        dropped = drop_partitions(options['keep_days'])
+        self.stdout.write(f'{len(created)} partitions created, {len(dropped)} dropped')
@@ -0,0 +1,81 @@
+import time
+from datetime import datetime
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from tracker.api.strava.forms import NotificationEnvelopeForm
+from tracker.apps.webhooks.models import StravaEvent
+from tracker.apps.webhooks.queue import enqueue
+from tracker.apps.webhooks.utils import mark_events
+
+
+CHUNK_SIZE = 500
+
+
+def parse_timestamp(value: str) -> datetime:
+    result = parse_datetime(value)
+    if not result:
+        day = parse_date(value)
+        if not day:
+            raise ValueError(f'Invalid date {value}')
+        result = datetime.combine(day, datetime.min.time())
+    return timezone.make_aware(result) if timezone.is_naive(result) else result
+
+
+class Command(BaseCommand):
+    help = 'Requeues logged Strava webhook events, e.g. after an outage or a processing bug fix'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--since', type=parse_timestamp, required=True, help='Date or datetime, inclusive')
+        parser.add_argument('--until', type=parse_timestamp, help='Date or datetime, exclusive')
+        parser.add_argument('--athlete', type=int, action='append', help='Strava athlete ID, can be repeated')
+        parser.add_argument(
+            '--status', choices=[status.name.lower() for status in StravaEvent.Status], action='append',
+            help='Only replay events with this status, can be repeated. Defaults to all but invalid and duplicate',
+        )
+        parser.add_argument('--rate', type=float, default=20, help='Events queued per second')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        events = StravaEvent.objects.filter(received_at__gte=options['since'])
+        if options['until']:
+            events = events.filter(received_at__lt=options['until'])
+        if options['athlete']:
+            events = events.filter(owner_id__in=options['athlete'])
+        if options['status']:
+            events = events.filter(status__in=[StravaEvent.Status[status.upper()] for status in options['status']])
+        else:
+            events = events.exclude(status__in=[StravaEvent.Status.INVALID, StravaEvent.Status.DUPLICATE])
+
+        if options['dry_run']:
+            self.stdout.write(f'{events.count()} events would be replayed')
+            return
+        if options['rate'] <= 0:
+            raise CommandError('--rate must be positive')
+
+        self.rate = options['rate']
+        self.start = time.monotonic()
+        self.replayed = 0
+        chunk = []
+        for event in events.order_by('received_at').iterator(chunk_size=CHUNK_SIZE):
+            chunk.append(event)
+            if len(chunk) == CHUNK_SIZE:
+                self.replay(chunk)
+                chunk = []
+        self.replay(chunk)
+
+        self.stdout.write(f'{self.replayed} events replayed')
+
+    def replay(self, events: list[StravaEvent]) -> None:
+        forms = {event.id: NotificationEnvelopeForm(data=event.payload) for event in events}
+        forms = {log_id: form for log_id, form in forms.items() if form.is_valid()}
+        # Marked first, workers may process the events before this loop ends
+        mark_events(forms, StravaEvent.Status.QUEUED)
+        for log_id, form in forms.items():
+            enqueue(form.cleaned_data, log_id=log_id, replay=True)
+            self.replayed += 1
+            # Paced so the workers and the Strava rate limit aren't flooded
+            time.sleep(max(self.start + self.replayed / self.rate - time.monotonic(), 0))
@@ -0,0 +1,100 @@
+import signal
+import socket
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import close_old_connections
+
+from libraries.strava.ratelimit import Priority, use_priority
+from tracker.apps.webhooks import queue
+from tracker.apps.webhooks.models import StravaEvent
+from tracker.apps.webhooks.processing import is_retryable, process_events
+from tracker.apps.webhooks.utils import mark_events
+
+
+class Command(BaseCommand):
+    help = 'Processes queued Strava webhook events'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--concurrency', type=int, default=4, help='Batches processed at the same time')
+        parser.add_argument('--batch-size', type=int, default=50, help='Events taken from the queue at once')
+        parser.add_argument(
+            '--name', default=socket.gethostname(),
+            help='Stable worker name, events left by a crashed worker are recovered on restart under the same name',
+        )
+        parser.add_argument('--requeue-dead-letters', action='store_true', help='Requeue dead-lettered events and exit')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['requeue_dead_letters']:
+            self.stdout.write(f'{queue.requeue_dead_letters()} dead-lettered events requeued')
+            return
+
+        self.name = options['name']
+        recovered = queue.recover(self.name)
+        if recovered:
+            self.stdout.write(f'{recovered} unfinished events recovered')
+
+        stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+        # Pull events only when a thread is free to take them, the rest stays in the queue
+        slots = threading.BoundedSemaphore(options['concurrency'])
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            try:
+                while not stopping.is_set():
+                    queue.flush_due_events()
+                    queue.schedule_due_retries()
+                    # Timeout so a stop request is noticed while all threads are busy
+                    if not slots.acquire(timeout=1):
+                        continue
+                    batch = queue.fetch_batch(self.name, options['batch_size'])
+                    if not batch:
+                        slots.release()
+                        continue
+
+                    future = executor.submit(self.process, batch)
+                    future.add_done_callback(lambda _: slots.release())
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write('Stopped')
+
+    def process(self, batch: list[bytes]) -> None:
+        close_old_connections()
+        groups = defaultdict(list)
+        for raw in batch:
+            groups[queue.Envelope.loads(raw).event['owner_id']].append(raw)
+
+        processed_log_ids = []
+        for raws in groups.values():
+            envelopes = [queue.Envelope.loads(raw) for raw in raws]
+            try:
+                with use_priority(Priority.BACKGROUND):
+                    errors = process_events([envelope.event for envelope in envelopes])
+            except Exception as e:
+                errors = [e] * len(raws)
+
+            for raw, envelope, error in zip(raws, envelopes, errors):
+                if not error:
+                    queue.ack(self.name, raw)
+                    processed_log_ids.extend(envelope.log_ids)
+                    continue
+
+                # Only transient failures are worth another attempt
+                if not is_retryable(error):
+                    queue.dead_letter(self.name, raw, repr(error))
+                    status = StravaEvent.Status.FAILED
+                elif queue.retry(self.name, raw, repr(error)):
+                    status = StravaEvent.Status.RETRYING
+                else:
+                    # Out of attempts, dead-lettered by retry()
+                    status = StravaEvent.Status.FAILED
+                mark_events(envelope.log_ids, status, repr(error))
+                self.stderr.write(f'Event {envelope.event} failed: {error!r}')
+
+        mark_events(processed_log_ids, StravaEvent.Status.PROCESSED)
+
+        close_old_connections()
@@ -0,0 +1,70 @@
+from typing import Any
+
+import django.utils.timezone
+from django.db import migrations, models
+
+import tracker.core.model_fields
+
+
+# The partition key has to be part of the primary key, Django only knows about `id`
+CREATE_TABLE = """
+CREATE TABLE webhooks_stravaevent (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    received_at timestamp with time zone NOT NULL,
+    owner_id bigint NULL,
+    object_id bigint NULL,
+    aspect_type varchar NOT NULL,
+    payload jsonb NOT NULL,
+    status smallint NOT NULL CHECK (status >= 0),
+    attempts smallint NOT NULL CHECK (attempts >= 0),
+    error text NOT NULL,
+    processed_at timestamp with time zone NULL,
+    PRIMARY KEY (id, received_at)
+) PARTITION BY RANGE (received_at);
+CREATE TABLE webhooks_stravaevent_default PARTITION OF webhooks_stravaevent DEFAULT;
+CREATE INDEX strava_event_owner_received ON webhooks_stravaevent (owner_id, received_at);
+"""
+
+
+def create_partitions(apps: Any, schema_editor: Any) -> None:
+    from tracker.apps.webhooks.partitions import create_partitions
+
+    with schema_editor.connection.cursor() as cursor:
+        create_partitions(cursor=cursor)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies: list = []
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_TABLE, 'DROP TABLE webhooks_stravaevent'),
+                migrations.RunPython(create_partitions, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='StravaEvent',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('owner_id', models.BigIntegerField(blank=True, help_text='Strava athlete ID', null=True)),
+                        ('object_id', models.BigIntegerField(blank=True, null=True)),
+                        ('aspect_type', models.CharField(blank=True)),
+                        ('payload', models.JSONField()),
+                        ('status', tracker.core.model_fields.ChoicesPositiveSmallIntegerField(default=1)),
+                        ('attempts', models.PositiveSmallIntegerField(default=0)),
+                        ('error', models.TextField(blank=True)),
+                        ('processed_at', models.DateTimeField(blank=True, null=True)),
+                    ],
+                ),
+                migrations.AddIndex(
+                    model_name='stravaevent',
+                    index=models.Index(fields=['owner_id', 'received_at'], name='strava_event_owner_received'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import models
+from django.utils import timezone
+
+from tracker.core.model_fields import ChoicesPositiveSmallIntegerField
+
+
+class StravaEvent(models.Model):
+    """Append-only log of every received webhook event.
+    The table is partitioned by day on `received_at` outside of Django's schema management,
+    see `partitions.py`, so schema changes need hand written SQL migrations.
+    """
+    class Status(models.IntegerChoices):
+        QUEUED = 1
+        PROCESSED = 2
+        RETRYING = 3
+        FAILED = 4
+        INVALID = 5
+        DUPLICATE = 6
+
+    received_at = models.DateTimeField(default=timezone.now)
+    owner_id = models.BigIntegerField(blank=True, null=True, help_text="Strava athlete ID")
+    object_id = models.BigIntegerField(blank=True, null=True)
+    aspect_type = models.CharField(blank=True)
+    payload = models.JSONField()
+    status = ChoicesPositiveSmallIntegerField(choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner_id', 'received_at'], name='strava_event_owner_received'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.aspect_type} {self.object_id} ({self.get_status_display()})"
@@ -0,0 +1,98 @@
+"""Daily partitions of the StravaEvent log.
+
+Partitions are created ahead of time and old ones are dropped whole, which is much cheaper
+than deleting rows. Rows outside of every daily partition land in the default partition,
+and are moved out when their day's partition is created.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any
+
+from django.db import connection, transaction
+
+
+TABLE = 'webhooks_stravaevent'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def get_partition_name(day: date) -> str:
+    return f'{TABLE}_p{day:%Y%m%d}'
+
+
+def get_partitions(cursor: Any) -> dict[date, str]:
+    cursor.execute(
+        """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = %s
+        """,
+        [TABLE],
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        suffix = name.rsplit('_p', 1)[-1]
+        if suffix.isdigit():
+            partitions[datetime.strptime(suffix, '%Y%m%d').date()] = name
+    return partitions
+
+
+def create_partitions(days_ahead: int = 7, cursor: Any = None) -> list[str]:
+    """Creates the partitions of today and the next `days_ahead` days"""
+    if cursor is None:
+        with connection.cursor() as cursor:
+            return create_partitions(days_ahead, cursor)
+
+    existing = get_partitions(cursor)
+    today = datetime.now(timezone.utc).date()
+    created = []
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        if day in existing:
+            continue
+        start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        name = get_partition_name(day)
+        create_partition(cursor, name, start, start + timedelta(days=1))
+        created.append(name)
+    return created
+
+
+def create_partition(cursor: Any, name: str, start: datetime, end: datetime) -> None:
+    """Creates a partition of [start, end), moving its rows out of the default partition.
+    Postgres refuses to create a partition while the default one holds rows of its range.
+    """
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE received_at >= %s AND received_at < %s)',
+        [start, end],
+    )
+    (has_rows,) = cursor.fetchone()
+    sql = f'CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)'
+    if not has_rows:
+        cursor.execute(sql, [start, end])
+        return
+
+    # Inserts wait for the parent table lock until the default partition is attached again
+    with transaction.atomic():
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}')
+        cursor.execute(sql, [start, end])
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE received_at >= %s AND received_at < %s RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            [start, end],
+        )
+        cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT')
+
+
+def drop_partitions(keep_days: int) -> list[str]:
+    """Drops partitions that only hold events older than `keep_days` days"""
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=keep_days)
+    dropped = []
+    with connection.cursor() as cursor:
+        for day, name in sorted(get_partitions(cursor).items()):
+            if day < cutoff:
+                cursor.execute(f'DROP TABLE {name}')
+                dropped.append(name)
+    return dropped
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Optional
+
+import httpx
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, transaction
+
+from libraries.strava import get_athlete_activity, get_headers, RateLimitExceeded, StravaActivity
+from libraries.strava.retry import CircuitOpen
+from tracker.api.strava.forms import NotificationForm
+from tracker.apps.activities.utils import delete_activities, import_strava_activities
+from tracker.apps.users.models import User
+
+
+class InvalidEvent(Exception):
+    pass
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, (httpx.TransportError, RateLimitExceeded, CircuitOpen, OperationalError))
+
+
+def process_events(events: list[dict]) -> list[Optional[Exception]]:
+    """Processes a batch of events, those of each athlete together.
+    Returns the error of each event, None for processed ones.
+    """
+    errors: list[Optional[Exception]] = [None] * len(events)
+    user_forms: dict[int, dict[int, NotificationForm]] = defaultdict(dict)
+    for index, event in enumerate(events):
+        form = NotificationForm(data=event)
+        if form.is_valid():
+            user_forms[form.cleaned_data['owner_id']][index] = form
+        else:
+            errors[index] = InvalidEvent(form.errors.as_json())
+
+    for user in User.objects.filter(id__in=user_forms):
+        process_user_events(user, user_forms[user.id], errors)
+    return errors
+
+
+def process_user_events(user: User, forms: dict[int, NotificationForm], errors: list[Optional[Exception]]) -> None:
+    """Activities are fetched concurrently with one access token, then deletes and upserts are
+    written in one transaction. Failures are set in `errors`.
+    """
+    deleted_activities = {
+        index: form.activity for index, form in forms.items()
+        if form.cleaned_data['aspect_type'] == NotificationForm.AspectType.DELETE
+    }
+    strava_activities = fetch_activities(
+        user, {index: form for index, form in forms.items() if index not in deleted_activities}, errors
+    )
+    if not strava_activities and not deleted_activities:
+        return
+
+    try:
+        with transaction.atomic():
+            delete_activities(user, [activity.id for activity in deleted_activities.values()])
+            import_strava_activities(user, list(strava_activities.values()))
+    except DatabaseError as e:
+        for index in [*strava_activities, *deleted_activities]:
+            errors[index] = e
+
+
+def fetch_activities(
+    user: User, forms: dict[int, NotificationForm], errors: list[Optional[Exception]]
+) -> dict[int, StravaActivity]:
+    """Fetches the activities of create and update events, failures are set in `errors`"""
+    if not forms:
+        return {}
+
+    headers = get_headers(user)
+    with ThreadPoolExecutor(max_workers=settings.STRAVA_WEBHOOK_FETCH_CONCURRENCY) as executor:
+        # Context is copied so the Strava calls keep the caller's rate limit priority
+        futures = {
+            index: executor.submit(
+                copy_context().run, get_athlete_activity, str(form.cleaned_data['object_id']), user, headers
+            )
+            for index, form in forms.items()
+        }
+
+    shoes_mapping = {shoes.strava_id: shoes for shoes in user.shoes.exclude(strava_id='')}
+    strava_activities = {}
+    for index, future in futures.items():
+        try:
+            strava_activity = future.result()
+        except Exception as e:
+            errors[index] = e
+            continue
+
+        if not strava_activity:
+            errors[index] = InvalidEvent('Invalid activity ID')
+            continue
+
+        strava_activity.shoes = shoes_mapping.get(strava_activity.shoes_id)
+        if not strava_activity.shoes:
+            errors[index] = InvalidEvent('Invalid activity gear ID')
+            continue
+
+        strava_activities[index] = strava_activity
+
+    return strava_activities
@@ -0,0 +1,225 @@
+"""Redis-backed queue of Strava webhook events, drained by `strava_webhook_worker`"""
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+from django_redis import get_redis_connection
+
+from django.conf import settings
+
+QUEUE_KEY = 'strava-webhooks:queue'
+DUE_KEY = 'strava-webhooks:due'
+COALESCED_KEY = 'strava-webhooks:coalesced'
+DUPLICATES_KEY = 'strava-webhooks:duplicates'
+RETRY_KEY = 'strava-webhooks:retry'
+DEAD_LETTER_KEY = 'strava-webhooks:dead'
+DEAD_LETTER_MAX_LENGTH = 10000
+# Strava redelivers events that weren't acknowledged in time
+IDEMPOTENCY_TIMEOUT = 24 * 60 * 60
+
+# Moves events of activities whose window closed to the queue
+FLUSH_DUE_SCRIPT = """
+local keys = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, key in ipairs(keys) do
+    redis.call('ZREM', KEYS[1], key)
+    local envelope = redis.call('GET', key)
+    if envelope then
+        redis.call('DEL', key)
+        redis.call('LPUSH', KEYS[2], envelope)
+    end
+end
+return #keys
+"""
+
+# Moves due retries back to the queue, atomic so concurrent workers can't move one twice
+SCHEDULE_RETRIES_SCRIPT = """
+local events = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, event in ipairs(events) do
+    redis.call('ZREM', KEYS[1], event)
+    redis.call('LPUSH', KEYS[2], event)
+end
+return #events
+"""
+
+
+@dataclass
+class Envelope:
+    event: dict
+    received_at: float
+    attempts: int = 0
+    error: str = ''
+    # StravaEvent rows of the events merged in this one
+    log_ids: list = field(default_factory=list)
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def loads(cls, raw: bytes) -> 'Envelope':
+        return cls(**json.loads(raw))
+
+
+def get_connection() -> Any:
+    return get_redis_connection('default')
+
+
+def get_processing_key(worker: str) -> str:
+    return f'strava-webhooks:processing:{worker}'
+
+
+def get_pending_key(event: dict) -> str:
+    return f'strava-webhooks:pending:{event["owner_id"]}:{event["object_id"]}'
+
+
+def get_idempotency_key(event: dict) -> str:
+    return (
+        f'strava-webhooks:seen:{event["subscription_id"]}:{event["object_id"]}:'
+        f'{event["event_time"]}:{event["aspect_type"]}'
+    )
+
+
+def enqueue(event: dict, log_id: Optional[int] = None, replay: bool = False) -> bool:
+    """Holds the event until the coalescing window of its activity closes.
+    Returns False for redeliveries of an event already received, unless replaying from the log.
+    """
+    connection = get_connection()
+    if not connection.set(get_idempotency_key(event), 1, nx=True, ex=IDEMPOTENCY_TIMEOUT) and not replay:
+        connection.incr(DUPLICATES_KEY)
+        return False
+
+    envelope = Envelope(event=event, received_at=time.time(), log_ids=[log_id] if log_id else [])
+    pending_key = get_pending_key(event)
+
+    def merge(pipeline: Any) -> None:
+        pending = pipeline.get(pending_key)
+        pipeline.multi()
+        if pending:
+            pipeline.set(pending_key, coalesce(Envelope.loads(pending), envelope).dumps())
+            pipeline.incr(COALESCED_KEY)
+        else:
+            # The window starts with the first event, later ones don't push it back
+            pipeline.set(pending_key, envelope.dumps())
+            pipeline.zadd(DUE_KEY, {pending_key: envelope.received_at + settings.STRAVA_WEBHOOK_COALESCE_WINDOW})
+
+    # Retried if the pending event is flushed or changed meanwhile
+    connection.transaction(merge, pending_key)
+    return True
+
+
+def coalesce(pending: Envelope, envelope: Envelope) -> Envelope:
+    """Merges an event into the pending one of the same activity.
+    Creates and updates both fetch the latest activity from Strava so one of them is
+    enough, a delete supersedes them.
+    """
+    if envelope.event['aspect_type'] == 'delete':
+        event = envelope.event
+    elif pending.event['aspect_type'] == 'delete':
+        event = pending.event
+    else:
+        event = {
+            **pending.event,
+            'event_time': max(pending.event['event_time'], envelope.event['event_time']),
+            'updates': {**pending.event['updates'], **envelope.event['updates']},
+        }
+    return Envelope(event=event, received_at=pending.received_at, log_ids=pending.log_ids + envelope.log_ids)
+
+
+def fetch(worker: str, timeout: int = 1) -> Optional[bytes]:
+    """Moves the oldest event to the worker's processing list, waiting up to `timeout` seconds"""
+    return get_connection().blmove(QUEUE_KEY, get_processing_key(worker), timeout, 'RIGHT', 'LEFT')
+
+
+def fetch_batch(worker: str, size: int, timeout: int = 1) -> list[bytes]:
+    """Waits for one event like `fetch`, then takes up to `size` events already queued"""
+    raw = fetch(worker, timeout)
+    if not raw:
+        return []
+
+    batch = [raw]
+    connection = get_connection()
+    while len(batch) < size and (raw := connection.lmove(QUEUE_KEY, get_processing_key(worker), 'RIGHT', 'LEFT')):
+        batch.append(raw)
+    return batch
+
+
+def ack(worker: str, raw: bytes) -> None:
+    get_connection().lrem(get_processing_key(worker), 1, raw)
+
+
+def retry(worker: str, raw: bytes, error: str) -> bool:
+    """Schedules the event for another attempt with exponential backoff.
+    Returns False when it ran out of attempts and was dead-lettered instead.
+    """
+    envelope = Envelope.loads(raw)
+    envelope.attempts += 1
+    envelope.error = error
+    if envelope.attempts >= settings.STRAVA_WEBHOOK_MAX_ATTEMPTS:
+        dead_letter(worker, raw, error)
+        return False
+
+    retry_at = time.time() + settings.STRAVA_WEBHOOK_RETRY_BACKOFF * 2 ** (envelope.attempts - 1)
+    pipeline = get_connection().pipeline()
+    pipeline.zadd(RETRY_KEY, {envelope.dumps(): retry_at})
+    pipeline.lrem(get_processing_key(worker), 1, raw)
+    pipeline.execute()
+    return True
+
+
+def dead_letter(worker: str, raw: bytes, error: str) -> None:
+    envelope = Envelope.loads(raw)
+    envelope.error = error
+    pipeline = get_connection().pipeline()
+    pipeline.lpush(DEAD_LETTER_KEY, envelope.dumps())
+    pipeline.ltrim(DEAD_LETTER_KEY, 0, DEAD_LETTER_MAX_LENGTH - 1)
+    pipeline.lrem(get_processing_key(worker), 1, raw)
+    pipeline.execute()
+
+
+def flush_due_events() -> int:
+    connection = get_connection()
+    script = connection.register_script(FLUSH_DUE_SCRIPT)
+    return script(keys=[DUE_KEY, QUEUE_KEY], args=[time.time()])
+
+
+def schedule_due_retries() -> int:
+    connection = get_connection()
+    script = connection.register_script(SCHEDULE_RETRIES_SCRIPT)
+    return script(keys=[RETRY_KEY, QUEUE_KEY], args=[time.time()])
+
+
+def recover(worker: str) -> int:
+    """Puts events left in the worker's processing list back at the front of the queue"""
+    connection = get_connection()
+    recovered = 0
+    # Newest first, so the oldest ends up at the very front
+    while connection.lmove(get_processing_key(worker), QUEUE_KEY, 'LEFT', 'RIGHT'):
+        recovered += 1
+    return recovered
+
+
+def requeue_dead_letters() -> int:
+    connection = get_connection()
+    requeued = 0
+    while raw := connection.rpop(DEAD_LETTER_KEY):
+        envelope = Envelope.loads(raw)
+        envelope.attempts = 0
+        envelope.error = ''
+        connection.lpush(QUEUE_KEY, envelope.dumps())
+        requeued += 1
+    return requeued
+
+
+def get_queue_status() -> dict:
+    connection = get_connection()
+    oldest = connection.lindex(QUEUE_KEY, -1)
+    return {
+        'pending': connection.zcard(DUE_KEY),
+        'queued': connection.llen(QUEUE_KEY),
+        'retrying': connection.zcard(RETRY_KEY),
+        'dead': connection.llen(DEAD_LETTER_KEY),
+        'coalesced': int(connection.get(COALESCED_KEY) or 0),
+        'duplicates': int(connection.get(DUPLICATES_KEY) or 0),
+        # Seconds the oldest queued event has been waiting
+        'lag': round(time.time() - Envelope.loads(oldest).received_at, 1) if oldest else 0,
+    }
@@ -0,0 +1,134 @@
+"""Resolves the Strava athlete and gear IDs of webhook events to local IDs.
+
+Maps are cached in Redis and, for STRAVA_RESOLVER_LOCAL_TIMEOUT seconds, in process so
+events of known athletes validate without a DB read. Only hits are cached: a miss is
+looked up again, so athletes and shoes linked meanwhile resolve right away. Removals
+and changes are invalidated when profiles and shoes are saved or deleted.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tracker.apps.shoes.models import Shoes
+from tracker.apps.users.models import StravaProfile
+
+
+class LocalCache:
+    """Thread-safe LRU whose entries expire after `timeout` seconds"""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, timeout: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+local_cache = LocalCache(max_size=10000)
+
+
+def get_athlete_key(athlete_id: str) -> str:
+    return f'strava-athlete:{athlete_id}'
+
+
+def get_gear_key(user_id: int) -> str:
+    return f'strava-gear:{user_id}'
+
+
+def _get(key: str) -> Any:
+    value = local_cache.get(key)
+    if value is None:
+        value = cache.get(key)
+    return value
+
+
+def _set(key: str, value: Any, local_only: bool = False) -> None:
+    if not local_only:
+        cache.set(key, value, timeout=settings.STRAVA_RESOLVER_TIMEOUT)
+    local_cache.set(key, value, timeout=settings.STRAVA_RESOLVER_LOCAL_TIMEOUT)
+
+
+def _delete(key: str) -> None:
+    cache.delete(key)
+    local_cache.delete(key)
+
+
+def resolve_user_id(athlete_id: int) -> Optional[int]:
+    key = get_athlete_key(str(athlete_id))
+    user_id = _get(key)
+    if user_id:
+        _set(key, user_id, local_only=True)
+        return user_id
+
+    user_id = StravaProfile.objects.filter(athlete_id=athlete_id).values_list('user_id', flat=True).first()
+    if user_id:
+        _set(key, user_id)
+    return user_id
+
+
+def resolve_shoes_id(user_id: int, gear_id: str) -> Optional[int]:
+    key = get_gear_key(user_id)
+    gear = _get(key)
+    if gear and gear_id in gear:
+        _set(key, gear, local_only=True)
+        return gear[gear_id]
+
+    # Not cached yet or shoes were added since
+    gear = dict(Shoes.objects.filter(user_id=user_id).exclude(strava_id='').values_list('strava_id', 'id'))
+    _set(key, gear)
+    return gear.get(gear_id)
+
+
+def _is_updated(update_fields: Optional[frozenset], fields: set) -> bool:
+    return update_fields is None or bool(fields & update_fields)
+
+
+@receiver(post_save, sender=StravaProfile)
+def invalidate_athlete(sender: type, instance: StravaProfile, update_fields: Optional[frozenset], **kwargs: Any) -> None:
+    # Token refreshes don't change the mapping
+    if _is_updated(update_fields, {'user', 'athlete_id'}):
+        _delete(get_athlete_key(instance.athlete_id))
+
+
+@receiver(post_delete, sender=StravaProfile)
+def invalidate_deleted_athlete(sender: type, instance: StravaProfile, **kwargs: Any) -> None:
+    _delete(get_athlete_key(instance.athlete_id))
+
+
+@receiver(post_save, sender=Shoes)
+def invalidate_gear(sender: type, instance: Shoes, update_fields: Optional[frozenset], **kwargs: Any) -> None:
+    # Retired shoes stay in the map, retiring needs no invalidation
+    if _is_updated(update_fields, {'user', 'strava_id'}):
+        _delete(get_gear_key(instance.user_id))
+
+
+@receiver(post_delete, sender=Shoes)
+def invalidate_deleted_gear(sender: type, instance: Shoes, **kwargs: Any) -> None:
+    _delete(get_gear_key(instance.user_id))
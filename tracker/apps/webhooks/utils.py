@@ -0,0 +1,16 @@
+from typing import Iterable
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import StravaEvent
+
+
+def mark_events(log_ids: Iterable[int], status: StravaEvent.Status, error: str = '') -> None:
+    fields: dict = {'status': status, 'error': error}
+    if status == StravaEvent.Status.PROCESSED:
+        fields['processed_at'] = timezone.now()
+    elif status in (StravaEvent.Status.RETRYING, StravaEvent.Status.FAILED):
+        fields['attempts'] = F('attempts') + 1
+
+    StravaEvent.objects.filter(id__in=list(log_ids)).update(**fields)
@@ -0,0 +1,11 @@
+from typing import Awaitable, Callable, TypeVar, cast
+
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBase
+
+AsyncView = TypeVar('AsyncView', bound=Callable[..., Awaitable[HttpResponseBase]])
+
+
+def async_login_required(view: AsyncView) -> AsyncView:
+    """`login_required` typed for async views, Django keeps coroutine functions async when decorating them"""
+    return cast(AsyncView, login_required(cast(Callable[..., HttpResponseBase], view)))
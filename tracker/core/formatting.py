@@ -0,0 +1,60 @@
+"""Distance, speed and pace strings in a user's measurement unit.
+
+Lists build one `UnitFormatter` from the viewing user and format the whole page with it,
+instead of reading each row's `activity.user`, which isn't cached on every queryset.
+"""
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from .constants import MeasurementUnit
+
+if TYPE_CHECKING:
+    from tracker.apps.activities.models import Activity
+    from tracker.apps.users.models import User
+
+
+METERS = {
+    MeasurementUnit.METRIC: 1000.0,
+    MeasurementUnit.MILES: 1609.344,
+}
+
+
+class UnitFormatter:
+    def __init__(self, measurement_unit: int) -> None:
+        metric = measurement_unit == MeasurementUnit.METRIC
+        self.meters = METERS[MeasurementUnit(measurement_unit)]
+        self.distance_unit = 'km' if metric else 'mile'
+        self.speed_unit = 'km/h' if metric else 'mph'
+        self.pace_unit = 'min/km' if metric else 'min/mile'
+
+    @classmethod
+    def for_user(cls, user: 'User') -> 'UnitFormatter':
+        return cls(user.measurement_unit)
+
+    def format_distance(self, distance: Optional[float]) -> str:
+        if not distance:
+            return '-'
+        return f'{distance / self.meters:.2f} {self.distance_unit}'
+
+    def format_speed(self, distance: Optional[float], duration: Optional[int]) -> str:
+        if not distance or not duration:
+            return '-'
+        avg_speed = distance / self.meters / (duration / 3600.0)
+        return f'{avg_speed:.2f} {self.speed_unit}'
+
+    def format_pace(self, distance: Optional[float], duration: Optional[int]) -> str:
+        if not distance or not duration:
+            return '-'
+        pace_in_minutes = duration / (distance / self.meters) / 60.0
+        minutes = int(pace_in_minutes)
+        seconds = int((pace_in_minutes - minutes) * 60)
+        return f'{minutes}:{seconds:02d} {self.pace_unit}'
+
+    def format_activities(self, activities: Iterable['Activity']) -> None:
+        """Sets `distance_display`, `speed_display` and `pace_display` on each activity for templates,
+        `distance` and `duration` must not be deferred
+        """
+        for activity in activities:
+            distance, duration = activity.distance, activity.duration
+            activity.distance_display = self.format_distance(distance)
+            activity.speed_display = self.format_speed(distance, duration)
+            activity.pace_display = self.format_pace(distance, duration)
@@ -1,7 +1,12 @@
+import base64
+import binascii
+import json
 import pathlib
-from typing import Any, Union
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional, Sequence, Union
 
-from django.db.models import QuerySet
+from django.core.exceptions import ValidationError
+from django.db.models import Field, QuerySet
 from django.http import HttpRequest
 from django.utils import timezone
 from django.template.defaultfilters import slugify
@@ -11,6 +16,7 @@ from tracker.apps.users.models import User
 
 class TrackerHttpRequest(HttpRequest):
     user: User
+    auser: Callable[[], Awaitable[User]]
 
 
 class FilenameGenerator:
@@ -65,3 +71,113 @@ class Paginator:
                 self.next_object = list_queryset[-1]
 
             self.objects = list_queryset[0:step]
+
+
+class KeysetPaginator:
+    """Pages a queryset by `order` and id with opaque cursors, newest first by default.
+    Pages start from the cursor's position instead of an OFFSET, so with an index on the ordered field
+    a deep page costs the same as the first one. The field can't be NULL. Unlike `Paginator`, pages aren't numbered.
+    """
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(
+        self, queryset: QuerySet, cursor: Optional[str] = None, step: int = 20, order: str = '-created'
+    ) -> None:
+        self.next: Optional[str] = None
+        self.previous: Optional[str] = None
+        self.field = order.lstrip('-')
+
+        descending = order.startswith('-')
+        ordering = [order, '-id' if descending else 'id']
+        reversed_ordering = [self.field if descending else f'-{self.field}', 'id' if descending else '-id']
+
+        position = self.decode_cursor(cursor, queryset.model._meta.get_field(self.field))
+        if position is None:
+            objects = list(queryset.order_by(*ordering)[:step + 1])
+            self.objects = objects[:step]
+            if len(objects) > step:
+                self.next = self.encode_cursor(self.NEXT, self.objects[-1], self.field)
+            return
+
+        direction, value, id = position
+        # Row comparison (field, id) < or > (cursor value, cursor id)
+        smaller = descending == (direction == self.NEXT)
+        lookup, id_lookup = ('lte', 'id__gte') if smaller else ('gte', 'id__lte')
+        queryset = queryset.filter(**{f'{self.field}__{lookup}': value}).exclude(**{self.field: value, id_lookup: id})
+        if direction == self.NEXT:
+            objects = list(queryset.order_by(*ordering)[:step + 1])
+            self.objects = objects[:step]
+            if len(objects) > step:
+                self.next = self.encode_cursor(self.NEXT, self.objects[-1], self.field)
+            if self.objects:
+                self.previous = self.encode_cursor(self.PREVIOUS, self.objects[0], self.field)
+        else:
+            objects = list(queryset.order_by(*reversed_ordering)[:step + 1])
+            self.objects = objects[:step][::-1]
+            if len(objects) > step:
+                self.previous = self.encode_cursor(self.PREVIOUS, self.objects[0], self.field)
+            if self.objects:
+                self.next = self.encode_cursor(self.NEXT, self.objects[-1], self.field)
+
+    @classmethod
+    def encode_cursor(cls, direction: str, obj: Any, field: str = 'created') -> str:
+        value = getattr(obj, field)
+        # Full precision, DjangoJSONEncoder drops microseconds
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        data = json.dumps([direction, value, obj.id]).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    @classmethod
+    def decode_cursor(cls, cursor: Optional[str], field: Field) -> Optional[tuple[str, Any, int]]:
+        """Returns the direction, field value and id of the cursor, None for the first page or an invalid cursor"""
+        if not cursor:
+            return None
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, value, id = json.loads(data)
+            if direction not in (cls.NEXT, cls.PREVIOUS) or value is None:
+                return None
+            # Generated fields convert values with their output field
+            value = getattr(field, 'output_field', field).to_python(value)
+            return direction, value, int(id)
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError, ValidationError):
+            return None
+
+    def to_dict(self) -> dict[str, Optional[str]]:
+        """Cursors of the adjacent pages for JSON responses"""
+        return {'next': self.next, 'previous': self.previous}
+
+
+def downsample(points: Sequence[tuple[float, float]], count: int) -> list[tuple[float, float]]:
+    """Picks `count` of the (x, y) points keeping the shape of the series, with Largest-Triangle-Three-Buckets.
+    The first and last points are kept, each bucket between them keeps the point forming the largest triangle
+    with the point kept before it and the average of the next bucket.
+    """
+    if count < 3 or count >= len(points):
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (count - 2)
+    previous_x, previous_y = points[0]
+    for bucket in range(count - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        # The last bucket is followed by the last point
+        next_points = points[end:min(int((bucket + 2) * bucket_size) + 1, len(points))]
+        next_x = sum(x for x, _ in next_points) / len(next_points)
+        next_y = sum(y for _, y in next_points) / len(next_points)
+
+        # Twice the triangle areas, only their order matters
+        candidates = points[start:end]
+        areas = [
+            abs((previous_x - next_x) * (y - previous_y) - (previous_x - x) * (next_y - previous_y))
+            for x, y in candidates
+        ]
+        point = candidates[areas.index(max(areas))]
+        sampled.append(point)
+        previous_x, previous_y = point
+
+    sampled.append(points[-1])
+    return sampled
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'tracker.apps.users',
     'tracker.apps.photos',
     'tracker.apps.shoes',
+    'tracker.apps.webhooks',
 ]
 
 MIDDLEWARE = [
@@ -214,6 +215,58 @@ APPEND_SLASH = True
 STRAVA_CLIENT_ID = ''
 STRAVA_CLIENT_SECRET = ''
 STRAVA_VERIFY_TOKEN = ''
+# Point at `libraries.strava.fake` to run without the real API
+STRAVA_API_URL = 'https://www.strava.com/api/v3/'
+# Strava HTTP client
+STRAVA_TIMEOUT = 10  # in seconds
+STRAVA_CONNECT_TIMEOUT = 3  # in seconds
+STRAVA_HTTP2 = True
+STRAVA_MAX_CONNECTIONS = 20
+STRAVA_MAX_KEEPALIVE_CONNECTIONS = 10
+STRAVA_KEEPALIVE_EXPIRY = 30  # in seconds
+# 15 minute and daily request limits, replaced by the values Strava reports in its responses
+STRAVA_RATE_LIMITS = (200, 2000)
+# Share of each rate limit window that background jobs may use, the rest is kept for page loads
+STRAVA_RATE_LIMIT_BACKGROUND_SHARE = 0.8
+STRAVA_RATE_LIMIT_MAX_WAIT = 15 * 60  # in seconds
+# Idempotent requests are retried with jittered exponential backoff
+STRAVA_MAX_RETRIES = 2
+STRAVA_RETRY_BACKOFF = 0.5  # in seconds
+STRAVA_RETRY_MAX_BACKOFF = 5  # in seconds
+# Token refreshes hold a lock for at most every attempt timing out and the longest backoffs between them
+STRAVA_TOKEN_LOCK_TIMEOUT = (
+    (STRAVA_MAX_RETRIES + 1) * (STRAVA_CONNECT_TIMEOUT + STRAVA_TIMEOUT) + STRAVA_MAX_RETRIES * STRAVA_RETRY_MAX_BACKOFF
+)  # in seconds
+# Circuit breaker, opens after consecutive failures
+STRAVA_CIRCUIT_BREAKER_THRESHOLD = 5
+STRAVA_CIRCUIT_BREAKER_RESET_TIMEOUT = 30  # in seconds
+# Strava lists shown by views when Strava is unavailable
+STRAVA_FALLBACK_CACHE_TIMEOUT = 24 * 60 * 60  # in seconds
+
+# Activities written per INSERT ... ON CONFLICT statement
+STRAVA_IMPORT_BATCH_SIZE = 500
+# Webhook events queue
+STRAVA_WEBHOOK_MAX_ATTEMPTS = 5
+STRAVA_WEBHOOK_RETRY_BACKOFF = 30  # in seconds, doubled on each attempt
+# Events of the same activity arriving within the window are processed once
+STRAVA_WEBHOOK_COALESCE_WINDOW = 10  # in seconds
+# Activities of an athlete's batched events fetched at the same time
+STRAVA_WEBHOOK_FETCH_CONCURRENCY = 4
+# Days of webhook events kept in the event log
+STRAVA_EVENT_LOG_DAYS = 30
+# Athlete and gear ID maps used to validate webhook events
+STRAVA_RESOLVER_TIMEOUT = 24 * 60 * 60  # in seconds
+STRAVA_RESOLVER_LOCAL_TIMEOUT = 60  # in seconds, in process copy
+
+# Shoe wear forecasts, rebuilt nightly by the forecast_shoes command
+SHOE_LIFESPAN = 700 * 1000  # in meters, distance shoes are projected to retire at
+SHOE_FORECAST_WINDOW = 180  # in days of activities fitting the usage rate
+SHOE_FORECAST_HALF_LIFE = 30  # in days, older activities weigh half as much per half-life
+SHOE_FORECAST_MAX_DAYS = 10 * 365  # retirement dates further away aren't shown
+# Cumulative distance series of the shoes mileage API
+SHOE_MILEAGE_POINTS = 200  # returned when the request doesn't ask for a number of points
+SHOE_MILEAGE_MAX_POINTS = 2000
+SHOE_MILEAGE_CACHE_TIMEOUT = 24 * 60 * 60  # in seconds
 
 FIXTURE_DIRS = (
     BASE_DIR / "tests/fixtures",
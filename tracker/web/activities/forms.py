@@ -3,32 +3,45 @@ from typing import Any, Optional
 from django import forms
 from django.db.models import TextChoices, QuerySet
 
-from libraries.strava import STRAVA_SPORT_TYPES
+from libraries.strava import StravaActivity, STRAVA_SPORT_TYPES
 from tracker.apps.activities.models import Activity
+from tracker.apps.activities.utils import import_strava_activities
 from tracker.apps.photos.models import Photo
 from tracker.apps.shoes.models import Shoes
 from tracker.apps.users.models import User
 
 
-class ActivityFilterForm(forms.Form):
+class ActivitySortForm(forms.Form):
+    class Sort(TextChoices):
+        NEWEST = 'newest'
+        FASTEST = 'fastest'
+
+    sort = forms.ChoiceField(required=False, initial=Sort.NEWEST, choices=Sort.choices)
+    cursor = forms.CharField(required=False)
+
+    def sort_activities(self, activity_qs: QuerySet) -> QuerySet:
+        # Keyset pages can't order on NULL, activities without distance or duration have no pace
+        if self.cleaned_data['sort'] == self.Sort.FASTEST:
+            activity_qs = activity_qs.filter(pace__isnull=False)
+        return activity_qs
+
+    def get_order(self) -> str:
+        """Ordering of `KeysetPaginator`, the generated `pace` column is sorted in SQL"""
+        return 'pace' if self.cleaned_data['sort'] == self.Sort.FASTEST else '-created'
+
+
+class ActivityFilterForm(ActivitySortForm):
     class Filter(TextChoices):
         ALL = 'all'
         NEW = 'new'
 
     filter = forms.ChoiceField(required=False, initial=Filter.NEW, choices=Filter.choices)
-    page = forms.IntegerField(required=False)
-
-    def clean_page(self) -> int:
-        page = self.cleaned_data['page'] or 1
-        if page <= 0:
-            page = 1
-        return page
 
     def filter_activities(self, activity_qs: QuerySet) -> QuerySet:
         filter = self.cleaned_data['filter']
 
         if filter != self.Filter.ALL:
-            activity_qs = activity_qs.filter(photos=None).exclude(no_photos=True)
+            activity_qs = activity_qs.filter(photo_count=0, no_photos=False)
 
         return activity_qs
 
@@ -56,12 +69,11 @@ class AddActivityForm(forms.Form):
             raise forms.ValidationError('Duplicate activity ID', 'duplicate_id')
         return id
 
-    def clean_type(self) -> Activity.Type:
+    def clean_type(self) -> str:
         type = self.cleaned_data['type']
-        activity_type = STRAVA_SPORT_TYPES.get(type)
-        if not activity_type:
+        if type not in STRAVA_SPORT_TYPES:
             raise forms.ValidationError('Invalid type', 'invalid_type')
-        return activity_type
+        return type
 
     def clean_shoes_id(self) -> Shoes:
         strava_id = self.cleaned_data['shoes_id']
@@ -72,25 +84,18 @@ class AddActivityForm(forms.Form):
 
     def save(self) -> Activity:
         shoes = self.cleaned_data['shoes_id']
-        created = self.cleaned_data['created']
-        distance = self.cleaned_data['distance']
-        latest_activity = shoes.activities.order_by('-created').filter(created__lt=created).first()
-        if latest_activity:
-            current_distance_traveled = latest_activity.shoe_distance + distance
-        else:
-            current_distance_traveled = 0
-
-        activity = self.user.activities.create(
-            strava_id=self.cleaned_data['id'],
+        strava_activity = StravaActivity(
+            id=self.cleaned_data['id'],
             name=self.cleaned_data['name'],
+            distance=self.cleaned_data['distance'],
+            moving_time=self.cleaned_data['duration'],
             type=self.cleaned_data['type'],
+            created=self.cleaned_data['created'],
+            shoes_id=shoes.strava_id,
             shoes=shoes,
-            distance=distance,
-            duration=self.cleaned_data['duration'],
-            created=created,
-            shoe_distance=current_distance_traveled,
         )
-        return activity
+        import_strava_activities(self.user, [strava_activity])
+        return self.user.activities.get(strava_id=strava_activity.id)
 
 
 class ActivityPhotoForm(forms.ModelForm):
@@ -1,5 +1,8 @@
 from collections import defaultdict
 
+import httpx
+from asgiref.sync import sync_to_async
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db.models import Prefetch
@@ -9,11 +12,14 @@ from django.urls import reverse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
 
-from libraries.strava import STRAVA_SPORT_TYPES
-from tracker.apps.activities.models import Activity
-from tracker.apps.activities.utils import get_unregistered_strava_activities
+from libraries.strava import StravaException
+from tracker.apps.activities.utils import (
+    aget_unregistered_strava_activities, get_unregistered_strava_activities, import_strava_activities
+)
 from tracker.apps.photos.models import Photo
-from tracker.core.utils import TrackerHttpRequest, Paginator
+from tracker.core.decorators import async_login_required
+from tracker.core.formatting import UnitFormatter
+from tracker.core.utils import KeysetPaginator, TrackerHttpRequest
 
 from .forms import ActivityFilterForm, ActivityPhotoForm, AddActivityForm, BaseActivityPhotoFormSet
 
@@ -21,21 +27,30 @@ from .forms import ActivityFilterForm, ActivityPhotoForm, AddActivityForm, BaseA
 @login_required
 def index(request: TrackerHttpRequest) -> HttpResponse:
     photos_prefetch = Prefetch('photos', Photo.objects.order_by('category_id')[:4], to_attr='prefetched_photos')
-    activities_qs = request.user.activities.prefetch_related(photos_prefetch).order_by('-created')
+    # Only the columns the list renders, the related manager also reads `user_id` to cache `request.user`
+    activities_qs = (
+        request.user.activities.select_related('shoes')
+        .only('user', 'name', 'type', 'created', 'distance', 'duration', 'pace', 'shoes__name')
+        .prefetch_related(photos_prefetch).order_by('-created')
+    )
 
     form = ActivityFilterForm(data=request.GET)
     if form.is_valid():
-        activities_qs = form.filter_activities(activity_qs=activities_qs)
-        page = form.cleaned_data['page']
+        activities_qs = form.sort_activities(form.filter_activities(activity_qs=activities_qs))
+        cursor = form.cleaned_data['cursor']
+        order = form.get_order()
         selected_tab = form.get_selected_tab()
     else:
-        page = 1
+        cursor = None
+        order = '-created'
         selected_tab = 'index'
 
-    paginator = Paginator(activities_qs, page, 10)
+    paginator = KeysetPaginator(activities_qs, cursor, 10, order)
+    UnitFormatter.for_user(request.user).format_activities(paginator.objects)
     context = {
         'activities': paginator.objects,
         'paginator': paginator,
+        'order': order,
         'selected_tab': selected_tab,
     }
     return render(request, 'web/activities/index.html', context)
@@ -45,6 +60,7 @@ def index(request: TrackerHttpRequest) -> HttpResponse:
 def details(request: TrackerHttpRequest, id: int) -> HttpResponse:
     activity_qs = request.user.activities.select_related('shoes').prefetch_related('photos')
     activity = get_object_or_404(activity_qs, id=id, user_id=request.user.id)
+    UnitFormatter.for_user(request.user).format_activities([activity])
 
     category_mapping = {category.id: category for category in activity.shoes.photo_categories.all()}
     photos_by_category = defaultdict(list)
@@ -107,55 +123,39 @@ def edit_photo(request: TrackerHttpRequest, id: int, photo_id: int) -> HttpRespo
     return render(request, 'web/form.html', context)
 
 
-@login_required
-def strava_list(request: TrackerHttpRequest) -> HttpResponse:
-    form = AddActivityForm(data=request.POST or None, user=request.user)
-    if form.is_valid():
-        activity = form.save()
+@async_login_required
+async def strava_list(request: TrackerHttpRequest) -> HttpResponse:
+    # Async so that waiting on Strava doesn't hold a worker, DB work still runs in sync threads
+    user = await request.auser()
+    form = AddActivityForm(data=request.POST or None, user=user)
+    if await sync_to_async(form.is_valid)():
+        activity = await sync_to_async(form.save)()
         messages.success(request, f'Activity {activity.name} has been added')
         return redirect('web:activities:details', activity.id)
 
-    new_activities = get_unregistered_strava_activities(request.user)
+    try:
+        new_activities = await aget_unregistered_strava_activities(user)
+    except (StravaException, httpx.HTTPError):
+        messages.error(request, 'Strava is unavailable at the moment, please try again later')
+        new_activities = []
+
+    # Records are slotted, distances are formatted alongside
+    formatter = UnitFormatter.for_user(user)
     context = {
         'form': form,
-        'new_activities': new_activities,
+        'new_activities': [(activity, formatter.format_distance(activity.distance)) for activity in new_activities],
         'selected_tab': 'strava_list',
     }
-    return render(request, 'web/activities/strava_list.html', context)
+    return await sync_to_async(render)(request, 'web/activities/strava_list.html', context)
 
 
 @require_POST
 @login_required
 def bulk_add(request: TrackerHttpRequest) -> HttpResponse:
     new_activities = get_unregistered_strava_activities(request.user)
-
-    # Make sure shoe distance is correct
-    shoes = {activity.shoes for activity in new_activities}
-    for shoe in shoes:
-        shoe.recalculate_distance_covered()
-
-    shoe_distance_mapping = {shoe: shoe.distance_covered for shoe in shoes}
-    created_activities = []
-    for strava_activity in new_activities:
-        shoes = strava_activity.shoes
-        distance = strava_activity.distance
-        shoe_distance = shoe_distance_mapping[shoes]
-        created_activities.append(Activity(
-            user=request.user,
-            strava_id=strava_activity.id,
-            type=STRAVA_SPORT_TYPES.get(strava_activity.type),
-            name=strava_activity.name,
-            shoes=shoes,
-            distance=distance,
-            duration=strava_activity.moving_time,
-            created=strava_activity.created,
-            shoe_distance=shoe_distance,
-        ))
-
-        shoe_distance_mapping[shoes] += distance
-
-    Activity.objects.bulk_create(created_activities)
-    messages.success(request, f'{len(created_activities)} new activities have been added')
+    # Activities added by a concurrent request are updated instead
+    inserted, _ = import_strava_activities(request.user, new_activities)
+    messages.success(request, f'{inserted} new activities have been added')
     return redirect('web:activities:index')
 
 
@@ -10,7 +10,6 @@ from tracker.apps.photos.models import PhotoCategory, Photo
 class AddShoesForm(forms.Form):
     id = forms.CharField()
     name = forms.CharField()
-    distance_covered = forms.IntegerField()
 
     def __init__(self, user: User, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
@@ -26,7 +25,6 @@ class AddShoesForm(forms.Form):
         shoes = self.user.shoes.create(
             strava_id=self.cleaned_data['id'],
             name=self.cleaned_data['name'],
-            distance_covered=self.cleaned_data['distance_covered'],
         )
         return shoes
 
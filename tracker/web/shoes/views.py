@@ -1,5 +1,10 @@
+import httpx
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.db.models import Prefetch
 from django.forms import formset_factory
 from django.http import HttpResponse
@@ -7,17 +12,19 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.decorators.http import require_POST
 
-from libraries.strava import get_athlete_shoes
+from libraries.strava import aget_athlete_shoes, StravaException
 from tracker.apps.photos.models import Photo
-from tracker.core.utils import TrackerHttpRequest, Paginator
-from tracker.web.activities.forms import ActivityPhotoForm
+from tracker.core.decorators import async_login_required
+from tracker.core.formatting import UnitFormatter
+from tracker.core.utils import KeysetPaginator, TrackerHttpRequest
+from tracker.web.activities.forms import ActivityPhotoForm, ActivitySortForm
 
 from .forms import AddShoesForm, PhotoCategoryForm, PhotoComparisonForm
 
 
 @login_required
 def index(request: TrackerHttpRequest) -> HttpResponse:
-    shoes = request.user.shoes.select_related("brand")
+    shoes = request.user.shoes.select_related("brand", "forecast")
     context = {
         "shoes": shoes,
         'selected_tab': 'index',
@@ -27,13 +34,19 @@ def index(request: TrackerHttpRequest) -> HttpResponse:
 
 @login_required
 def details(request: TrackerHttpRequest, id: int) -> HttpResponse:
-    shoes_qs = request.user.shoes.select_related("brand")
+    shoes_qs = request.user.shoes.select_related("brand", "forecast")
     shoes = get_object_or_404(shoes_qs, id=id)
     photo_prefetch = Prefetch('photos', Photo.objects.order_by('created')[:4], to_attr='prefetched_photos')
     categories = shoes.photo_categories.prefetch_related(photo_prefetch)
+    # Rebuilt nightly by `forecast_shoes`, new shoes have none yet
+    forecast = getattr(shoes, 'forecast', None) if not shoes.retired else None
+    formatter = UnitFormatter.for_user(request.user)
     context = {
         "shoe": shoes,
         "categories": categories,
+        "forecast": forecast,
+        "remaining_distance": formatter.format_distance(forecast.remaining_distance) if forecast else None,
+        "weekly_distance": formatter.format_distance(forecast.daily_distance * 7) if forecast else None,
         'selected_tab': 'details',
     }
     return render(request, "web/shoes/details.html", context)
@@ -43,14 +56,28 @@ def details(request: TrackerHttpRequest, id: int) -> HttpResponse:
 def activities(request: TrackerHttpRequest, id: int) -> HttpResponse:
     shoes = get_object_or_404(request.user.shoes, id=id)
     photos_prefetch = Prefetch('photos', Photo.objects.order_by('category_id')[:4], to_attr='prefetched_photos')
-    activities = shoes.activities.prefetch_related(photos_prefetch).order_by('-created')
+    activities = (
+        shoes.activities.only('shoes', 'name', 'type', 'created', 'distance', 'duration', 'pace')
+        .prefetch_related(photos_prefetch).order_by('-created')
+    )
+
+    form = ActivitySortForm(data=request.GET)
+    if form.is_valid():
+        activities = form.sort_activities(activities)
+        cursor = form.cleaned_data['cursor']
+        order = form.get_order()
+    else:
+        cursor = None
+        order = '-created'
 
-    page = int(request.GET.get('page', 1))
-    paginator = Paginator(activities, page, 10)
+    paginator = KeysetPaginator(activities, cursor, 10, order)
+    # The related manager caches `shoes` but not `user`, resolve the unit once for the page
+    UnitFormatter.for_user(request.user).format_activities(paginator.objects)
     context = {
         'shoe': shoes,
         'activities': paginator.objects,
         'paginator': paginator,
+        'order': order,
         'selected_tab': 'activities',
     }
     return render(request, "web/shoes/activities.html", context)
@@ -133,22 +160,31 @@ def add_photo(request: TrackerHttpRequest, id: int) -> HttpResponse:
     return render(request, "web/form.html", context)
 
 
-@login_required
-def strava_list(request: TrackerHttpRequest) -> HttpResponse:
-    form = AddShoesForm(data=request.POST or None, user=request.user)
-    if form.is_valid():
-        shoes = form.save()
+@async_login_required
+async def strava_list(request: TrackerHttpRequest) -> HttpResponse:
+    user = await request.auser()
+    form = AddShoesForm(data=request.POST or None, user=user)
+    if await sync_to_async(form.is_valid)():
+        shoes = await sync_to_async(form.save)()
         messages.success(request, f'Shoes {shoes.name} has been added')
 
-    registered_shoe_ids = set(request.user.shoes.values_list("strava_id", flat=True))
-    strava_shoes = get_athlete_shoes(request.user)
+    registered_shoe_ids = {strava_id async for strava_id in user.shoes.values_list("strava_id", flat=True)}
+    # Fall back to the last successful response while Strava is failing or the circuit breaker is open
+    cache_key = f'strava-shoes:v2:{user.id}'
+    try:
+        strava_shoes = await aget_athlete_shoes(user)
+    except (StravaException, httpx.HTTPError):
+        strava_shoes = await cache.aget(cache_key) or []
+        messages.warning(request, 'Strava is unavailable at the moment, showing previously loaded shoes')
+    else:
+        await cache.aset(cache_key, strava_shoes, timeout=settings.STRAVA_FALLBACK_CACHE_TIMEOUT)
 
     new_shoes = [shoe for shoe in strava_shoes if shoe.id not in registered_shoe_ids and not shoe.retired]
     context = {
         "new_shoes": new_shoes,
         'selected_tab': 'strava_list',
     }
-    return render(request, "web/shoes/strava_list.html", context)
+    return await sync_to_async(render)(request, "web/shoes/strava_list.html", context)
 
 
 @login_required